@@ -0,0 +1,87 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+from rate_limit import RateLimited, shared_budget
+from strava_client import client
+from strava_sync import API_BASE
+
+STREAM_KEYS = "time,distance,latlng,altitude,heartrate,cadence,watts,velocity_smooth,moving"
+
+# kind -> (path, query params)
+ENDPOINTS = {
+    "detail": ("/activities/{id}", {"include_all_efforts": "true"}),
+    "laps": ("/activities/{id}/laps", {}),
+    "streams": ("/activities/{id}/streams", {"keys": STREAM_KEYS, "key_by_type": "true"}),
+}
+# Answers that will not change on retry: deleted or private activities, and manual ones without streams
+PERMANENT_STATUSES = (403, 404)
+
+
+class DetailFetcher:
+    # Pulls per-activity endpoints concurrently: a semaphore caps requests in flight, every request
+    # goes through the shared rate budget, and concurrent asks for the same (activity, kind)
+    # share one request instead of issuing duplicates.
+    def __init__(self, access_token, store=None, concurrency=8, session=client, budget=shared_budget,
+                 base_url=API_BASE, max_wait=None):
+        self.access_token = access_token
+        self.store = store
+        self.concurrency = concurrency
+        self.session = session
+        self.budget = budget
+        self.base_url = base_url
+        self.max_wait = max_wait
+        self._inflight = {}
+        self._semaphore = None
+        self._executor = None
+
+    async def fetch(self, activity_id, kind="detail"):
+        key = (activity_id, kind)
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._fetch(activity_id, kind))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        return await task
+
+    async def _fetch(self, activity_id, kind):
+        path, params = ENDPOINTS[kind]
+        loop = asyncio.get_running_loop()
+        async with self._semaphore:
+            await loop.run_in_executor(self._executor, self.budget.acquire, self.max_wait)
+            response = await loop.run_in_executor(self._executor, lambda: self.session.get(
+                self.base_url + path.format(id=activity_id),
+                headers={"Authorization": f"Bearer {self.access_token}"},
+                params=params,
+            ))
+        self.budget.update(response.headers)
+        if response.status_code in PERMANENT_STATUSES and self.store is not None:
+            self.store.save_detail(activity_id, kind, None, status=response.status_code)
+        response.raise_for_status()
+        payload = response.json()
+        if self.store is not None:
+            self.store.save_detail(activity_id, kind, payload)
+        return payload
+
+    async def fetch_many(self, keys):
+        self._semaphore = asyncio.Semaphore(self.concurrency)
+        with ThreadPoolExecutor(self.concurrency) as self._executor:
+            results = await asyncio.gather(*(self.fetch(*key) for key in keys), return_exceptions=True)
+        return dict(zip(keys, results))
+
+
+def missing_keys(store, kinds=("detail",)):
+    # (id, kind) pairs the store has no answer for yet, each kind on its own
+    return [(activity_id, kind) for kind in kinds for activity_id in store.missing_details(kind)]
+
+
+def fetch_details(access_token, keys, **kwargs):
+    # Fetches (id, kind) pairs. Returns ({(id, kind): payload}, {(id, kind): exception}); a
+    # RateLimited error means the remaining pairs should be retried once the budget window resets
+    results = asyncio.run(DetailFetcher(access_token, **kwargs).fetch_many(keys))
+    fetched = {key: value for key, value in results.items() if not isinstance(value, BaseException)}
+    failed = {key: value for key, value in results.items() if isinstance(value, BaseException)}
+    return fetched, failed
+
+
+def rate_limited(failed):
+    return any(isinstance(error, RateLimited) for error in failed.values())
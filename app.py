@@ -1,10 +1,23 @@
+import time
+
 import streamlit as st
 import pandas as pd
-from utils import preprocess_data
-from tabs import general, running, swimming, cycling, time_weather
+from utils import preprocess_data, dataset_key
+from data_cache import CACHE_DIR, load_activities, load_cached_frame, content_key
+from strava_sync import ActivityStore, backfill_activities, sync_activities
+from rate_limit import RateLimited
+from strava_client import client
+from activity_fetcher import fetch_details, missing_keys, rate_limited
+from stream_store import stream_store
+from tracks import api_streams_to_track, parse_export
+from tabs import general, running, swimming, cycling, time_weather, maps
+import profiling
 
 st.set_page_config(page_title="Strava Triathlon Dashboard", layout="wide", initial_sidebar_state="expanded")
 
+# Opt-in timing of this run, from the sidebar checkbox (its value from the previous run) or ?profile=1
+profiling.start(st.session_state.get("profile_run", st.query_params.get("profile") == "1"))
+
 from auth_strava import authenticate
 import requests
 
@@ -14,37 +27,77 @@ with st.sidebar:
     if data_source == "📂 Upload CSV":
         uploaded_file = st.file_uploader("Upload a CSV file", type="csv")
         if uploaded_file:
-            df = pd.read_csv(uploaded_file, encoding='latin-1', on_bad_lines='skip')
+            df = load_activities(uploaded_file.getvalue())
+            # Names the data source for caches that fold in only what changed since the last run
+            df.attrs['source'] = "upload"
         else:
             st.stop()
 
     elif data_source == "📊 Example Data":
-        df = pd.read_csv("activities.csv", encoding='latin-1', on_bad_lines='skip')
+        with open("activities.csv", "rb") as f:
+            df = load_activities(f.read(), pinned=True)
+        df.attrs['source'] = "example"
 
     else:  # Strava API
         access_token = authenticate()
-        headers = {"Authorization": f"Bearer {access_token}"}
-        response = requests.get(
-            "https://www.strava.com/api/v3/athlete/activities?per_page=200",
-            headers=headers
-        )
-        activities = response.json()
-
-        if not isinstance(activities, list) or len(activities) == 0:
+        store = ActivityStore.for_athlete(st.session_state.get("athlete_id"))
+
+        refresh = st.button("🔄 Sync with Strava")
+        # Synced once per session; after that only the button, or the end of a rate-limit pause, syncs again
+        retry_at = st.session_state.get("sync_retry_at")
+        if refresh or "last_sync" not in st.session_state or (retry_at is not None and time.time() >= retry_at):
+            st.session_state["sync_retry_at"] = None
+            try:
+                with profiling.section("Strava sync"):
+                    backfill_activities(store, access_token, max_wait=5)
+                    sync_activities(store, access_token, max_wait=5)
+            except RateLimited as e:
+                st.session_state["sync_retry_at"] = time.time() + e.wait
+                st.info(f"Strava rate limit reached with {len(store)} activities stored. "
+                        f"Sync again in {e.wait / 60:.0f} min to continue.")
+            except requests.RequestException:
+                st.warning("Could not reach Strava, showing stored activities.")
+            # Recorded for failed attempts too, so widget reruns do not hit the API again
+            st.session_state["last_sync"] = store.cursor()
+
+        if st.button("⬇️ Fetch activity details & streams"):
+            missing = missing_keys(store, ("detail", "streams"))
+            with st.spinner(f"Fetching {len(missing)} activity details and streams..."):
+                fetched, failed = fetch_details(access_token, missing, store=store, max_wait=5)
+            starts = {activity['id']: activity['start_date'] for activity in store.activities()}
+            stream_store.ingest({activity_id: api_streams_to_track(payload, starts[activity_id])
+                                 for (activity_id, kind), payload in fetched.items() if kind == "streams"})
+            if rate_limited(failed):
+                st.info("Strava rate limit reached, fetch again later to continue.")
+            st.caption(f"Fetched {len(fetched)} responses, {len(failed)} failed.")
+
+        with st.expander("📡 Network"):
+            st.dataframe(pd.DataFrame(client.metrics()), hide_index=True)
+            st.caption("Response cache: " + ", ".join(f"{k} {v}" for k, v in client.cache.stats().items()))
+
+        if len(store) == 0:
             st.error("Failed to fetch activities from Strava API.")
             st.stop()
 
-        df = pd.DataFrame(activities)
+        df = load_cached_frame(content_key(f"strava:{store.path}:{store.revision()}".encode()),
+                               lambda: preprocess_data(store.to_frame()))
+        df.attrs['source'] = f"strava:{store.path}"
 
-    df = preprocess_data(df)
+    with st.expander("🗺️ Activity tracks"):
+        if 'Filename' in df.columns:
+            export_dir = st.text_input("Export folder", help="Unzipped Strava export that contains activities/")
+            if export_dir and st.button("📥 Import GPX/FIT tracks"):
+                pending = df[~df['Activity ID'].map(stream_store.has)]
+                with st.spinner(f"Parsing {len(pending)} track files..."):
+                    imported = stream_store.ingest(parse_export(pending, export_dir))
+                st.caption(f"Imported {imported} tracks.")
+        st.caption("Stream store: " + ", ".join(f"{k} {v}" for k, v in stream_store.stats().items()))
 
     # Date filter
-    if 'Activity Date' in df.columns:
-        df['Activity Date'] = pd.to_datetime(df['Activity Date'], errors='coerce')
-        df = df.dropna(subset=['Activity Date'])
-
-        min_date = df['Activity Date'].min().date()
-        max_date = df['Activity Date'].max().date()
+    if 'Activity Date' in df.columns and not df.empty:
+        # preprocess_data leaves the frame sorted by date, so the bounds are the first/last rows
+        min_date = df['Activity Date'].iloc[0].date()
+        max_date = df['Activity Date'].iloc[-1].date()
 
         default_start = max(pd.to_datetime("2020-01-01").date(), min_date)
         default_end = max_date
@@ -56,8 +109,20 @@ with st.sidebar:
             st.warning("Start date must be before end date")
             st.stop()
 
-        mask = (df['Activity Date'].dt.date >= start_date) & (df['Activity Date'].dt.date <= end_date)
-        df = df.loc[mask]
+        # Binary search on the sorted dates and slice the rows in between, no per-row comparisons
+        dates = df['Activity Date'].to_numpy()
+        lo = dates.searchsorted(pd.Timestamp(start_date).to_datetime64(), side='left')
+        hi = dates.searchsorted((pd.Timestamp(end_date) + pd.Timedelta(days=1)).to_datetime64(), side='left')
+        df = df.iloc[lo:hi]
+        df.attrs['dataset_key'] = dataset_key(df, start_date, end_date)
+
+    lazy_tabs = st.checkbox("Render only the selected tab", value=True,
+                            help="Faster reruns; uncheck to compute every tab at once.")
+    measure_charts = st.checkbox("Measure chart payloads", value=False,
+                                 help="Report the size of every chart spec sent to the browser.")
+    st.session_state["chart_payloads"] = [] if measure_charts else None
+    st.checkbox("Profile this run", value=st.query_params.get("profile") == "1", key="profile_run",
+                help="Time data loading and every chart section, and save a cProfile of the run.")
 
 
 
@@ -69,11 +134,27 @@ tabs = {
     "🏊 Swimming": swimming,
     "🚴 Cycling": cycling,
     "🕒⛅ Time & Weather": time_weather,
+    "🗺️ Maps": maps,
 }
 
 tab_labels = list(tabs.keys())
-tab_objects = st.tabs(tab_labels)
 
-for tab_obj, tab_label in zip(tab_objects, tab_labels):
-    with tab_obj:
-        tabs[tab_label].render(df)
+if lazy_tabs:
+    # Only the selected section runs its computations on a rerun
+    selected_tab = st.radio("Section", tab_labels, horizontal=True, key="active_tab",
+                            label_visibility="collapsed")
+    with profiling.section(selected_tab):
+        tabs[selected_tab].render(df)
+else:
+    tab_objects = st.tabs(tab_labels)
+    for tab_obj, tab_label in zip(tab_objects, tab_labels):
+        with tab_obj, profiling.section(tab_label):
+            tabs[tab_label].render(df)
+
+if measure_charts:
+    with st.sidebar:
+        payloads = pd.DataFrame(st.session_state["chart_payloads"], columns=['Chart', 'Bytes'])
+        st.caption(f"📦 {len(payloads)} charts, {payloads['Bytes'].sum() / 1024:,.0f} KB of chart specs")
+        st.dataframe(payloads.sort_values('Bytes', ascending=False), hide_index=True)
+
+profiling.finish(CACHE_DIR / "profiles" / "last_run.pstats")
@@ -1,7 +1,8 @@
 import streamlit as st
-import requests
 import time
 
+from strava_client import client
+
 import streamlit as st
 
 CLIENT_ID = st.secrets["CLIENT_ID"]
@@ -16,7 +17,7 @@ def get_auth_url():
     )
 
 def exchange_token(code):
-    response = requests.post("https://www.strava.com/oauth/token", data={
+    response = client.post("https://www.strava.com/oauth/token", data={
         'client_id': CLIENT_ID,
         'client_secret': CLIENT_SECRET,
         'code': code,
@@ -25,7 +26,7 @@ def exchange_token(code):
     return response.json()
 
 def refresh_token(refresh_token):
-    response = requests.post("https://www.strava.com/oauth/token", data={
+    response = client.post("https://www.strava.com/oauth/token", data={
         'client_id': CLIENT_ID,
         'client_secret': CLIENT_SECRET,
         'grant_type': 'refresh_token',
@@ -34,16 +35,15 @@ def refresh_token(refresh_token):
     return response.json()
 
 def authenticate():
-    query_params = st.experimental_get_query_params()
-
     if "access_token" not in st.session_state:
-        if "code" in query_params:
-            tokens = exchange_token(query_params["code"][0])
+        if "code" in st.query_params:
+            tokens = exchange_token(st.query_params["code"])
             if "access_token" in tokens:
                 st.session_state["access_token"] = tokens["access_token"]
                 st.session_state["refresh_token"] = tokens["refresh_token"]
                 st.session_state["expires_at"] = tokens["expires_at"]
-                st.experimental_rerun()
+                st.session_state["athlete_id"] = tokens.get("athlete", {}).get("id")
+                st.rerun()
             else:
                 st.error("Error during authentication.")
         else:
@@ -0,0 +1,109 @@
+import sys
+import types
+
+# A stand-in for the streamlit module so tab code runs without a server. Widgets return the value
+# Streamlit would show on a first run, layout helpers are no-op context managers, st.cache_data
+# does not cache (every stage is measured cold) and charts are serialized to their Vega-Lite
+# spec, which is what the real st.altair_chart spends its time on.
+
+
+class _Block:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def __getattr__(self, name):
+        # st.sidebar.write(...), col1.metric(...) and friends
+        return getattr(sys.modules["streamlit"], name)
+
+
+class StopRender(Exception):
+    pass
+
+
+class _SessionState(dict):
+    __getattr__ = dict.get
+
+    def __setattr__(self, name, value):
+        self[name] = value
+
+
+def _noop(*args, **kwargs):
+    return None
+
+
+def _cache_data(func=None, **kwargs):
+    return func if func is not None else (lambda f: f)
+
+
+def _pick(label, options, index=0, **kwargs):
+    options = list(options)
+    return options[index] if options and index is not None else None
+
+
+def _multiselect(label, options, default=None, **kwargs):
+    return list(default) if default is not None else []
+
+
+def _slider(label, min_value=None, max_value=None, value=None, *args, **kwargs):
+    return value if value is not None else min_value
+
+
+def _number_input(label, min_value=None, max_value=None, value=None, *args, **kwargs):
+    return value if value is not None else (min_value if min_value is not None else 0.0)
+
+
+def _columns(spec, **kwargs):
+    return [_Block() for _ in range(spec if isinstance(spec, int) else len(spec))]
+
+
+def _altair_chart(chart, **kwargs):
+    # Streamlit ships chart data through its own transformer, without Altair's 5000-row limit
+    import altair as alt
+    with alt.data_transformers.disable_max_rows():
+        chart.to_dict()
+
+
+def _stop():
+    raise StopRender()
+
+
+class _Streamlit(types.ModuleType):
+    def __getattr__(self, name):
+        # Text, metric, dataframe and message elements only display things
+        return _noop
+
+
+def install():
+    # Must run before the dashboard modules are imported; returns the stub module
+    st = _Streamlit("streamlit")
+    st.__path__ = []
+    st.cache_data = st.cache_resource = _cache_data
+    st.session_state = _SessionState()
+    st.selectbox = st.radio = _pick
+    st.multiselect = _multiselect
+    st.slider = _slider
+    st.number_input = _number_input
+    st.checkbox = lambda label, value=False, **kwargs: value
+    st.toggle = st.checkbox
+    st.button = lambda *args, **kwargs: False
+    st.text_input = lambda label, value="", **kwargs: value
+    st.columns = _columns
+    st.tabs = lambda labels, **kwargs: [_Block() for _ in labels]
+    st.sidebar = _Block()
+    st.expander = st.spinner = st.container = st.empty = lambda *args, **kwargs: _Block()
+    st.altair_chart = _altair_chart
+    st.stop = _stop
+    components = types.ModuleType("streamlit.components")
+    components.__path__ = []
+    components.v1 = types.ModuleType("streamlit.components.v1")
+    components.v1.html = _noop
+    st.components = components
+    sys.modules.update({
+        "streamlit": st,
+        "streamlit.components": components,
+        "streamlit.components.v1": components.v1,
+    })
+    return st
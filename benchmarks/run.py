@@ -0,0 +1,120 @@
+import argparse
+import gc
+import io
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+import warnings
+from datetime import datetime
+from pathlib import Path
+
+from benchmarks import headless
+
+ROOT = Path(__file__).resolve().parent.parent
+SIZES = (1_000, 10_000, 100_000, 1_000_000)
+RESULTS = ROOT / "benchmarks" / "results.csv"
+# Generated exports are reused between runs; writing a 1M-row CSV takes minutes
+EXPORTS_DIR = ROOT / ".cache" / "benchmarks"
+
+
+def measure(run, setup=lambda: None, repeat=3):
+    # Best wall time of `repeat` runs, then one more under tracemalloc for the peak Python/NumPy
+    # allocation (tracing slows code down, so it is kept out of the timed runs)
+    times = []
+    for _ in range(repeat):
+        arg = setup()
+        gc.collect()
+        start = time.perf_counter()
+        run(arg)
+        times.append(time.perf_counter() - start)
+    arg = setup()
+    gc.collect()
+    tracemalloc.start()
+    run(arg)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return min(times), peak
+
+
+def export_bytes(n, seed):
+    from benchmarks.synthetic import synthetic_export, to_csv_bytes
+    path = EXPORTS_DIR / f"activities-{n}-{seed}.csv"
+    if not path.exists():
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(to_csv_bytes(synthetic_export(n, seed)))
+    return path.read_bytes()
+
+
+def run_size(n, seed, repeat, tabs):
+    import pandas as pd
+    from utils import preprocess_data
+    from data_cache import _read_frame, _write_frame
+    import tabs as dashboard_tabs
+
+    raw = export_bytes(n, seed)
+    read = lambda _: pd.read_csv(io.BytesIO(raw), encoding='latin-1', on_bad_lines='skip')
+    yield "read_csv", measure(read, repeat=repeat)
+
+    export = read(None)
+    yield "preprocess", measure(preprocess_data, lambda: export.copy(), repeat)
+    df = preprocess_data(export.copy())
+
+    with tempfile.TemporaryDirectory() as folder:
+        path = Path(folder) / "frame.feather"
+        yield "frame_cache_write", measure(lambda _: _write_frame(df, path), repeat=repeat)
+        yield "frame_cache_read", measure(lambda _: _read_frame(path), repeat=repeat)
+
+    for name in tabs:
+        render = getattr(dashboard_tabs, name).render
+        # Tabs add helper columns to the frame they get; each run starts from a fresh view
+        yield f"tab:{name}", measure(render, lambda: df.copy(deep=False), repeat)
+
+
+def revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time and memory of the dashboard compute paths")
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(SIZES))
+    parser.add_argument("--tabs", nargs="+", default=["general", "running", "swimming", "cycling",
+                                                      "time_weather", "maps"])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", type=Path, default=RESULTS)
+    args = parser.parse_args()
+
+    # Stream store, tiles and frame caches go to a scratch directory, not the app's .cache
+    os.environ["DASHBOARD_CACHE_DIR"] = tempfile.mkdtemp(prefix="dashboard-bench-")
+    headless.install()
+    # pandas deprecation notices from the tabs would repeat on every run
+    warnings.simplefilter("ignore")
+    sys.path.insert(0, str(ROOT))
+    import pandas as pd
+
+    rows = []
+    meta = {"timestamp": datetime.now().isoformat(timespec="seconds"), "revision": revision(),
+            "python": platform.python_version(), "pandas": pd.__version__}
+    for n in sorted(args.sizes):
+        for stage, (seconds, peak) in run_size(n, args.seed, args.repeat, args.tabs):
+            rows.append({**meta, "activities": n, "stage": stage, "seconds": round(seconds, 4),
+                         "peak_mb": round(peak / 2 ** 20, 1)})
+            print(f"{n:>9,} {stage:<20} {seconds:9.3f} s {peak / 2 ** 20:9.1f} MB", flush=True)
+
+    results = pd.DataFrame(rows)
+    # Appended, so the file keeps a history to compare revisions against
+    results.to_csv(args.output, mode="a", header=not args.output.exists(), index=False)
+    print()
+    print(results.pivot(index="stage", columns="activities", values="seconds").to_string())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+import argparse
+import csv
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# Synthetic Strava exports of any size, resampled from the bundled activities.csv: same columns
+# (duplicate headers included), sport mix, gear, weather and time-of-day habits, on a history that
+# keeps the sample's activities-per-day rate up to MAX_YEARS and gets denser after that.
+SAMPLE = Path(__file__).resolve().parent.parent / "activities.csv"
+MAX_YEARS = 30
+DATE_FORMAT = "%b %d, %Y, %I:%M:%S %p"
+# Epoch-second fields that move with the activity date
+EPOCH_COLUMNS = ['Weather Observation Time', 'Sunrise Time', 'Sunset Time']
+# Scaled together so speeds and paces stay those of the sampled activity
+EFFORT_COLUMNS = ['Elapsed Time', 'Elapsed Time.1', 'Moving Time', 'Distance.1', 'Elevation Gain',
+                  'Elevation Loss', 'Calories', 'Total Work', 'Grade Adjusted Distance', 'Timer Time']
+HEART_RATE_COLUMNS = ['Average Heart Rate', 'Max Heart Rate', 'Max Heart Rate.1']
+
+
+def export_header(path=SAMPLE):
+    # Column names as written in the file; pandas renames repeated ones to 'Distance.1' etc.
+    with open(path, newline='', encoding='latin-1') as f:
+        return next(csv.reader(f))
+
+
+def load_sample(path=SAMPLE):
+    return pd.read_csv(path, encoding='latin-1', on_bad_lines='skip')
+
+
+def synthetic_export(n, seed=0, sample=None):
+    # Raw export frame (as pd.read_csv returns it) with n activities, oldest first
+    sample = load_sample() if sample is None else sample
+    rng = np.random.default_rng(seed)
+    df = sample.iloc[rng.integers(0, len(sample), n)].reset_index(drop=True)
+
+    source = pd.to_datetime(df['Activity Date'], format=DATE_FORMAT, errors='coerce')
+    sample_dates = source.dropna()
+    rate = len(sample) / max((sample_dates.max() - sample_dates.min()).days, 1)
+    days = int(min(n / rate, MAX_YEARS * 365))
+    end = sample_dates.max().normalize()
+    # New calendar day, same time of day as the sampled activity
+    day = end - pd.to_timedelta(np.sort(rng.integers(0, days + 1, n))[::-1], unit='D')
+    dates = day + (source - source.dt.normalize()).fillna(pd.Timedelta(hours=12))
+    order = np.argsort(dates.to_numpy(), kind='stable')
+    df, dates, source = df.iloc[order].reset_index(drop=True), dates.iloc[order].reset_index(drop=True), \
+        source.iloc[order].reset_index(drop=True)
+
+    shift = (dates - source).dt.total_seconds()
+    for column in EPOCH_COLUMNS:
+        if column in df.columns:
+            df[column] = df[column] + shift
+    df['Activity Date'] = dates.dt.strftime(DATE_FORMAT)
+
+    scale = rng.lognormal(0, 0.15, n)
+    for column in EFFORT_COLUMNS:
+        if column in df.columns:
+            df[column] = (pd.to_numeric(df[column], errors='coerce') * scale).round(1)
+    if 'Distance' in df.columns:
+        # The first Distance column is the km string shown on Strava
+        df['Distance'] = (df['Distance.1'] / 1000).round(2).astype(str)
+    for column in HEART_RATE_COLUMNS:
+        if column in df.columns:
+            df[column] = (df[column] + rng.normal(0, 3, n)).round()
+    if 'Weather Temperature' in df.columns:
+        jitter = rng.normal(0, 2, n)
+        df['Weather Temperature'] += jitter
+        if 'Apparent Temperature' in df.columns:
+            df['Apparent Temperature'] += jitter
+
+    ids = int(sample['Activity ID'].max()) + 1 + np.arange(n)
+    df['Activity ID'] = ids
+    if 'Filename' in df.columns:
+        extension = df['Filename'].str.extract(r'(\.[\w.]+)$', expand=False)
+        df['Filename'] = ('activities/' + pd.Series(ids).astype(str) + extension).where(df['Filename'].notna())
+    return df
+
+
+def to_csv_bytes(df, header=None):
+    return df.to_csv(index=False, header=header or export_header()).encode('latin-1', errors='replace')
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Write a synthetic activities.csv")
+    parser.add_argument("activities", type=int)
+    parser.add_argument("output", type=Path)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    args.output.write_bytes(to_csv_bytes(synthetic_export(args.activities, args.seed)))
+
+
+if __name__ == "__main__":
+    main()
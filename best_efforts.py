@@ -0,0 +1,120 @@
+import hashlib
+
+import streamlit as st
+import pandas as pd
+import numpy as np
+
+from stream_store import stream_store
+
+# Effort name -> distance in meters
+EFFORT_DISTANCES = {
+    "400m": 400,
+    "1K": 1000,
+    "1 Mile": 1609.34,
+    "5K": 5000,
+    "10K": 10000,
+    "Half Marathon": 21097.5,
+}
+BOARD_COLUMNS = ['Effort', 'Meters', 'Seconds', 'Start', 'Activity ID', 'Activity Date']
+
+
+def clean_stream(time, distance):
+    # Seconds from the start and a non-decreasing distance, dropping samples missing either
+    distance = np.asarray(distance, dtype=np.float64)
+    keep = ~np.isnat(time) & ~np.isnan(distance)
+    time, distance = time[keep], distance[keep]
+    if len(time) == 0:
+        return np.empty(0), distance
+    seconds = (time - time[0]).astype('timedelta64[s]').astype(np.float64)
+    return seconds, np.maximum.accumulate(distance)
+
+
+def find_best_efforts(time, distance, efforts=EFFORT_DISTANCES):
+    # Fastest segment per target distance. Every sample is a window start; the window end is the
+    # time the athlete reached start + target, interpolated on the sorted distance stream, so the
+    # whole scan is one vectorized pass per target. Seconds is NaN when the run is too short.
+    seconds, distance = clean_stream(time, distance)
+    result = {'distance': [], 'seconds': [], 'start': [], 'end': []}
+    for target in efforts.values():
+        valid = distance + target <= (distance[-1] if len(distance) else 0)
+        best, start, end = np.nan, np.nan, np.nan
+        if valid.any():
+            starts = np.flatnonzero(valid)
+            elapsed = np.interp(distance[starts] + target, distance, seconds) - seconds[starts]
+            i = int(np.argmin(elapsed))
+            best, start, end = elapsed[i], seconds[starts[i]], seconds[starts[i]] + elapsed[i]
+        result['distance'].append(float(target))
+        result['seconds'].append(best)
+        result['start'].append(start)
+        result['end'].append(end)
+    return {name: np.asarray(values, dtype=np.float64) for name, values in result.items()}
+
+
+def activity_efforts(activity_id, store=stream_store):
+    # Per-activity index: scanned once, then read back from the stream store. Existence is checked
+    # first so runs without a track never cost failed reads.
+    efforts = store.load(activity_id, kind="efforts") if store.has(activity_id, "efforts") else None
+    if efforts is None:
+        if not store.has(activity_id):
+            return None
+        track = store.load(activity_id, columns=['time', 'distance'])
+        if track is None:
+            return None
+        efforts = find_best_efforts(track['time'], track['distance'])
+        store.save(activity_id, efforts, kind="efforts")
+    return efforts
+
+
+def top_efforts(board, ids, k=5):
+    # Fastest k per distance among the given runs
+    rows = board[board['Activity ID'].isin(ids)].dropna(subset=['Seconds'])
+    rows = rows.sort_values(['Meters', 'Seconds'], kind='stable')
+    return rows.groupby('Meters', sort=False).head(k).reset_index(drop=True)
+
+
+def efforts_frame(run_df, store=stream_store):
+    names = np.asarray(list(EFFORT_DISTANCES))
+    frames = []
+    for activity_id, date in zip(run_df['Activity ID'], run_df['Activity Date']):
+        efforts = activity_efforts(activity_id, store)
+        if efforts is None:
+            continue
+        frames.append(pd.DataFrame({
+            'Effort': names,
+            'Meters': efforts['distance'],
+            'Seconds': efforts['seconds'],
+            'Start': efforts['start'],
+            'Activity ID': activity_id,
+            'Activity Date': date,
+        }))
+    return pd.concat(frames, ignore_index=True) if frames else None
+
+
+def update_leaderboard(board_id, run_df, store=stream_store):
+    # One board per data source holding the effort rows of every run scanned so far (Seconds is NaN
+    # where a run is too short), written as a single file. After a sync or an import only runs
+    # missing from it are scanned; the date range, gear and k are applied when it is read.
+    saved = store.load(board_id, kind="leaderboard") if store.has(board_id, "leaderboard") else None
+    board = pd.DataFrame(saved)[BOARD_COLUMNS] if saved is not None else None
+    ids = run_df['Activity ID'].to_numpy(dtype=np.int64)
+    new = ~np.isin(ids, board['Activity ID'].to_numpy(dtype=np.int64)) if board is not None \
+        else np.ones(len(ids), dtype=bool)
+    new[new] = [store.has(activity_id) for activity_id in ids[new]]
+    rows = efforts_frame(run_df[new], store) if new.any() else None
+    if rows is not None:
+        board = pd.concat([board, rows], ignore_index=True) if board is not None else rows
+        store.save(board_id, {column: board[column].to_numpy() for column in BOARD_COLUMNS}, kind="leaderboard")
+    return board
+
+
+@st.cache_data(show_spinner=False, max_entries=16)
+def best_effort_leaderboard(key, _run_df, source, revision, k=5):
+    # `key` identifies the filtered runs, `source` the persisted board (one per athlete or data
+    # source) and `revision` is stream_store.revision() so the result is refreshed after an import
+    board_id = hashlib.sha256(f"best-efforts:{source}".encode()).hexdigest()[:24]
+    board = update_leaderboard(board_id, _run_df)
+    if board is None:
+        return pd.DataFrame(columns=BOARD_COLUMNS)
+    board = top_efforts(board, _run_df['Activity ID'], k)
+    board['Pace'] = board['Seconds'] / 60 / (board['Meters'] / 1000)
+    return board
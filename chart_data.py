@@ -0,0 +1,133 @@
+import json
+import math
+import os
+
+import streamlit as st
+import pandas as pd
+import numpy as np
+
+from profiling import section
+
+# Charts get only the columns they encode and pre-aggregated rows, instead of the whole
+# ~90-column frame being serialized into every Vega-Lite spec.
+
+# Points a time-series chart may draw, split across its series; longer series are downsampled
+CHART_POINT_BUDGET = int(os.environ.get("DASHBOARD_CHART_POINTS", 1000))
+
+
+def project(df, *fields):
+    # Columns a chart encodes; fields may carry an Altair type suffix ('Distance:Q')
+    columns = list(dict.fromkeys(field.rsplit(':', 1)[0] for field in fields))
+    return df[columns]
+
+
+def nice_step(low, high, maxbins=20):
+    # Vega-Lite's bin step: a power of ten, divided by 5 or 2 when that still fits maxbins
+    span = high - low
+    if span <= 0:
+        return 1.0
+    step = 10.0 ** round(math.log10(span) - math.ceil(math.log10(maxbins)))
+    while math.ceil(span / step) > maxbins:
+        step *= 10
+    for divisor in (5, 2):
+        if span / (step / divisor) <= maxbins:
+            step /= divisor
+            break
+    return step
+
+
+def binned(df, field, maxbins=20, by=None):
+    # Server-side bin=alt.Bin(maxbins) + count(): one row per non-empty bin (and `by` group, for
+    # stacked histograms) with its start (named like the field), end ('<field> end') and Count.
+    # Encode with bin='binned' + x2.
+    data = df[[field] + ([by] if by else [])].dropna(subset=[field])
+    values = data[field].to_numpy(dtype=float)
+    if len(values) == 0:
+        return pd.DataFrame({field: [], f'{field} end': [], **({by: []} if by else {}), 'Count': []})
+    step = nice_step(values.min(), values.max(), maxbins)
+    start = math.floor(values.min() / step) * step
+    index = np.floor((values - start) / step).astype(np.int64)
+    if by:
+        codes, groups = pd.factorize(data[by])
+        index = index * len(groups) + codes
+    counts = np.bincount(index)
+    cells = np.flatnonzero(counts)
+    bins = cells // len(groups) if by else cells
+    result = {field: start + bins * step, f'{field} end': start + (bins + 1) * step}
+    if by:
+        result[by] = groups[cells % len(groups)]
+    result['Count'] = counts[cells]
+    return pd.DataFrame(result)
+
+
+def lttb(x, y, budget):
+    # Largest-Triangle-Three-Buckets: indices of `budget` points (first and last always kept) that
+    # preserve the visual shape and peaks. Each interior bucket keeps the point forming the largest
+    # triangle with the next bucket's mean and the point kept in the previous bucket. That last term
+    # is sequential, so all buckets are solved at once against the previous bucket's mean first and
+    # then again against the points that pass picked.
+    n = len(x)
+    if budget >= n or budget < 3:
+        return np.arange(n)
+    x, y = np.asarray(x, dtype=float), np.asarray(y, dtype=float)
+    edges = np.linspace(1, n - 1, budget - 1).astype(np.int64)
+    inner_x, inner_y = x[1:-1], y[1:-1]
+    bucket = np.searchsorted(edges, np.arange(1, n - 1), side='right') - 1
+    counts = np.bincount(bucket)
+    mean_x = np.bincount(bucket, weights=inner_x) / counts
+    mean_y = np.bincount(bucket, weights=np.nan_to_num(inner_y)) / counts
+    next_x, next_y = np.r_[mean_x[1:], x[-1]][bucket], np.r_[mean_y[1:], y[-1]][bucket]
+    prev_x, prev_y = np.r_[x[0], mean_x[:-1]], np.r_[y[0], mean_y[:-1]]
+    for _ in range(2):
+        a_x, a_y = prev_x[bucket], prev_y[bucket]
+        area = np.abs((a_x - next_x) * (inner_y - a_y) - (a_x - inner_x) * (next_y - a_y))
+        area = np.where(np.isnan(area), -1, area)
+        # First index of the largest area in every (contiguous) bucket
+        largest = np.flatnonzero(area == np.maximum.reduceat(area, edges[:-1] - 1)[bucket])
+        chosen = largest[np.searchsorted(bucket[largest], np.arange(budget - 2))]
+        prev_x, prev_y = np.r_[x[0], inner_x[chosen[:-1]]], np.r_[y[0], inner_y[chosen[:-1]]]
+    return np.r_[0, chosen + 1, n - 1]
+
+
+def downsample(df, x, y, by=None, budget=CHART_POINT_BUDGET):
+    # Rows of a long-format time series reduced to about `budget` points, shared between its
+    # series: one per `by` group (color) and y column. Each series keeps its own LTTB points and a
+    # row stays when any of its columns needs it. Shorter frames are returned unchanged.
+    y = [y] if isinstance(y, str) else list(y)
+    if len(df) <= budget:
+        return df
+    groups = df.groupby(by, sort=False).indices.values() if by else [np.arange(len(df))]
+    per_series = max(budget // (len(groups) * len(y)), 3)
+    values = df[x].to_numpy()
+    values = values.astype('datetime64[ns]').astype(np.int64) if np.issubdtype(values.dtype, np.datetime64) \
+        else values.astype(float)
+    keep = []
+    for rows in groups:
+        rows = rows[np.argsort(values[rows], kind='stable')]
+        for column in y:
+            keep.append(rows[lttb(values[rows], df[column].to_numpy(dtype=float)[rows], per_series)])
+    return df.iloc[np.unique(np.concatenate(keep))]
+
+
+def chart_title(chart):
+    # Layered charts (scatter + average point...) are often titled in their first layer
+    title = getattr(chart, 'title', None)
+    title = title if isinstance(title, str) else getattr(title, 'text', None)
+    if isinstance(title, str) and title:
+        return title
+    layers = getattr(chart, 'layer', None)
+    return next((t for t in map(chart_title, layers) if t), '') if isinstance(layers, list) else ''
+
+
+def altair_chart(chart, **kwargs):
+    # st.altair_chart that, while payload measurement is on, records each chart's spec + data size.
+    # Serializing the spec is timed as its own section when profiling.
+    payloads = st.session_state.get("chart_payloads")
+    if payloads is not None:
+        payloads.append({
+            'Chart': chart_title(chart),
+            # Periods, dates and intervals reach the browser as strings
+            'Bytes': len(json.dumps(chart.to_dict(), default=str)),
+        })
+    with section(f"Chart: {chart_title(chart) or 'untitled'}"):
+        return st.altair_chart(chart, **kwargs)
@@ -0,0 +1,65 @@
+import streamlit as st
+import pandas as pd
+import numpy as np
+
+MONTH_NAMES = ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec']
+# First day of each month in a leap year, so Feb 29 gets its own slot and every other
+# calendar date lands on the same index whatever the year
+LEAP_MONTH_STARTS = np.cumsum([0, 31, 29, 31, 30, 31, 30, 31, 31, 30, 31, 30])
+
+METRICS = {
+    "Moving Time": ("Moving Time (hrs)", lambda df: df['Moving Time'] / 3600),
+    "Distance": ("Distance (km)", lambda df: df['Distance'] / 1000),
+    "Activities": ("Number of Activities", lambda df: pd.Series(1.0, index=df.index)),
+}
+
+# View -> (period column, sub-period column, full sub-period range)
+VIEWS = {
+    "Yearly (Monthly View)": ('Year', 'Month', range(1, 13)),
+    "Monthly (Weekly View)": ('YearMonth', 'Day', range(1, 32)),
+    "Yearly (Same Date View)": ('Year', 'DayOfYear', range(1, 367)),
+}
+
+
+def day_of_year(dates):
+    # Leap-year day index: Mar 1 is 61 in every year, so dates line up across years
+    return LEAP_MONTH_STARTS[dates.dt.month.to_numpy() - 1] + dates.dt.day.to_numpy()
+
+
+def cumulative_curves(values, periods, sub_periods, selected, sub_range):
+    # One pivot (sub-period x period) and a column-wise cumsum for every selected period at once.
+    # Each curve runs up to its last sub-period with any activity (zero-distance ones included),
+    # so the current year stops today.
+    keep = periods.isin(selected).to_numpy()
+    grouped = values[keep].groupby([sub_periods[keep], periods[keep]])
+    index, columns = pd.Index(sub_range, name='Sub'), selected
+    table = grouped.sum().unstack(fill_value=0.0).reindex(index=index, columns=columns, fill_value=0.0)
+    counts = grouped.size().unstack(fill_value=0).reindex(index=index, columns=columns, fill_value=0)
+    metric = table.to_numpy()
+    cumulative = metric.cumsum(axis=0)
+    active = counts.to_numpy() != 0
+    last = np.where(active.any(axis=0), len(table) - 1 - active[::-1].argmax(axis=0), -1)
+    within = np.arange(len(table))[:, None] <= last[None, :]
+    rows, cols = np.nonzero(within)
+    return pd.DataFrame({
+        'Period': np.asarray(table.columns.astype(str))[cols],
+        'Sub': table.index.to_numpy()[rows],
+        'Metric': metric[rows, cols],
+        'CumulativeMetric': cumulative[rows, cols],
+    })
+
+
+@st.cache_data(show_spinner=False, max_entries=32)
+def cumulative_comparison(key, _df, view, metric, selected):
+    period, sub_period, sub_range = VIEWS[view]
+    if sub_period == 'DayOfYear':
+        sub_periods = pd.Series(day_of_year(_df['Activity Date']), index=_df.index)
+    else:
+        sub_periods = _df[sub_period]
+    curves = cumulative_curves(METRICS[metric][1](_df), _df[period], sub_periods, list(selected), sub_range)
+    if sub_period == 'Month':
+        curves['MonthName'] = np.asarray(MONTH_NAMES)[curves['Sub'] - 1]
+    elif sub_period == 'DayOfYear':
+        # Dates in 2000 (a leap year) so the axis reads as "Mar 01" regardless of the compared years
+        curves['Date'] = pd.Timestamp('2000-01-01') + pd.to_timedelta(curves['Sub'] - 1, unit='D')
+    return curves
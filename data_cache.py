@@ -0,0 +1,97 @@
+import hashlib
+import io
+import os
+from pathlib import Path
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+
+from utils import preprocess_data
+from profiling import section
+
+CACHE_DIR = Path(os.environ.get("DASHBOARD_CACHE_DIR", ".cache"))
+FRAMES_DIR = CACHE_DIR / "frames"
+
+# Bump whenever preprocess_data changes its output so stale frames are not reused
+PREPROCESS_VERSION = 3
+
+# Uploaded exports are evicted (least recently used first) above this size
+UPLOAD_CACHE_MAX_BYTES = int(os.environ.get("DASHBOARD_UPLOAD_CACHE_MB", 512)) * 1024 * 1024
+
+
+def content_key(raw):
+    digest = hashlib.sha256(raw).hexdigest()[:32]
+    return f"{digest}-v{PREPROCESS_VERSION}"
+
+
+def load_activities(raw, pinned=False, max_bytes=UPLOAD_CACHE_MAX_BYTES):
+    # Parse + preprocess a raw CSV export, reusing the columnar copy when the bytes were seen before
+    def build():
+        with section("Parse CSV"):
+            df = pd.read_csv(io.BytesIO(raw), encoding='latin-1', on_bad_lines='skip')
+        with section("Preprocess"):
+            return preprocess_data(df)
+
+    return load_cached_frame(content_key(raw), build, pinned, max_bytes)
+
+
+def load_cached_frame(key, build, pinned=False, max_bytes=UPLOAD_CACHE_MAX_BYTES):
+    folder = FRAMES_DIR / ("pinned" if pinned else "uploads")
+    path = folder / f"{key}.feather"
+
+    with section("Read cached frame"):
+        df = _read_frame(path)
+    if df is None:
+        with section("Build frame"):
+            df = build()
+        with section("Write cached frame"):
+            _write_frame(df, path)
+        if not pinned:
+            evict_uploads(max_bytes, keep=path)
+
+    df.attrs['dataset_key'] = key
+    return df
+
+
+def _read_frame(path):
+    if not path.exists():
+        return None
+    try:
+        table = feather.read_table(path, memory_map=True)
+    except (OSError, pa.ArrowInvalid):
+        path.unlink(missing_ok=True)
+        return None
+    os.utime(path)  # mark as recently used for eviction
+    return table.to_pandas(split_blocks=True)
+
+
+def _write_frame(df, path):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    try:
+        table = pa.Table.from_pandas(df, preserve_index=False)
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        return  # mixed-type columns we can't store; just skip caching this export
+    # Uncompressed so numeric columns can be memory-mapped without decoding
+    tmp = path.with_suffix(".tmp")
+    feather.write_feather(table, tmp, compression="uncompressed")
+    os.replace(tmp, path)
+
+
+def evict_uploads(max_bytes, keep=None):
+    folder = FRAMES_DIR / "uploads"
+    if not folder.exists():
+        return
+    entries = sorted(
+        ((p.stat().st_mtime, p.stat().st_size, p) for p in folder.glob("*.feather")),
+        key=lambda e: e[0],
+    )
+    total = sum(size for _, size, _ in entries)
+    for _, size, p in entries:
+        if total <= max_bytes:
+            break
+        if p == keep:
+            continue
+        p.unlink(missing_ok=True)
+        total -= size
+
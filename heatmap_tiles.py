@@ -0,0 +1,171 @@
+import hashlib
+import json
+import os
+import shutil
+import struct
+import zlib
+from pathlib import Path
+
+import numpy as np
+
+from stream_store import stream_store
+
+# Served by Streamlit at /app/static/... (server.enableStaticServing in .streamlit/config.toml)
+STATIC_DIR = Path(__file__).parent / "static"
+TILES_DIR = STATIC_DIR / "tiles"
+TILE_URL = "app/static/tiles/{folder}/{{z}}/{{x}}/{{y}}.png"
+# Pyramids kept on disk, least recently shown evicted first
+MAX_PYRAMIDS = int(os.environ.get("DASHBOARD_HEATMAP_PYRAMIDS", 8))
+TILE_SIZE = 256
+MIN_ZOOM = 2
+MAX_ZOOM = 15
+MAX_LATITUDE = 85.05112878
+
+# Color ramp for the normalized log count: position -> RGBA
+RAMP_STOPS = np.array([0.0, 0.25, 0.6, 1.0])
+RAMP_COLORS = np.array([
+    [120, 0, 200, 90],
+    [230, 40, 60, 170],
+    [255, 140, 0, 220],
+    [255, 255, 200, 255],
+])
+
+
+def mercator_pixels(lat, lon, zoom):
+    # Global web-mercator pixel coordinates at `zoom` (tile x/y = pixel // TILE_SIZE)
+    scale = TILE_SIZE * 2 ** zoom
+    lat = np.radians(np.clip(lat, -MAX_LATITUDE, MAX_LATITUDE))
+    x = (np.asarray(lon) + 180) / 360 * scale
+    y = (1 - np.log(np.tan(lat) + 1 / np.cos(lat)) / np.pi) / 2 * scale
+    return np.clip(x, 0, scale - 1).astype(np.int64), np.clip(y, 0, scale - 1).astype(np.int64)
+
+
+def pixel_counts(lat, lon, zoom=MAX_ZOOM):
+    # Sparse histogram at the deepest zoom: unique pixel ids (x * width + y) and their counts
+    keep = ~(np.isnan(lat) | np.isnan(lon))
+    x, y = mercator_pixels(lat[keep], lon[keep], zoom)
+    return np.unique(x * (TILE_SIZE << zoom) + y, return_counts=True)
+
+
+def coarsen(pixels, counts, zoom):
+    # Pixel histogram of zoom - 1: every 2x2 block of `zoom` collapses into one pixel
+    width = TILE_SIZE << zoom
+    parents = (pixels // width >> 1) * (width >> 1) + (pixels % width >> 1)
+    parents, inverse = np.unique(parents, return_inverse=True)
+    return parents, np.bincount(inverse, weights=counts).astype(np.int64)
+
+
+def encode_png(rgba):
+    # Minimal RGBA PNG: one IDAT with filter type 0 on every scanline
+    height, width, _ = rgba.shape
+    raw = np.hstack([np.zeros((height, 1), np.uint8), rgba.reshape(height, width * 4)]).tobytes()
+
+    def chunk(kind, data):
+        return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data))
+
+    header = struct.pack(">IIBBBBB", width, height, 8, 6, 0, 0, 0)
+    return b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", header) + chunk(b"IDAT", zlib.compress(raw, 6)) + chunk(b"IEND", b"")
+
+
+def colorize(intensity):
+    # intensity in [0, 1] -> RGBA; zero stays fully transparent
+    rgba = np.stack([np.interp(intensity, RAMP_STOPS, RAMP_COLORS[:, c]) for c in range(4)], axis=-1)
+    rgba[intensity <= 0] = 0
+    return rgba.astype(np.uint8)
+
+
+def write_level(pixels, counts, zoom, folder):
+    # One PNG per tile that has any points; counts are log-scaled against this level's 99th percentile
+    width = TILE_SIZE << zoom
+    x, y = pixels // width, pixels % width
+    top = np.log1p(np.percentile(counts, 99)) or 1.0
+    intensity = np.clip(np.log1p(counts) / top, 0, 1)
+    tiles = (x // TILE_SIZE) * (1 << zoom) + y // TILE_SIZE
+    order = np.argsort(tiles, kind='stable')
+    tiles, x, y, intensity = tiles[order], x[order], y[order], intensity[order]
+    starts = np.flatnonzero(np.r_[True, np.diff(tiles) != 0])
+    for start, end in zip(starts, np.r_[starts[1:], len(tiles)]):
+        tile_x, tile_y = divmod(int(tiles[start]), 1 << zoom)
+        image = np.zeros(TILE_SIZE * TILE_SIZE)
+        image[(y[start:end] % TILE_SIZE) * TILE_SIZE + x[start:end] % TILE_SIZE] = intensity[start:end]
+        path = folder / str(zoom) / str(tile_x) / f"{tile_y}.png"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(encode_png(colorize(image.reshape(TILE_SIZE, TILE_SIZE))))
+    return len(starts)
+
+
+def build_pyramid(lat, lon, folder, min_zoom=MIN_ZOOM, max_zoom=MAX_ZOOM):
+    # Rasterize once at max_zoom, then halve the resolution level by level
+    pixels, counts = pixel_counts(lat, lon, max_zoom)
+    tiles = 0
+    for zoom in range(max_zoom, min_zoom - 1, -1):
+        if len(pixels):
+            tiles += write_level(pixels, counts, zoom, folder)
+        if zoom > min_zoom:
+            pixels, counts = coarsen(pixels, counts, zoom)
+    return tiles
+
+
+def selection_key(activity_ids):
+    ids = np.sort(np.asarray([int(i) for i in activity_ids], dtype=np.int64))
+    return hashlib.sha256(ids.tobytes()).hexdigest()[:24]
+
+
+def tile_folder(sport, activity_ids):
+    # One pyramid per sport and exact selection of activities: sessions and athletes never share
+    # (or overwrite) tiles, and the served URL cannot be guessed without the activity ids
+    return TILES_DIR / f"{sport.lower().replace(' ', '_')}-{selection_key(activity_ids)}"
+
+
+def tile_manifest(folder):
+    path = folder / "manifest.json"
+    if not path.exists():
+        return None
+    os.utime(path)  # mark as recently used for eviction
+    return json.loads(path.read_text())
+
+
+def evict_pyramids(max_pyramids=MAX_PYRAMIDS, keep=None):
+    manifests = sorted(TILES_DIR.glob("*/manifest.json"), key=lambda p: p.stat().st_mtime, reverse=True)
+    for path in manifests[max_pyramids:]:
+        if path.parent != keep:
+            shutil.rmtree(path.parent, ignore_errors=True)
+
+
+def build_sport_tiles(sport, activity_ids, store=stream_store, revision=None):
+    # Rebuild the pyramid of one selection from the stored tracks; skipped when the manifest is current
+    folder = tile_folder(sport, activity_ids)
+    revision = store.revision() if revision is None else revision
+    ids = sorted(int(i) for i in activity_ids)
+    manifest = tile_manifest(folder)
+    if manifest and manifest["revision"] == revision and manifest["selection"] == selection_key(ids):
+        return manifest
+    lats, lons = [], []
+    for activity_id in ids:
+        track = store.load(activity_id, columns=['lat', 'lon'])
+        if track is not None:
+            lats.append(track['lat'])
+            lons.append(track['lon'])
+    lat = np.concatenate(lats) if lats else np.empty(0)
+    lon = np.concatenate(lons) if lons else np.empty(0)
+    tmp = folder.with_name(folder.name + ".tmp")
+    shutil.rmtree(tmp, ignore_errors=True)
+    tmp.mkdir(parents=True)
+    tiles = build_pyramid(lat, lon, tmp)
+    valid = ~(np.isnan(lat) | np.isnan(lon))
+    manifest = {
+        "revision": revision,
+        "activities": len(ids),
+        "selection": selection_key(ids),
+        "points": int(valid.sum()),
+        "tiles": tiles,
+        "bounds": [[float(lat[valid].min()), float(lon[valid].min())],
+                   [float(lat[valid].max()), float(lon[valid].max())]] if valid.any() else None,
+    }
+    (tmp / "manifest.json").write_text(json.dumps(manifest))
+    # Swap the finished pyramid in so the map never sees a half-written one
+    shutil.rmtree(folder, ignore_errors=True)
+    os.replace(tmp, folder)
+    evict_pyramids(keep=folder)
+    return manifest
+
@@ -0,0 +1,125 @@
+import hashlib
+import json
+import os
+import threading
+from urllib.parse import urlencode, urlparse
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+from data_cache import CACHE_DIR
+
+HTTP_CACHE_DIR = CACHE_DIR / "http"
+
+# Headers worth replaying with a cached body; rate-limit headers always come from the fresh 304
+STORED_HEADERS = ("Content-Type", "ETag", "Last-Modified")
+# Only the list endpoints are re-read on every sync. Activity details and streams are fetched once
+# and kept in the SQLite store and the stream store, so caching them here would only duplicate them.
+CACHED_PATHS = ("/athlete", "/athlete/activities")
+# Entries are evicted (least recently used first) above this size
+HTTP_CACHE_MAX_BYTES = int(os.environ.get("DASHBOARD_HTTP_CACHE_MB", 64)) * 1024 * 1024
+
+
+class ResponseCache:
+    # On-disk store of GET responses that carry an ETag or Last-Modified validator. Cached entries
+    # are revalidated with If-None-Match / If-Modified-Since and replayed from disk on 304.
+    # Responses are private to an athlete, so entries are keyed by the athlete id they belong to;
+    # access tokens rotate every few hours and would orphan every entry if they were in the key.
+    def __init__(self, directory=HTTP_CACHE_DIR, max_bytes=HTTP_CACHE_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "uncacheable": 0, "bytes_saved": 0}
+
+    def cacheable(self, url):
+        return urlparse(url).path.rstrip("/").endswith(CACHED_PATHS)
+
+    def key(self, url, params=None, athlete_id=None):
+        query = urlencode(sorted((params or {}).items()))
+        return hashlib.sha256(f"{athlete_id}:{url}?{query}".encode()).hexdigest()
+
+    def _paths(self, key):
+        folder = self.directory / key[:2]
+        return folder / f"{key}.json", folder / f"{key}.body"
+
+    def load(self, key):
+        meta_path, body_path = self._paths(key)
+        try:
+            with open(meta_path) as f:
+                meta = json.load(f)
+            with open(body_path, "rb") as f:
+                body = f.read()
+        except (OSError, ValueError):
+            return None
+        os.utime(meta_path)  # mark as recently used for eviction
+        return meta, body
+
+    def conditional_headers(self, entry):
+        meta, _ = entry
+        headers = {}
+        if meta.get("ETag"):
+            headers["If-None-Match"] = meta["ETag"]
+        if meta.get("Last-Modified"):
+            headers["If-Modified-Since"] = meta["Last-Modified"]
+        return headers
+
+    def save(self, key, response):
+        self._count("misses")
+        meta = {name: response.headers[name] for name in STORED_HEADERS if name in response.headers}
+        if "ETag" not in meta and "Last-Modified" not in meta:
+            self._count("uncacheable")
+            return
+        meta_path, body_path = self._paths(key)
+        meta_path.parent.mkdir(parents=True, exist_ok=True)
+        # Body first, then metadata, each via rename, so readers never see a half-written entry
+        for path, data in ((body_path, response.content), (meta_path, json.dumps(meta).encode())):
+            tmp = path.with_suffix(path.suffix + ".tmp")
+            with open(tmp, "wb") as f:
+                f.write(data)
+            os.replace(tmp, path)
+        self.evict(keep=meta_path)
+
+    def evict(self, keep=None):
+        entries = []
+        for meta_path in self.directory.glob("*/*.json"):
+            body_path = meta_path.with_suffix(".body")
+            try:
+                size = meta_path.stat().st_size + (body_path.stat().st_size if body_path.exists() else 0)
+                entries.append((meta_path.stat().st_mtime, size, meta_path, body_path))
+            except OSError:
+                continue
+        entries.sort(key=lambda e: e[0])
+        total = sum(size for _, size, _, _ in entries)
+        for _, size, meta_path, body_path in entries:
+            if total <= self.max_bytes:
+                break
+            if meta_path == keep:
+                continue
+            meta_path.unlink(missing_ok=True)
+            body_path.unlink(missing_ok=True)
+            total -= size
+
+    def replay(self, entry, response):
+        meta, body = entry
+        cached = requests.Response()
+        cached.status_code = 200
+        cached._content = body
+        cached.headers = CaseInsensitiveDict(meta)
+        cached.headers.update(response.headers)
+        cached.url = response.url
+        cached.request = response.request
+        cached.encoding = "utf-8"
+        self._count("hits")
+        self._count("bytes_saved", len(body))
+        return cached
+
+    def _count(self, name, amount=1):
+        with self._lock:
+            self._stats[name] += amount
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = round(stats["hits"] / lookups, 3) if lookups else 0.0
+        return stats
@@ -0,0 +1,72 @@
+import streamlit as st
+import pandas as pd
+import numpy as np
+
+DISTANCE_CATEGORIES = {
+    "1 Mile": 1.609,
+    "5K": 5,
+    "10K": 10,
+    "Half Marathon": 21.0975,
+    "Marathon": 42.195
+}
+MARGIN_PERCENTAGE = 0.075
+
+
+# Prediction models take broadcastable arrays (km, minutes, target km) and return minutes
+def riegel_predictor(distance, time, target_distance, exponent=1.06):
+    return time * (target_distance / distance) ** exponent
+
+
+def cameron_predictor(distance, time, target_distance):
+    def factor(d):
+        return 13.49681 - 0.000030363 * d * 1000 + 835.7114 / (d * 1000) ** 0.7905
+    return time * (target_distance / distance) * factor(distance) / factor(target_distance)
+
+
+PREDICTORS = {
+    "Riegel": riegel_predictor,
+    "Cameron": cameron_predictor,
+}
+
+
+def assign_bands(distances, categories=DISTANCE_CATEGORIES, margin=MARGIN_PERCENTAGE):
+    # Band index per run (-1 when it is not within ±margin of any category distance)
+    centers = np.asarray(list(categories.values()), dtype=float)
+    inside = np.abs(distances[:, None] - centers[None, :]) <= centers[None, :] * margin
+    return np.where(inside.any(axis=1), inside.argmax(axis=1), -1)
+
+
+def build_performance_index(run_df, categories=DISTANCE_CATEGORIES, margin=MARGIN_PERCENTAGE, k=5):
+    # Top-k fastest runs per distance band, found with a single band assignment and sort
+    bands = assign_bands(run_df['Distance'].to_numpy(dtype=float), categories, margin)
+    ranked = run_df.loc[bands >= 0, ['Activity Date', 'Distance', 'Moving Time', 'Pace']]
+    ranked['Band'] = bands[bands >= 0]
+    ranked = ranked.sort_values(['Band', 'Pace'], kind='stable')
+    top = ranked.groupby('Band').head(k).reset_index(drop=True)
+    top['Category'] = np.asarray(list(categories))[top['Band']]
+    return top
+
+
+def prediction_matrix(top, categories=DISTANCE_CATEGORIES, model="Riegel"):
+    # One broadcast: (performances x 1) against (1 x targets)
+    targets = np.asarray(list(categories.values()), dtype=float)
+    distances = top['Distance'].to_numpy(dtype=float)[:, None]
+    times = top['Moving Time'].to_numpy(dtype=float)[:, None]
+    return PREDICTORS[model](distances, times, targets[None, :])
+
+
+def summarize_predictions(matrix, categories=DISTANCE_CATEGORIES):
+    if matrix.shape[0] == 0:
+        return pd.DataFrame(columns=['Target', 'Mean', 'Min', 'Max'])
+    return pd.DataFrame({
+        'Target': list(categories),
+        'Mean': matrix.mean(axis=0),
+        'Min': matrix.min(axis=0),
+        'Max': matrix.max(axis=0),
+    })
+
+
+@st.cache_data(show_spinner=False, max_entries=32)
+def performance_summary(key, _run_df, model="Riegel", k=5):
+    top = build_performance_index(_run_df, k=k)
+    return top, summarize_predictions(prediction_matrix(top, model=model))
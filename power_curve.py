@@ -0,0 +1,82 @@
+import streamlit as st
+import pandas as pd
+import numpy as np
+
+from stream_store import stream_store
+
+# 1 s to 5 h on a log scale, plus the usual reference durations (5 s, 1/5/20/60 min...)
+DURATIONS = np.unique(np.r_[
+    np.round(np.geomspace(1, 5 * 3600, 48)).astype(np.int64),
+    [5, 15, 30, 60, 120, 300, 600, 1200, 1800, 3600, 7200],
+])
+# Recording gaps up to this many seconds (smart recording) hold the last value; longer gaps are stops
+MAX_GAP_SECONDS = 5
+
+
+def resample_1hz(time, power, max_gap=MAX_GAP_SECONDS):
+    keep = ~np.isnat(time) & ~np.isnan(power)
+    time, power = time[keep], np.asarray(power, dtype=np.float64)[keep]
+    if len(time) == 0:
+        return np.empty(0)
+    seconds = (time - time[0]).astype('timedelta64[s]').astype(np.int64)
+    order = np.argsort(seconds, kind='stable')
+    seconds, power = seconds[order], power[order]
+    grid = np.arange(seconds[-1] + 1)
+    last = np.searchsorted(seconds, grid, side='right') - 1
+    return np.where(grid - seconds[last] <= max_gap, power[last], 0.0)
+
+
+def mean_max_power(power_1hz, durations=DURATIONS):
+    # Best average power for each duration from one prefix sum: max over windows of
+    # (cumsum[i + d] - cumsum[i]) / d. NaN for durations longer than the ride.
+    prefix = np.r_[0.0, np.cumsum(power_1hz)]
+    curve = np.full(len(durations), np.nan)
+    for i, d in enumerate(durations):
+        if d <= len(power_1hz):
+            curve[i] = (prefix[d:] - prefix[:-d]).max() / d
+    return curve
+
+
+def ride_curve(activity_id, store=stream_store):
+    # Per-ride curve, computed once from the power stream and then read back from the store.
+    # Rides without power keep an all-NaN curve, so their track is not read again either.
+    cached = store.load(activity_id, kind="power_curve") if store.has(activity_id, "power_curve") else None
+    if cached is not None and np.array_equal(cached['duration'], DURATIONS):
+        watts = cached['watts']
+    else:
+        if not store.has(activity_id):
+            return None
+        track = store.load(activity_id, columns=['time', 'power'])
+        if track is None:
+            return None
+        watts = mean_max_power(resample_1hz(track['time'], track['power']))
+        store.save(activity_id, {'duration': DURATIONS, 'watts': watts}, kind="power_curve")
+    return None if np.isnan(watts).all() else watts
+
+
+def envelope(curves):
+    # Element-wise max that ignores rides too short for a duration
+    return np.fmax.reduce(np.vstack(curves), axis=0) if len(curves) else np.full(len(DURATIONS), np.nan)
+
+
+@st.cache_data(show_spinner=False, max_entries=16)
+def power_curves(key, _bike_df):
+    # Long frame (Curve, Duration, Watts): the all-time envelope plus one per season (year)
+    curves, years = [], []
+    for activity_id, date in zip(_bike_df['Activity ID'], _bike_df['Activity Date']):
+        watts = ride_curve(activity_id)
+        if watts is not None:
+            curves.append(watts)
+            years.append(date.year)
+    if not curves:
+        return pd.DataFrame(columns=['Curve', 'Duration', 'Watts'])
+    stacked, years = np.vstack(curves), np.asarray(years)
+    envelopes = {"All-time": envelope(stacked)}
+    for year in np.unique(years)[::-1]:
+        envelopes[str(year)] = envelope(stacked[years == year])
+    frame = pd.DataFrame({
+        'Curve': np.repeat(list(envelopes), len(DURATIONS)),
+        'Duration': np.tile(DURATIONS, len(envelopes)),
+        'Watts': np.concatenate(list(envelopes.values())),
+    })
+    return frame.dropna(subset=['Watts'])
@@ -0,0 +1,139 @@
+import cProfile
+import pstats
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+import streamlit as st
+import pandas as pd
+import altair as alt
+
+# Opt-in timing of one script run (sidebar checkbox or ?profile=1). section() times a block and
+# nests inside the open one; checkpoint() starts the next consecutive step of a block without
+# re-indenting it (a tab's chart sections), ending the previous step. Records live in
+# st.session_state["profile"], which is None while profiling is off so both calls cost nothing.
+
+
+def start(enabled):
+    # Called first thing in app.py: resets the records and profiles the whole rerun with cProfile
+    previous = st.session_state.get("profile")
+    if previous is not None and previous["profiler"] is not None:
+        # A run that ended in st.stop() never reached finish()
+        previous["profiler"].disable()
+    if not enabled:
+        st.session_state["profile"] = None
+        return
+    profiler = cProfile.Profile()
+    try:
+        profiler.enable()
+    except ValueError:
+        # Python 3.12+ allows one active profiler per process, e.g. another session's profiled
+        # run; this run then gets section timings only
+        profiler = None
+    st.session_state["profile"] = {"start": time.perf_counter(), "stack": [], "records": [], "profiler": profiler}
+
+
+def _open(profile, name, step=False):
+    parent = profile["stack"][-1] if profile["stack"] else None
+    profile["stack"].append({
+        "Section": f"{parent['Section']} / {name}" if parent else name,
+        "Name": name,
+        "Depth": len(profile["stack"]),
+        "Start": time.perf_counter() - profile["start"],
+        "Children": 0.0,
+        "step": step,
+    })
+
+
+def _close(profile):
+    entry = profile["stack"].pop()
+    seconds = time.perf_counter() - profile["start"] - entry["Start"]
+    profile["records"].append({
+        "Section": entry["Section"], "Name": entry["Name"], "Depth": entry["Depth"],
+        "Start": entry["Start"], "End": entry["Start"] + seconds,
+        "Seconds": seconds, "Self": seconds - entry["Children"],
+    })
+    if profile["stack"]:
+        profile["stack"][-1]["Children"] += seconds
+
+
+def _close_step(profile):
+    if profile["stack"] and profile["stack"][-1]["step"]:
+        _close(profile)
+
+
+@contextmanager
+def section(name):
+    profile = st.session_state.get("profile")
+    if profile is None:
+        yield
+        return
+    _open(profile, name)
+    depth = len(profile["stack"])
+    try:
+        yield
+    finally:
+        # Close the block's last checkpoint step (and anything left open by an exception) first
+        while len(profile["stack"]) > depth:
+            _close(profile)
+        _close(profile)
+
+
+def checkpoint(name):
+    profile = st.session_state.get("profile")
+    if profile is None:
+        return
+    _close_step(profile)
+    _open(profile, name, step=True)
+
+
+def finish(path):
+    # Stops profiling and renders the breakdown of this run at the bottom of the page
+    profile = st.session_state.get("profile")
+    if profile is None:
+        return
+    profiler = profile["profiler"]
+    if profiler is not None:
+        profiler.disable()
+    while profile["stack"]:
+        _close(profile)
+    records = pd.DataFrame(profile["records"])
+    total = time.perf_counter() - profile["start"]
+
+    with st.expander(f"⏱️ Profile: {total:.2f} s for this run", expanded=True):
+        if records.empty:
+            st.caption("No sections were timed.")
+        else:
+            summary = records.groupby(["Section", "Depth"], as_index=False).agg(
+                Calls=("Seconds", "size"), Seconds=("Seconds", "sum"), Self=("Self", "sum"))
+            summary["Share"] = summary["Seconds"] / total
+            st.dataframe(summary.sort_values("Self", ascending=False), hide_index=True,
+                         use_container_width=True,
+                         column_config={"Share": st.column_config.ProgressColumn(min_value=0, max_value=1)})
+
+            # Flame chart: one bar per timed section, children below their parent
+            flame = alt.Chart(records.assign(Start=records["Start"] * 1000, End=records["End"] * 1000)).mark_bar(
+                stroke="white", strokeWidth=0.5
+            ).encode(
+                x=alt.X("Start:Q", title="Milliseconds into the run"),
+                x2="End:Q",
+                y=alt.Y("Depth:O", title=None, axis=None),
+                color=alt.Color("Name:N", legend=None),
+                tooltip=["Section:N", alt.Tooltip("Seconds:Q", format=".3f"), alt.Tooltip("Self:Q", format=".3f")],
+            ).properties(height=40 * (records["Depth"].max() + 1))
+            st.altair_chart(flame, use_container_width=True)
+
+        if profiler is None:
+            st.caption("cProfile was skipped: another profiler was already active in this process.")
+            return
+        path.parent.mkdir(parents=True, exist_ok=True)
+        profiler.dump_stats(path)
+        stats = pstats.Stats(profiler).stats
+        functions = pd.DataFrame(
+            [(f"{func[2]} ({Path(func[0]).name}:{func[1]})", calls, own, cumulative)
+             for func, (_, calls, own, cumulative, _) in stats.items()],
+            columns=["Function", "Calls", "Own seconds", "Cumulative seconds"],
+        ).nlargest(20, "Cumulative seconds")
+        st.caption(f"cProfile of this run, saved to {path}")
+        st.dataframe(functions, hide_index=True, use_container_width=True)
+        st.download_button("💾 Download pstats", path.read_bytes(), file_name=path.name)
@@ -0,0 +1,91 @@
+import threading
+import time
+
+SHORT_WINDOW = 15 * 60
+DAY = 24 * 3600
+
+
+class RateLimited(Exception):
+    def __init__(self, wait):
+        super().__init__(f"Strava rate limit budget exhausted, retry in {wait:.0f}s")
+        self.wait = wait
+
+
+class RateBudget:
+    # Tracks Strava's 15-minute and daily quotas from the X-RateLimit-* / X-ReadRateLimit-*
+    # response headers and spreads the remaining requests over what is left of the window.
+    # Windows reset on the quarter hour and at midnight UTC.
+    def __init__(self, short_limit=100, daily_limit=1000, reserve=0.1, clock=time.time, sleep=time.sleep):
+        self.short_limit = short_limit
+        self.daily_limit = daily_limit
+        self.short_usage = 0
+        self.daily_usage = 0
+        self.reserve = reserve
+        self.clock = clock
+        self.sleep = sleep
+        self.last_request = None
+        self._window = self._windows(clock())
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _windows(now):
+        return int(now // SHORT_WINDOW), int(now // DAY)
+
+    def _roll(self, now):
+        short, day = self._windows(now)
+        if short != self._window[0]:
+            self.short_usage = 0
+        if day != self._window[1]:
+            self.daily_usage = 0
+        self._window = (short, day)
+
+    def update(self, headers):
+        limit = headers.get("X-ReadRateLimit-Limit") or headers.get("X-RateLimit-Limit")
+        usage = headers.get("X-ReadRateLimit-Usage") or headers.get("X-RateLimit-Usage")
+        if not limit or not usage:
+            return
+        with self._lock:
+            self._roll(self.clock())
+            self.short_limit, self.daily_limit = (int(v) for v in limit.split(",")[:2])
+            self.short_usage, self.daily_usage = (int(v) for v in usage.split(",")[:2])
+
+    def wait_time(self):
+        with self._lock:
+            now = self.clock()
+            self._roll(now)
+            usable_daily = int(self.daily_limit * (1 - self.reserve))
+            if self.daily_usage >= usable_daily:
+                return DAY - now % DAY
+
+            usable_short = int(self.short_limit * (1 - self.reserve))
+            remaining = usable_short - self.short_usage
+            left_in_window = SHORT_WINDOW - now % SHORT_WINDOW
+            if remaining <= 0:
+                return left_in_window
+            if self.last_request is None or self.short_usage < usable_short // 2:
+                return 0.0
+            # Past half the window's budget, pace evenly so it lasts until the window resets
+            interval = left_in_window / remaining
+            return max(0.0, self.last_request + interval - now)
+
+    def acquire(self, max_wait=None):
+        wait = self.wait_time()
+        if max_wait is not None and wait > max_wait:
+            raise RateLimited(wait)
+        if wait > 0:
+            self.sleep(wait)
+        with self._lock:
+            self._roll(self.clock())
+            self.short_usage += 1
+            self.daily_usage += 1
+            self.last_request = self.clock()
+
+    def snapshot(self):
+        return {
+            "short_usage": self.short_usage, "short_limit": self.short_limit,
+            "daily_usage": self.daily_usage, "daily_limit": self.daily_limit,
+        }
+
+
+# Strava quotas are per application, so every session in this process shares one budget
+shared_budget = RateBudget()
@@ -0,0 +1,54 @@
+import operator
+
+import pandas as pd
+import numpy as np
+
+# Ride classification rules, checked top to bottom: the first rule whose conditions all hold
+# sets the ride type; rides matching none are DEFAULT_RIDE_TYPE. Conditions are
+# (column, operator, value) over the preprocessed columns plus the derived features below.
+RIDE_RULES = [
+    ('Indoor', [('Trainer', 'eq', True)]),
+    ('Indoor', [('Distance', 'eq', 0)]),
+    ('Indoor', [('Activity Gear', 'matches', r'trainer|rodillo|zwift|indoor')]),
+    ('MTB', [('Dirt Share', 'gt', 0.2)]),
+    ('MTB', [('Activity Gear', 'matches', r'\bmtb\b|mountain')]),
+    ('MTB', [('Elevation/km', 'ge', 25), ('Dirt Share', 'gt', 0.05)]),
+]
+DEFAULT_RIDE_TYPE = 'Road'
+
+OPERATORS = {
+    'eq': operator.eq,
+    'gt': operator.gt,
+    'ge': operator.ge,
+    'lt': operator.lt,
+    'le': operator.le,
+    'matches': lambda column, pattern: column.astype('string').str.contains(pattern, case=False, regex=True),
+}
+
+
+def ride_features(df):
+    # Distances are in meters at preprocessing time
+    features = pd.DataFrame(index=df.index)
+    distance = df['Distance'].where(df['Distance'] > 0)
+    if 'Dirt Distance' in df.columns:
+        features['Dirt Share'] = df['Dirt Distance'].fillna(0) / distance
+    if 'Elevation Gain' in df.columns:
+        features['Elevation/km'] = df['Elevation Gain'] / (distance / 1000)
+    return features
+
+
+def _mask(frame, column, op, value):
+    if column not in frame.columns:
+        return np.zeros(len(frame), dtype=bool)
+    result = OPERATORS[op](frame[column], value)
+    return result.fillna(False).to_numpy(dtype=bool)
+
+
+def classify_rides(df, rules=RIDE_RULES, default=DEFAULT_RIDE_TYPE):
+    frame = pd.concat([df, ride_features(df)], axis=1)
+    conditions = [
+        np.logical_and.reduce([_mask(frame, *condition) for condition in when])
+        for _, when in rules
+    ]
+    categories = np.select(conditions, [category for category, _ in rules], default=default)
+    return pd.Series(categories, index=df.index)
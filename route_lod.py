@@ -0,0 +1,122 @@
+import numpy as np
+
+from stream_store import stream_store
+
+# Douglas-Peucker tolerances in meters, finest first. Simplifications are nested (a point kept
+# at a coarse tolerance is kept at every finer one), so a single level per point stores them all.
+TOLERANCES = (2, 8, 30, 120, 500)
+# Total points shipped to the browser for all overlaid routes
+POINT_BUDGET = 50000
+EARTH_RADIUS_M = 6371008.8
+METERS_PER_PIXEL_Z0 = 2 * np.pi * EARTH_RADIUS_M / 256
+
+
+def local_meters(lat, lon):
+    # Equirectangular projection around the track's mean latitude; fine at route scale
+    phi = np.radians(np.nanmean(lat))
+    return (np.radians(lon) * np.cos(phi) * EARTH_RADIUS_M, np.radians(lat) * EARTH_RADIUS_M)
+
+
+def douglas_peucker(x, y, tolerance):
+    # Boolean keep-mask. All open segments are split in the same pass: every point is assigned to
+    # its segment with searchsorted, distances to the segment chords are computed at once and the
+    # farthest point per segment comes from np.maximum.reduceat.
+    n = len(x)
+    keep = np.zeros(n, dtype=bool)
+    if n == 0:
+        return keep
+    keep[[0, n - 1]] = True
+    while True:
+        anchors = np.flatnonzero(keep)
+        segment = np.searchsorted(anchors, np.arange(n), side='right') - 1
+        segment = np.minimum(segment, len(anchors) - 2) if len(anchors) > 1 else segment
+        start, end = anchors[segment], anchors[np.minimum(segment + 1, len(anchors) - 1)]
+        dx, dy = x[end] - x[start], y[end] - y[start]
+        length = np.hypot(dx, dy)
+        cross = np.abs(dx * (y[start] - y) - dy * (x[start] - x))
+        distance = np.where(length > 0, cross / np.where(length > 0, length, 1),
+                            np.hypot(x - x[start], y - y[start]))
+        distance[keep] = 0
+        bounds = anchors[:-1] if len(anchors) > 1 else anchors
+        farthest = np.maximum.reduceat(distance, bounds)
+        split = farthest > tolerance
+        if not split.any():
+            return keep
+        # Index of the farthest point in every segment that needs a split
+        order = np.lexsort((-distance, segment))
+        first = order[np.searchsorted(segment[order], np.flatnonzero(split))]
+        keep[first] = True
+
+
+def lod_levels(lat, lon, tolerances=TOLERANCES):
+    # Per point: how many tolerances it survives (0 = only in the raw track)
+    valid = ~(np.isnan(lat) | np.isnan(lon))
+    lat, lon = lat[valid], lon[valid]
+    levels = np.zeros(len(lat), dtype=np.int8)
+    if len(lat) < 3:
+        levels[:] = len(tolerances)
+        return lat, lon, levels
+    x, y = local_meters(lat, lon)
+    for level, tolerance in enumerate(tolerances):
+        # Each coarser pass only has to look at the points the finer one kept
+        candidates = np.flatnonzero(levels == level)
+        kept = douglas_peucker(x[candidates], y[candidates], tolerance)
+        levels[candidates[kept]] += 1
+    return lat, lon, levels
+
+
+def route_lod(activity_id, store=stream_store):
+    # Simplified track cached in the stream store: points kept at the finest tolerance and their level
+    cached = store.load(activity_id, kind="lod") if store.has(activity_id, "lod") else None
+    if cached is not None:
+        return cached
+    if not store.has(activity_id):
+        return None
+    track = store.load(activity_id, columns=['lat', 'lon'])
+    if track is None:
+        return None
+    lat, lon, levels = lod_levels(track['lat'], track['lon'])
+    kept = levels > 0
+    lod = {'lat': lat[kept], 'lon': lon[kept], 'level': levels[kept]}
+    store.save(activity_id, lod, kind="lod")
+    return lod
+
+
+def zoom_for_bounds(bounds, width=800, height=550):
+    # Zoom level at which `bounds` ([[south, west], [north, east]]) fits the map viewport
+    (south, west), (north, east) = bounds
+    lat = np.radians((south + north) / 2)
+    span_x = max(np.radians(east - west) * np.cos(lat) * EARTH_RADIUS_M, 1)
+    span_y = max(np.radians(north - south) * EARTH_RADIUS_M, 1)
+    meters_per_pixel = max(span_x / width, span_y / height)
+    return int(np.clip(np.floor(np.log2(METERS_PER_PIXEL_Z0 * np.cos(lat) / meters_per_pixel)), 0, 18))
+
+
+def pick_level(zoom, latitude, level_counts, budget=POINT_BUDGET, tolerances=TOLERANCES):
+    # Coarsest level whose tolerance is still under one screen pixel at `zoom`, made coarser until
+    # the points of all displayed routes fit the budget. level_counts[i] = points at level >= i + 1.
+    pixel = METERS_PER_PIXEL_Z0 * np.cos(np.radians(latitude)) / 2 ** zoom
+    level = 1
+    while level < len(tolerances) and tolerances[level] <= pixel:
+        level += 1
+    while level < len(tolerances) and level_counts[level - 1] > budget:
+        level += 1
+    return level
+
+
+def simplified_routes(activity_ids, zoom=None, budget=POINT_BUDGET, store=stream_store):
+    # [(activity_id, lat, lon)] at one shared level, chosen from the zoom and the number of points
+    lods = [(activity_id, lod) for activity_id in activity_ids
+            if (lod := route_lod(activity_id, store)) is not None and len(lod['lat'])]
+    if not lods:
+        return [], None, None
+    lat = np.concatenate([lod['lat'] for _, lod in lods])
+    lon = np.concatenate([lod['lon'] for _, lod in lods])
+    bounds = [[float(lat.min()), float(lon.min())], [float(lat.max()), float(lon.max())]]
+    zoom = zoom_for_bounds(bounds) if zoom is None else zoom
+    levels = np.concatenate([lod['level'] for _, lod in lods])
+    level_counts = np.bincount(levels, minlength=len(TOLERANCES) + 1)[::-1].cumsum()[::-1][1:]
+    level = pick_level(zoom, (bounds[0][0] + bounds[1][0]) / 2, level_counts, budget)
+    routes = [(activity_id, lod['lat'][lod['level'] >= level], lod['lon'][lod['level'] >= level])
+              for activity_id, lod in lods]
+    return routes, bounds, level
@@ -0,0 +1,90 @@
+import re
+import threading
+import time
+from collections import defaultdict
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from http_cache import ResponseCache
+
+# (connect, read) seconds
+DEFAULT_TIMEOUT = (5, 30)
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+
+def endpoint_name(method, url):
+    # /api/v3/activities/123/streams -> GET /api/v3/activities/{id}/streams
+    path = re.sub(r"/\d+(?=/|$)", "/{id}", urlparse(url).path)
+    return f"{method.upper()} {path}"
+
+
+class StravaClient:
+    # One keep-alive session for every outbound Strava call, with timeouts, retries on
+    # 429/5xx (idempotent methods only, so OAuth codes are never replayed) and per-endpoint stats
+    def __init__(self, pool_size=16, retries=3, backoff=0.5, timeout=DEFAULT_TIMEOUT, cache=None):
+        self.timeout = timeout
+        self.cache = cache
+        self.session = requests.Session()
+        retry = Retry(total=retries, backoff_factor=backoff, status_forcelist=RETRY_STATUSES,
+                      raise_on_status=False)
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size, max_retries=retry)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self._stats = defaultdict(lambda: {"calls": 0, "errors": 0, "seconds": 0.0, "bytes": 0})
+        self._lock = threading.Lock()
+
+    def request(self, method, url, athlete_id=None, **kwargs):
+        # Responses are only cached for callers that say whose data they are (athlete_id)
+        kwargs.setdefault("timeout", self.timeout)
+        key = entry = None
+        if self.cache is not None and athlete_id is not None and method.upper() == "GET" \
+                and self.cache.cacheable(url):
+            key = self.cache.key(url, kwargs.get("params"), athlete_id)
+            entry = self.cache.load(key)
+            if entry is not None:
+                kwargs["headers"] = {**(kwargs.get("headers") or {}), **self.cache.conditional_headers(entry)}
+        start = time.perf_counter()
+        try:
+            response = self.session.request(method, url, **kwargs)
+        except requests.RequestException:
+            self._record(method, url, time.perf_counter() - start, 0, error=True)
+            raise
+        self._record(method, url, time.perf_counter() - start, len(response.content),
+                     error=response.status_code >= 400)
+        if key is not None:
+            if response.status_code == 304 and entry is not None:
+                return self.cache.replay(entry, response)
+            if response.status_code == 200:
+                self.cache.save(key, response)
+        return response
+
+    def get(self, url, **kwargs):
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request("POST", url, **kwargs)
+
+    def _record(self, method, url, seconds, nbytes, error=False):
+        with self._lock:
+            stats = self._stats[endpoint_name(method, url)]
+            stats["calls"] += 1
+            stats["errors"] += int(error)
+            stats["seconds"] += seconds
+            stats["bytes"] += nbytes
+
+    def metrics(self):
+        with self._lock:
+            rows = [{"endpoint": name, **stats,
+                     "avg_ms": round(1000 * stats["seconds"] / stats["calls"], 1) if stats["calls"] else 0.0}
+                    for name, stats in self._stats.items()]
+        return sorted(rows, key=lambda r: r["seconds"], reverse=True)
+
+    def reset_metrics(self):
+        with self._lock:
+            self._stats.clear()
+
+
+client = StravaClient(cache=ResponseCache())
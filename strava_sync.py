@@ -0,0 +1,209 @@
+import json
+import os
+import sqlite3
+from datetime import datetime, timezone
+
+import pandas as pd
+
+from data_cache import CACHE_DIR
+from rate_limit import shared_budget
+from strava_client import client
+
+API_BASE = os.environ.get("STRAVA_API_BASE", "https://www.strava.com/api/v3")
+STORE_DIR = CACHE_DIR / "strava"
+PER_PAGE = 200
+
+# Strava API summary fields -> column names used by the CSV export
+EXPORT_COLUMNS = {
+    'id': 'Activity ID',
+    'start_date': 'Activity Date',
+    'name': 'Activity Name',
+    'sport_type': 'Activity Type',
+    'elapsed_time': 'Elapsed Time',
+    'moving_time': 'Moving Time',
+    'distance': 'Distance.1',
+    'max_speed': 'Max Speed',
+    'average_speed': 'Average Speed',
+    'total_elevation_gain': 'Elevation Gain',
+    'elev_low': 'Elevation Low',
+    'elev_high': 'Elevation High',
+    'average_cadence': 'Average Cadence',
+    'max_heartrate': 'Max Heart Rate',
+    'average_heartrate': 'Average Heart Rate',
+    'average_watts': 'Average Watts',
+    'weighted_average_watts': 'Weighted Average Power',
+    'suffer_score': 'Relative Effort',
+    'gear_id': 'Activity Gear',
+    'commute': 'Commute',
+    'trainer': 'Trainer',
+}
+
+
+class ActivityStore:
+    def __init__(self, path, athlete_id=None):
+        self.path = path
+        # Scopes the HTTP response cache; None (no known athlete) bypasses it
+        self.athlete_id = athlete_id
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS activities (
+                id INTEGER PRIMARY KEY,
+                start_ts INTEGER NOT NULL,
+                payload TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS activities_start_ts ON activities (start_ts);
+            CREATE TABLE IF NOT EXISTS sync_state (
+                key TEXT PRIMARY KEY,
+                value TEXT
+            );
+            CREATE TABLE IF NOT EXISTS activity_details (
+                id INTEGER NOT NULL,
+                kind TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                status INTEGER NOT NULL DEFAULT 200,
+                PRIMARY KEY (id, kind)
+            );
+        """)
+        columns = [row[1] for row in self.conn.execute("PRAGMA table_info(activity_details)")]
+        if "status" not in columns:
+            # Stores created before failed fetches were recorded
+            with self.conn:
+                self.conn.execute("ALTER TABLE activity_details ADD COLUMN status INTEGER NOT NULL DEFAULT 200")
+
+    @classmethod
+    def for_athlete(cls, athlete_id):
+        return cls(str(STORE_DIR / f"athlete_{athlete_id or 'default'}.sqlite3"), athlete_id)
+
+    def upsert(self, activities):
+        rows = [(a['id'], start_ts(a), json.dumps(a)) for a in activities]
+        with self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO activities (id, start_ts, payload) VALUES (?, ?, ?)", rows)
+        return len(rows)
+
+    def get_state(self, key, default=None):
+        row = self.conn.execute("SELECT value FROM sync_state WHERE key = ?", (key,)).fetchone()
+        return json.loads(row[0]) if row else default
+
+    def set_state(self, key, value):
+        with self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO sync_state (key, value) VALUES (?, ?)", (key, json.dumps(value)))
+
+    def cursor(self):
+        # Newest start time seen so far; the next sync only asks for activities after it
+        return self.get_state('cursor', 0)
+
+    def revision(self):
+        count, newest = self.conn.execute("SELECT COUNT(*), MAX(start_ts) FROM activities").fetchone()
+        return f"{count}-{newest}"
+
+    def __len__(self):
+        return self.conn.execute("SELECT COUNT(*) FROM activities").fetchone()[0]
+
+    def activities(self):
+        rows = self.conn.execute("SELECT payload FROM activities ORDER BY start_ts")
+        return [json.loads(payload) for (payload,) in rows]
+
+    def to_frame(self):
+        return activities_to_frame(self.activities())
+
+    def save_detail(self, activity_id, kind, payload, status=200):
+        # A non-200 status records an answer that will not change (payload None), so
+        # missing_details() stops listing the activity
+        with self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO activity_details (id, kind, payload, status) VALUES (?, ?, ?, ?)",
+                (activity_id, kind, json.dumps(payload), status))
+
+    def get_detail(self, activity_id, kind):
+        row = self.conn.execute(
+            "SELECT payload FROM activity_details WHERE id = ? AND kind = ? AND status = 200",
+            (activity_id, kind)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def missing_details(self, kind):
+        rows = self.conn.execute("""
+            SELECT a.id FROM activities a
+            LEFT JOIN activity_details d ON d.id = a.id AND d.kind = ?
+            WHERE d.id IS NULL ORDER BY a.start_ts DESC
+        """, (kind,))
+        return [activity_id for (activity_id,) in rows]
+
+
+def start_ts(activity):
+    started = datetime.strptime(activity['start_date'], "%Y-%m-%dT%H:%M:%SZ")
+    return int(started.replace(tzinfo=timezone.utc).timestamp())
+
+
+def activities_to_frame(activities):
+    df = pd.DataFrame(activities)
+    if df.empty:
+        return df
+    if 'sport_type' not in df.columns:
+        df['sport_type'] = df.get('type')
+    # "WeightTraining" -> "Weight Training", matching the export's activity type names
+    df['sport_type'] = df['sport_type'].str.replace(r'(?<=[a-z])(?=[A-Z])', ' ', regex=True)
+    df = df[[c for c in EXPORT_COLUMNS if c in df.columns]].rename(columns=EXPORT_COLUMNS)
+    df['Activity Date'] = pd.to_datetime(df['Activity Date'], utc=True).dt.tz_convert(None)
+    return df
+
+
+def fetch_page(access_token, page, session=client, base_url=API_BASE, per_page=PER_PAGE,
+               budget=shared_budget, max_wait=None, athlete_id=None, **params):
+    budget.acquire(max_wait)
+    response = session.get(
+        f"{base_url}/athlete/activities",
+        headers={"Authorization": f"Bearer {access_token}"},
+        params={"per_page": per_page, "page": page, **params},
+        athlete_id=athlete_id,
+    )
+    budget.update(response.headers)
+    response.raise_for_status()
+    return response.json()
+
+
+def sync_activities(store, access_token, session=client, base_url=API_BASE, per_page=PER_PAGE,
+                    budget=shared_budget, max_wait=None):
+    # Pull only what is newer than the stored cursor; with `after` Strava returns oldest first,
+    # so the cursor can advance page by page and an interrupted sync resumes where it stopped
+    cursor = store.cursor()
+    page = 1
+    fetched = 0
+    while True:
+        activities = fetch_page(access_token, page, session, base_url, per_page, budget, max_wait,
+                                store.athlete_id, after=cursor)
+        if not activities:
+            break
+        fetched += store.upsert(activities)
+        store.set_state('cursor', max(store.cursor(), max(start_ts(a) for a in activities)))
+        if len(activities) < per_page:
+            break
+        page += 1
+    return fetched
+
+
+def backfill_activities(store, access_token, session=client, base_url=API_BASE, per_page=PER_PAGE,
+                        budget=shared_budget, max_wait=None, max_pages=None):
+    # Walk the full history newest -> oldest below a fixed `before` anchor, checkpointing the last
+    # completed page so an interrupted backfill (or one paused by the rate budget) resumes where
+    # it left off. Anything newer than the anchor is left to the incremental sync.
+    state = store.get_state('backfill')
+    if state is None:
+        anchor = int(datetime.now(timezone.utc).timestamp())
+        state = {'before': anchor, 'page': 0, 'done': False}
+        store.set_state('backfill', state)
+        store.set_state('cursor', max(store.cursor(), anchor))
+
+    pages = 0
+    while not state['done'] and (max_pages is None or pages < max_pages):
+        page = state['page'] + 1
+        activities = fetch_page(access_token, page, session, base_url, per_page, budget, max_wait,
+                                store.athlete_id, before=state['before'])
+        store.upsert(activities)
+        state = {**state, 'page': page, 'done': len(activities) < per_page}
+        store.set_state('backfill', state)
+        pages += 1
+    return state
@@ -0,0 +1,45 @@
+import streamlit as st
+import numpy as np
+
+UNITS = ('day', 'week', 'month')
+
+
+def period_ordinals(dates, unit):
+    # Integer ordinals where consecutive periods differ by exactly 1
+    days = dates.to_numpy().astype('datetime64[D]').astype(np.int64)
+    if unit == 'day':
+        return days
+    if unit == 'week':
+        # 1970-01-01 was a Thursday; shifting by 3 makes weeks start on Monday (ISO weeks)
+        return (days + 3) // 7
+    if unit == 'month':
+        return dates.to_numpy().astype('datetime64[M]').astype(np.int64)
+    raise ValueError(f"Unknown streak unit: {unit}")
+
+
+def run_lengths(ordinals):
+    # Run-length encode the sorted unique ordinals: (longest run, run ending at the latest period)
+    periods = np.unique(ordinals)
+    if len(periods) == 0:
+        return 0, 0
+    breaks = np.flatnonzero(np.diff(periods) != 1)
+    starts = np.r_[0, breaks + 1]
+    ends = np.r_[breaks, len(periods) - 1]
+    lengths = ends - starts + 1
+    return int(lengths.max()), int(lengths[-1])
+
+
+def compute_streaks(df, activity_type=None):
+    if activity_type is not None:
+        df = df[df['Activity Type'] == activity_type]
+    dates = df['Activity Date'].dropna()
+    result = {}
+    for unit in UNITS:
+        longest, current = run_lengths(period_ordinals(dates, unit))
+        result[unit] = {'longest': longest, 'current': current}
+    return result
+
+
+@st.cache_data(show_spinner=False, max_entries=64)
+def streak_summary(key, _df, activity_type=None):
+    return compute_streaks(_df, activity_type)
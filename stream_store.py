@@ -0,0 +1,156 @@
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.feather as feather
+
+from data_cache import CACHE_DIR
+
+STREAMS_DIR = CACHE_DIR / "streams"
+STREAM_CACHE_MAX_BYTES = int(os.environ.get("DASHBOARD_STREAM_CACHE_MB", 256)) * 1024 * 1024
+
+
+class StreamStore:
+    # Per-activity arrays (one Arrow IPC file per activity id and kind, zstd-compressed columns)
+    # behind a bounded in-memory LRU, so reopening a recent activity never touches disk
+    def __init__(self, directory=STREAMS_DIR, max_entries=64, max_bytes=STREAM_CACHE_MAX_BYTES,
+                 compression="zstd"):
+        self.directory = directory
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.compression = compression
+        self._memory = OrderedDict()
+        self._memory_bytes = 0
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "disk_reads": 0, "misses": 0, "writes": 0}
+        # (files, bytes) on disk: scanned once, then kept current by save() and _read()
+        self._disk = None
+
+    def path(self, activity_id, kind="track"):
+        return self.directory / kind / f"{activity_id}.arrow"
+
+    def __contains__(self, activity_id):
+        return self.has(activity_id)
+
+    def has(self, activity_id, kind="track"):
+        return (activity_id, kind) in self._memory or self.path(activity_id, kind).exists()
+
+    def revision(self, kind="track"):
+        # Changes whenever a file of this kind is added or replaced (directory mtime)
+        folder = self.directory / kind
+        return folder.stat().st_mtime_ns if folder.exists() else 0
+
+    def save(self, activity_id, arrays, kind="track"):
+        path = self.path(activity_id, kind)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        table = pa.table({name: np.asarray(values) for name, values in arrays.items()})
+        tmp = path.with_suffix(".tmp")
+        feather.write_feather(table, tmp, compression=self.compression)
+        size = tmp.stat().st_size
+        replaced = _size(path)
+        os.replace(tmp, path)
+        with self._lock:
+            self._stats["writes"] += 1
+            self._count_disk(size - (replaced or 0), 0 if replaced is not None else 1)
+            self._remember((activity_id, kind), dict(arrays))
+
+    def ingest(self, tracks, kind="track"):
+        # A dict or any iterable of (activity_id, arrays) pairs, saved as they arrive; returns the count
+        count = 0
+        for activity_id, arrays in (tracks.items() if isinstance(tracks, dict) else tracks):
+            self.save(activity_id, arrays, kind)
+            count += 1
+        return count
+
+    def load(self, activity_id, kind="track", columns=None):
+        # Dict of NumPy arrays, or None when the activity has no stored streams
+        key = (activity_id, kind)
+        with self._lock:
+            entry = self._memory.get(key)
+            arrays = None if entry is None else entry[0]
+            if entry is not None:
+                self._memory.move_to_end(key)
+                self._stats["hits"] += 1
+        if arrays is None:
+            arrays = self._read(key)
+            if arrays is None:
+                return None
+        return arrays if columns is None else {name: arrays[name] for name in columns if name in arrays}
+
+    def _read(self, key):
+        path = self.path(*key)
+        try:
+            # Mapped rather than read into a buffer; only the column buffers get decompressed
+            table = feather.read_table(path, memory_map=True)
+        except FileNotFoundError:
+            with self._lock:
+                self._stats["misses"] += 1
+            return None
+        except (OSError, pa.ArrowInvalid):
+            size = _size(path)
+            path.unlink(missing_ok=True)
+            with self._lock:
+                self._stats["misses"] += 1
+                if size is not None:
+                    self._count_disk(-size, -1)
+            return None
+        arrays = {name: table.column(name).to_numpy() for name in table.column_names}
+        with self._lock:
+            self._stats["disk_reads"] += 1
+            self._remember(key, arrays)
+        return arrays
+
+    def _remember(self, key, arrays):
+        # Called with the lock held; evicts least recently used entries past either bound
+        nbytes = sum(np.asarray(values).nbytes for values in arrays.values())
+        if key in self._memory:
+            self._memory_bytes -= self._memory.pop(key)[1]
+        self._memory[key] = (arrays, nbytes)
+        self._memory_bytes += nbytes
+        while self._memory and (len(self._memory) > self.max_entries or self._memory_bytes > self.max_bytes):
+            _, (_, evicted) = self._memory.popitem(last=False)
+            self._memory_bytes -= evicted
+
+    def clear_memory(self):
+        with self._lock:
+            self._memory.clear()
+            self._memory_bytes = 0
+
+    def _count_disk(self, nbytes, files):
+        # Called with the lock held; a no-op until the first stats() call has scanned the directory
+        if self._disk is not None:
+            self._disk = (self._disk[0] + files, self._disk[1] + nbytes)
+
+    def _scan_disk(self):
+        files = list(self.directory.glob("*/*.arrow")) if self.directory.exists() else []
+        return len(files), sum(_size(f) or 0 for f in files)
+
+    def stats(self):
+        # Sizes are tracked on every write instead of walking the store on every rerun
+        if self._disk is None:
+            disk = self._scan_disk()
+            with self._lock:
+                if self._disk is None:
+                    self._disk = disk
+        with self._lock:
+            lookups = self._stats["hits"] + self._stats["disk_reads"]
+            return {
+                **self._stats,
+                "hit_rate": round(self._stats["hits"] / lookups, 3) if lookups else 0.0,
+                "entries": len(self._memory),
+                "memory_bytes": self._memory_bytes,
+                "files": self._disk[0],
+                "disk_bytes": self._disk[1],
+            }
+
+
+def _size(path):
+    try:
+        return path.stat().st_size
+    except OSError:
+        return None
+
+
+stream_store = StreamStore()
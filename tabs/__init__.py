@@ -1 +1 @@
-from . import general, running, swimming, cycling, time_weather
+from . import general, running, swimming, cycling, time_weather, maps
@@ -1,6 +1,12 @@
 import streamlit as st
 import pandas as pd
 import altair as alt
+from chart_data import altair_chart, binned, downsample, project
+from profiling import checkpoint
+from utils import dataset_key, iso_week_start
+from streaks import streak_summary
+from power_curve import power_curves
+from stream_store import stream_store
 
 def render(df):
     st.header("Cycling Analysis")
@@ -20,12 +26,17 @@ def render(df):
     if selected_gear != 'All':
         bike_df = bike_df[bike_df['Activity Gear'] == selected_gear]
 
+    ride_types = sorted(bike_df['Ride Type'].dropna().unique())
+    selected_types = st.multiselect("Ride Type", ride_types, default=ride_types)
+    bike_df = bike_df[bike_df['Ride Type'].isin(selected_types)]
 
+
+    checkpoint("Speed, heart rate & totals")
     col1, col2, col3 = st.columns([6, 6, 3])
 
     # Scatter plot of Speed vs Distance (with average point)
     with col1:
-        scatter = alt.Chart(bike_df).mark_circle(color='brown', size=60).encode(
+        scatter = alt.Chart(project(bike_df, 'Speed', 'Distance', 'Average Heart Rate', 'Activity Date')).mark_circle(color='brown', size=60).encode(
             x=alt.X('Speed', title='Speed (km/h)', scale=alt.Scale(domain=[8, bike_df['Speed'].max() + 2])),
             y=alt.Y('Distance', title='Distance (Km)', scale=alt.Scale(domain=[0, bike_df['Distance'].max() + 5])),
             tooltip=['Speed', 'Distance', 'Average Heart Rate', 'Activity Date']
@@ -42,21 +53,21 @@ def render(df):
             x='Speed', y='Distance', tooltip=['Speed', 'Distance']
         )
 
-        st.altair_chart(scatter + avg_point, use_container_width=True)
+        altair_chart(scatter + avg_point, use_container_width=True)
 
     # Histogram of Average Heart Rate
     with col2:
-        hist = alt.Chart(bike_df).mark_bar().encode(
-            x=alt.X('Average Heart Rate:Q', bin=alt.Bin(maxbins=20), title='Heart Rate'),
-            y=alt.Y('count()', title='Total Activities'),
-            color=alt.Color('Average Heart Rate:Q', bin=alt.Bin(maxbins=20),
-                            scale=alt.Scale(scheme='reds'), title='Heart Rate', legend=None)
+        hist = alt.Chart(binned(bike_df, 'Average Heart Rate')).mark_bar().encode(
+            x=alt.X('Average Heart Rate:Q', bin='binned', title='Heart Rate'),
+            x2='Average Heart Rate end:Q',
+            y=alt.Y('Count:Q', title='Total Activities'),
+            color=alt.Color('Average Heart Rate:Q', scale=alt.Scale(scheme='reds'), title='Heart Rate', legend=None)
         ).properties(
             title='Heart Rate Distribution',
             width=400,
             height=400
         )
-        st.altair_chart(hist, use_container_width=True)
+        altair_chart(hist, use_container_width=True)
 
     # Total Summary Stats
     with col3:
@@ -76,6 +87,14 @@ def render(df):
         st.write(f"Paved: {total_paved:.2f} km ({paved_percentage:.1f}%)")
         st.write(f"Dirt: {total_dirt:.2f} km ({dirt_percentage:.1f}%)")
 
+        ride_streaks = streak_summary(dataset_key(df, 'Ride', selected_gear, *selected_types), bike_df)
+        st.write("### Cycling Streaks")
+        st.write(f"🏅 Longest: {ride_streaks['day']['longest']} days, "
+                 f"{ride_streaks['week']['longest']} weeks, {ride_streaks['month']['longest']} months")
+        st.write(f"📌 Current: {ride_streaks['day']['current']} days, "
+                 f"{ride_streaks['week']['current']} weeks, {ride_streaks['month']['current']} months")
+
+    checkpoint("Monthly load & top rides")
     col1, col2, col3 = st.columns([6, 6, 3])
 
     # Monthly Area Chart of Cumulative or Rolling Mean Time
@@ -113,7 +132,7 @@ def render(df):
             y_field = 'Rolling Mean Time'
             title = 'Rolling Mean of Time (3 months)'
 
-        area = alt.Chart(monthly_df).mark_area(
+        area = alt.Chart(project(monthly_df, 'YearMonth', y_field)).mark_area(
             color='brown',
             interpolate='monotone'
         ).encode(
@@ -124,23 +143,22 @@ def render(df):
             width=400,
             height=400
         ).interactive()
-        st.altair_chart(area, use_container_width=True)
+        altair_chart(area, use_container_width=True)
 
     # Distance Histogram
     with col2:
         # distance histogram
-        hist = alt.Chart(bike_df).mark_bar().encode(
-            x=alt.X('Distance:Q', bin=alt.Bin(
-                maxbins=20), title='Distance (Km)'),
-            y=alt.Y('count()', title='Total Activities'),
-            color=alt.Color('Distance:Q', bin=alt.Bin(maxbins=20),
-                            scale=alt.Scale(scheme='browns'), title='Distance', legend=None)
+        hist = alt.Chart(binned(bike_df, 'Distance')).mark_bar().encode(
+            x=alt.X('Distance:Q', bin='binned', title='Distance (Km)'),
+            x2='Distance end:Q',
+            y=alt.Y('Count:Q', title='Total Activities'),
+            color=alt.Color('Distance:Q', scale=alt.Scale(scheme='browns'), title='Distance', legend=None)
         ).properties(
             title='Distance Distribution',
             width=400,
             height=400
         ).interactive()
-        st.altair_chart(hist, use_container_width=True)
+        altair_chart(hist, use_container_width=True)
 
     # Top 3 longest rides and top 3 rides with most elevation
     with col3:
@@ -158,6 +176,7 @@ def render(df):
             st.write(
                 f"**{row['Activity Date'].date()}** - {row['Distance']:.2f} km, {row['Elevation Gain']:.0f} m elevation")
 
+    checkpoint("Weekly distance")
     # Add week column
     bike_df['Week'] = bike_df['Activity Date'].dt.isocalendar().week
     bike_df['Year'] = bike_df['Activity Date'].dt.isocalendar().year
@@ -175,11 +194,11 @@ def render(df):
         window=3, min_periods=1).mean()
 
     # For x-axis, convert Year and Week into a datetime
-    weekly_df['Date'] = pd.to_datetime(
-        weekly_df['YearWeek'] + '1', format='%G%V%u')
+    weekly_df['Date'] = iso_week_start(weekly_df['Year'], weekly_df['Week'])
 
     # Altair chart
-    base = alt.Chart(weekly_df).encode(
+    weekly_points = downsample(project(weekly_df, 'Date', 'Distance', 'RollingMean'), 'Date', ['Distance', 'RollingMean'])
+    base = alt.Chart(weekly_points).encode(
         x=alt.X('Date:T', title='Week'),
     )
 
@@ -205,10 +224,11 @@ def render(df):
         height=400
     ).interactive()
 
-    st.altair_chart(chart, use_container_width=True)
+    altair_chart(chart, use_container_width=True)
 
     st.dataframe(bike_df)
 
+    checkpoint("Gear")
     # Number of km (and days/months/years) for column Activity Gear in bike_df
 
     gear_summary = bike_df.groupby('Activity Gear').agg(
@@ -250,7 +270,7 @@ def render(df):
             stroke=None
         )
 
-        st.altair_chart(gantt_chart, use_container_width=True)
+        altair_chart(gantt_chart, use_container_width=True)
     else:
         st.warning("Activity Gear data is not available in the dataset.")
 
@@ -258,7 +278,7 @@ def render(df):
     # Scatter plot: Max Speed vs Average Speed
     if 'Max Speed' in bike_df.columns:
         st.markdown("### Max Speed vs Average Speed")
-        scatter_speed = alt.Chart(bike_df).mark_circle(size=60, color='teal').encode(
+        scatter_speed = alt.Chart(project(bike_df, 'Speed', 'Max Speed', 'Distance', 'Activity Date')).mark_circle(size=60, color='teal').encode(
             x=alt.X('Speed', title='Average Speed (km/h)'),
             y=alt.Y('Max Speed', title='Max Speed (km/h)'),
             tooltip=['Speed', 'Max Speed', 'Distance', 'Activity Date']
@@ -267,23 +287,14 @@ def render(df):
             height=400,
             title='Max Speed vs Average Speed'
         ).interactive()
-        st.altair_chart(scatter_speed, use_container_width=True)
+        altair_chart(scatter_speed, use_container_width=True)
     else:
         st.info("Max Speed data is not available in the dataset")
 
 
 
-    # Clasificación por tipo de ciclismo
-    def classify_ride(row):
-        if row['Distance'] == 0:
-            return 'Indoor'
-        elif row['Dirt Distance'] > row['Distance'] * 0.2:
-            return 'MTB'
-        else:
-            return 'Road'
-
-    bike_df['Ride Type'] = bike_df.apply(classify_ride, axis=1)
-
+    checkpoint("Ride types")
+    # Ride Type comes from the rule engine in ride_rules, evaluated during preprocessing
     ride_summary = bike_df.groupby('Ride Type').agg(
         Count=('Ride Type', 'size'),
         Total_Distance=('Distance', 'sum'),
@@ -314,7 +325,7 @@ def render(df):
             color='Ride Type:N',
             tooltip=['Ride Type', metric_col]
         ).properties(width=400, height=300)
-        st.altair_chart(bar_chart, use_container_width=True)
+        altair_chart(bar_chart, use_container_width=True)
 
     with col2:
         ride_pie = alt.Chart(ride_summary).mark_arc(innerRadius=50).encode(
@@ -326,8 +337,29 @@ def render(df):
             height=300,
             title='Ride Type Distribution'
         )
-        st.altair_chart(ride_pie, use_container_width=True)
+        altair_chart(ride_pie, use_container_width=True)
 
 
 
 
+
+    checkpoint("Power curve")
+    # Mean-maximal power from the ride power streams in the stream store
+    st.markdown("### ⚡ Power Curve")
+    curves = power_curves(dataset_key(df, 'Ride', selected_gear, *selected_types, stream_store.revision()), bike_df)
+    if curves.empty:
+        st.info("Import activity tracks with power data from the sidebar to see the power curve.")
+    else:
+        seasons = [curve for curve in curves['Curve'].unique() if curve != "All-time"]
+        selected_seasons = st.multiselect("Seasons", seasons, default=seasons[:1])
+        power_chart = alt.Chart(curves[curves['Curve'].isin(["All-time", *selected_seasons])]).mark_line().encode(
+            x=alt.X('Duration:Q', scale=alt.Scale(type='log'), title='Duration (s)'),
+            y=alt.Y('Watts:Q', title='Mean-Maximal Power (W)'),
+            color=alt.Color('Curve:N', title='Curve'),
+            tooltip=['Curve:N', 'Duration:Q', alt.Tooltip('Watts:Q', format='.0f')]
+        ).properties(
+            width=800,
+            height=350,
+            title='Power-Duration Curve'
+        )
+        altair_chart(power_chart, use_container_width=True)
@@ -1,22 +1,31 @@
 import streamlit as st
 import pandas as pd
 import altair as alt
+from chart_data import altair_chart, downsample, project
+from profiling import checkpoint
+from utils import activity_cube, dataset_key, rollup
+from streaks import streak_summary
+from training_load import training_load_history
+from transitions import MODES, transition_summary
+from cumulative import METRICS, MONTH_NAMES, VIEWS, cumulative_comparison
 
 def render(df):
     st.header("General Overview")
 
+    checkpoint("Calendar & sport mix")
     col1, col2 = st.columns([8, 6])
 
     # Heatmap month/week per year
     with col1:
         time_view = st.radio("View by:", ["Month", "Week"], horizontal=True, key="time_view")
+        cube = activity_cube(dataset_key(df), df)
         if time_view == "Week":
-            heatmap_data = df.groupby(['Year', 'Week', 'Activity Type'])['Moving Time'].count().reset_index()
+            heatmap_data = rollup(cube, ['Year', 'Week'])
             title = "Total Activities per Week"
             x_label = "Week"
             x_axis = alt.X("Week:O", title=x_label)
         else:
-            heatmap_data = df.groupby(['Year', 'Month'])['Moving Time'].count().reset_index()
+            heatmap_data = rollup(cube, ['Year', 'Month'])
             month_order = {1: 'Jan', 2: 'Feb', 3: 'Mar', 4: 'Apr', 5: 'May', 6: 'Jun',
                            7: 'Jul', 8: 'Aug', 9: 'Sep', 10: 'Oct', 11: 'Nov', 12: 'Dec'}
             heatmap_data['Month'] = heatmap_data['Month'].map(month_order)
@@ -27,21 +36,20 @@ def render(df):
         heatmap = alt.Chart(heatmap_data).mark_rect().encode(
             x=x_axis,
             y=alt.Y("Year:O", title="Year"),
-            color=alt.Color("Moving Time:Q", scale=alt.Scale(scheme="oranges"), legend=None),
-            tooltip=["Year:O", time_view + ":O", "Moving Time:Q"]
+            color=alt.Color("Count:Q", scale=alt.Scale(scheme="oranges"), legend=None),
+            tooltip=["Year:O", time_view + ":O", alt.Tooltip("Count:Q", title="Activities")]
         ).properties(
             title=title,
             width=600,
             height=400
         )
-        st.altair_chart(heatmap, use_container_width=True)
+        altair_chart(heatmap, use_container_width=True)
 
 
 
     # Pie chart for activity types
     with col2:
-        activity_type_counts = df['Activity Type'].value_counts().reset_index().head(4)
-        activity_type_counts.columns = ['Activity Type', 'Count']
+        activity_type_counts = rollup(cube, 'Activity Type').nlargest(4, 'Count')
         pie_chart = alt.Chart(activity_type_counts).mark_arc(innerRadius=0).encode(
             theta=alt.Theta("Count:Q"),
             color=alt.Color("Activity Type:N", legend=None, scale=alt.Scale(scheme="category10")),
@@ -51,18 +59,16 @@ def render(df):
             height=400,
             title="Activity Types Distribution"
         )
-        st.altair_chart(pie_chart, use_container_width=True)
+        altair_chart(pie_chart, use_container_width=True)
 
 
 
+    checkpoint("Summary & streaks")
     # Summary of activities
     sports = ['Ride', 'Run', 'Swim', 'Weight Training']
-    filtered_df = df[df['Activity Type'].isin(sports)]
-    aggregated_data = filtered_df.groupby('Activity Type').agg(
-        Total_Distance=('Distance', 'sum'),
-        Total_Time=('Moving Time', 'sum'),
-        Count=('Activity Type', 'count'),
-    ).reset_index()
+    aggregated_data = rollup(cube[cube['Activity Type'].isin(sports)], 'Activity Type',
+                             ['Distance', 'Moving_Time', 'Count'])
+    aggregated_data = aggregated_data.rename(columns={'Distance': 'Total_Distance', 'Moving_Time': 'Total_Time'})
     aggregated_data['Total_Distance'] = aggregated_data['Total_Distance'].round(0).astype(int) / 1000
     aggregated_data['Total_Hours'] = (aggregated_data['Total_Time'] / 3600).round(0).astype(int)
 
@@ -74,28 +80,31 @@ def render(df):
             st.write(f"**Total Time:** {row['Total_Hours']} hours")
             st.write(f"**Total Activities:** {row['Count']}")
 
+    all_streaks = streak_summary(dataset_key(df), df)
+    st.markdown(
+        f"🔥 **Any activity streaks** — longest: {all_streaks['day']['longest']} days, "
+        f"{all_streaks['week']['longest']} weeks, {all_streaks['month']['longest']} months · "
+        f"current: {all_streaks['day']['current']} days, {all_streaks['week']['current']} weeks, "
+        f"{all_streaks['month']['current']} months"
+    )
+
 
 
+    checkpoint("Transitions")
     # Activity Transitions Heatmap
     st.subheader("Activity Transitions")
 
-    mode = st.radio("Transition Mode", ["Chronological", "Same Day (No Repeats)"], horizontal=True)
-    
-    if mode == "Chronological":
-        df_sorted = df.sort_values("Activity Date").reset_index(drop=True)
-        df_sorted['Current'] = df_sorted['Activity Type']
-        df_sorted['Next'] = df_sorted['Activity Type'].shift(-1)
-        df_transitions = df_sorted[:-1]
-    else:
-        df_day = df.copy()
-        df_day['Date'] = df_day['Activity Date'].dt.date
-        df_day = df_day.sort_values(['Date', 'Activity Date'])
-        df_day = df_day.drop_duplicates(subset=['Date', 'Activity Type'])
-        df_day['Next'] = df_day.groupby('Date')['Activity Type'].shift(-1)
-        df_day['Current'] = df_day['Activity Type']
-        df_transitions = df_day.dropna(subset=['Next'])
-    
-    transition_counts = df_transitions.groupby(['Current', 'Next']).size().reset_index(name='Count')
+    col1, col2, col3 = st.columns([2, 1, 1])
+    with col1:
+        mode = st.radio("Transition Mode", MODES, horizontal=True)
+    with col2:
+        sequence_length = st.slider("Sequence length", 2, 5, 2, help="Activities per sequence (2 = pairs)")
+    with col3:
+        max_gap = st.number_input("Max gap (hours)", min_value=0, value=0,
+                                  help="Only link activities starting within this many hours (0 = no limit)")
+
+    transition_counts, sequences = transition_summary(
+        dataset_key(df), df, mode, sequence_length - 1, max_gap or None)
     
     heatmap = alt.Chart(transition_counts).mark_rect().encode(
         x=alt.X('Next:N', title='Next Activity'),
@@ -108,31 +117,36 @@ def render(df):
         title="Activity Transition Heatmap"
     )
     
-    st.altair_chart(heatmap, use_container_width=True)
+    altair_chart(heatmap, use_container_width=True)
 
+    # e.g. Ride → Run within 1 hour for brick sessions
+    st.markdown(f"**Most common {sequence_length}-activity sequences**")
+    st.dataframe(sequences.head(15), hide_index=True, use_container_width=True)
 
 
+
+    checkpoint("Activities per day")
     st.subheader("📅 Activities per Day: Distribution & Means")
     col1, col2 = st.columns(2)
 
     # Histogram: Number of days with X activities
     with col1:
         daily_counts = df.groupby(df['Activity Date'].dt.date).size().reset_index(name='Activity Count')
-        hist = alt.Chart(daily_counts).mark_bar().encode(
+        days_per_count = daily_counts['Activity Count'].value_counts().rename_axis(
+            'Activity Count').reset_index(name='Days')
+        hist = alt.Chart(days_per_count).mark_bar().encode(
             x=alt.X('Activity Count:O', title='Number of Activities in a Day'),
-            y=alt.Y('count():Q', title='Number of Days'),
-            tooltip=['Activity Count:O', alt.Tooltip('count():Q', title='Number of Days')]
+            y=alt.Y('Days:Q', title='Number of Days'),
+            tooltip=['Activity Count:O', alt.Tooltip('Days:Q', title='Number of Days')]
         ).properties(
             width=350,
             height=300,
             title="Histogram: Activities per Day"
         )
-        st.altair_chart(hist, use_container_width=True)
+        altair_chart(hist, use_container_width=True)
 
     # Mean activities per day by month and year
     with col2:
-        df['Year'] = df['Activity Date'].dt.year
-        df['Month'] = df['Activity Date'].dt.month
         daily_counts['Year'] = pd.to_datetime(daily_counts['Activity Date']).dt.year
         daily_counts['Month'] = pd.to_datetime(daily_counts['Activity Date']).dt.month
 
@@ -152,7 +166,7 @@ def render(df):
             height=300,
             title="Mean Activities/Day by Month"
         )
-        st.altair_chart(mean_chart, use_container_width=True)
+        altair_chart(mean_chart, use_container_width=True)
 
     # Mean activities per day by week (optional, below the row)
     st.subheader("📊 Mean Activities per Day (by Week)")
@@ -169,13 +183,14 @@ def render(df):
         height=300,
         title="Mean Activities per Day by Week and Year"
     )
-    st.altair_chart(week_chart, use_container_width=True)
+    altair_chart(week_chart, use_container_width=True)
 
 
 
 
 
     
+    checkpoint("Cumulative comparison")
     # Layout: 4 filters in a row
     col1, col2, col3, col4 = st.columns([3, 3, 3, 3])
 
@@ -185,150 +200,110 @@ def render(df):
         selected_activity = st.selectbox("Activity Type", activity_options)
 
     with col2:
-        metric_option = st.radio("Metric", [
-                                 "Moving Time", "Distance", "Activities"], horizontal=True, label_visibility="visible")
+        metric_option = st.radio("Metric", list(METRICS), horizontal=True, label_visibility="visible")
 
     with col3:
-        time_level = st.radio("View", [
-                              "Yearly (Monthly View)", "Monthly (Weekly View)"], horizontal=True, label_visibility="visible")
+        time_level = st.radio("View", list(VIEWS), horizontal=True, label_visibility="visible")
 
     # Apply activity filter
     if selected_activity != 'All':
-        df_filtered = df[df['Activity Type']
-                                    == selected_activity].copy()
+        df_filtered = df[df['Activity Type'] == selected_activity]
     else:
-        df_filtered = df.copy()
-
-    # Apply metric
-    if metric_option == "Moving Time":
-        df_filtered["Metric"] = df_filtered["Moving Time"] / \
-            3600  # Convert to hours
-        y_label = "Moving Time (hrs)"
-    elif metric_option == "Distance":
-        df_filtered["Metric"] = df_filtered["Distance"] / 1000  # Convert to km
-        y_label = "Distance (km)"
-    else:  # Activities
-        df_filtered["Metric"] = 1  # Count activities
-        y_label = "Number of Activities"
+        df_filtered = df
+    y_label = METRICS[metric_option][0]
+    period = VIEWS[time_level][0]
 
     with col4:
-        if time_level == "Yearly (Monthly View)":
-            year_options = sorted(df_filtered['Year'].unique(), reverse=True)
-            selected_values = st.multiselect(
-                "Year(s)", year_options, default=[year_options[0]])
-        else:
-            df_filtered['YearMonthStr'] = df_filtered['Activity Date'].dt.strftime(
-                '%Y-%m')
-            ym_options = sorted(
-                df_filtered['YearMonthStr'].unique(), reverse=True)
-            selected_values = st.multiselect(
-                "Year-Month(s)", ym_options, default=[ym_options[0]])
+        period_options = sorted(df_filtered[period].unique(), reverse=True)
+        selected_values = st.multiselect(
+            "Year-Month(s)" if period == 'YearMonth' else "Year(s)",
+            period_options, default=period_options[:1], format_func=str)
 
-    # Plot generation
-    chart_data = pd.DataFrame()
+    # Plot generation: every selected period comes out of one pivot
+    chart_data = cumulative_comparison(
+        dataset_key(df, selected_activity), df_filtered, time_level, metric_option, tuple(selected_values))
+    color = alt.Color('Period:N', title='Year-Month' if period == 'YearMonth' else 'Year')
 
     if time_level == "Yearly (Monthly View)":
-        for year in selected_values:
-            temp = df_filtered[df_filtered['Year'] == year].copy()
-            monthly = temp.groupby('Month')['Metric'].sum().reset_index()
-            monthly['Month'] = monthly['Month'].astype(int)
-            monthly['MonthName'] = monthly['Month'].apply(lambda x: ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun',
-                                                                     'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec'][x - 1])
-            monthly['Year'] = year
-            monthly['CumulativeMetric'] = monthly['Metric'].cumsum()
-            chart_data = pd.concat([chart_data, monthly])
-
         line = alt.Chart(chart_data).mark_line(point=True).encode(
-            x=alt.X('MonthName:N', sort=['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun',
-                                         'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec'], title='Month'),
+            x=alt.X('MonthName:N', sort=MONTH_NAMES, title='Month'),
             y=alt.Y('CumulativeMetric:Q', title=f'Cumulative {y_label}'),
-            color=alt.Color('Year:N'),
-            tooltip=['Year:N', 'MonthName:N', alt.Tooltip(
+            color=color,
+            tooltip=['Period:N', 'MonthName:N', alt.Tooltip(
                 'CumulativeMetric:Q', title=f'Cumulative {y_label}')]
         )
 
         bars = alt.Chart(chart_data).mark_bar(opacity=0.8).encode(
-            x=alt.X('MonthName:N', sort=['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun',
-                                         'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec'], title='Month'),
+            x=alt.X('MonthName:N', sort=MONTH_NAMES, title='Month'),
             y=alt.Y('Metric:Q', title=f'{y_label}'),
-            color=alt.Color('Year:N'),
-            tooltip=['Year:N', 'MonthName:N', alt.Tooltip(
+            color=color,
+            tooltip=['Period:N', 'MonthName:N', alt.Tooltip(
                 'Metric:Q', title=f'{y_label}')]
         ).properties(
             width=40  # Ajusta el ancho de las barras para que sean colindantes
         )
 
-        st.altair_chart((bars + line).properties(
+        altair_chart((bars + line).properties(
             title=f'{y_label} by Month',
             width=600,
             height=400
         ), use_container_width=True)
 
-    else:  # Monthly (Weekly View)
-        for ym in selected_values:
-            temp = df_filtered[df_filtered['YearMonthStr'] == ym].copy()
-            temp['Day'] = temp['Activity Date'].dt.day
-            daily = temp.groupby('Day')['Metric'].sum().reset_index()
-            daily['YearMonth'] = ym
-            daily['CumulativeMetric'] = daily['Metric'].cumsum()
-            chart_data = pd.concat([chart_data, daily])
-
+    elif time_level == "Monthly (Weekly View)":
         line = alt.Chart(chart_data).mark_line(point=True).encode(
-            x=alt.X('Day:O', title='Day of Month', sort=list(range(1, 32))),
+            x=alt.X('Sub:O', title='Day of Month', sort=list(range(1, 32))),
             y=alt.Y('CumulativeMetric:Q', title=f'Cumulative {y_label}'),
-            color=alt.Color('YearMonth:N'),
-            tooltip=['YearMonth:N', 'Day:O', alt.Tooltip(
+            color=color,
+            tooltip=['Period:N', alt.Tooltip('Sub:O', title='Day'), alt.Tooltip(
                 'CumulativeMetric:Q', title=f'Cumulative {y_label}')]
         )
 
         bars = alt.Chart(chart_data).mark_bar(opacity=0.8).encode(
-            x=alt.X('Day:O', title='Day of Month', sort=list(range(1, 32))),
+            x=alt.X('Sub:O', title='Day of Month', sort=list(range(1, 32))),
             y=alt.Y('Metric:Q', title=f'{y_label}'),
-            color=alt.Color('YearMonth:N'),
-            tooltip=['YearMonth:N', 'Day:O', alt.Tooltip(
+            color=color,
+            tooltip=['Period:N', alt.Tooltip('Sub:O', title='Day'), alt.Tooltip(
                 'Metric:Q', title=f'{y_label}')],
         ).properties(
             width=15  # Ajusta el ancho de las barras para que sean colindantes
         )
 
-        st.altair_chart((bars + line).properties(
+        altair_chart((bars + line).properties(
             title=f'{y_label} by Day',
             width=600,
             height=400
         ), use_container_width=True)
 
+    else:  # Yearly (Same Date View): each year on a shared Jan 1 - Dec 31 axis
+        curves = downsample(project(chart_data, 'Period', 'Date', 'CumulativeMetric'), 'Date', 'CumulativeMetric', by='Period')
+        line = alt.Chart(curves).mark_line().encode(
+            x=alt.X('Date:T', title='Date', axis=alt.Axis(format='%b %d')),
+            y=alt.Y('CumulativeMetric:Q', title=f'Cumulative {y_label}'),
+            color=color,
+            tooltip=['Period:N', alt.Tooltip('Date:T', title='Date', format='%b %d'), alt.Tooltip(
+                'CumulativeMetric:Q', title=f'Cumulative {y_label}')]
+        )
 
+        altair_chart(line.properties(
+            title=f'Cumulative {y_label} by Date',
+            width=600,
+            height=400
+        ), use_container_width=True)
 
 
-    # For each activity calculate a relative effort, and then compute a fitness (CTL), FATIGUE (ATL), and FORM (TSB) score for each activity
-
-
-    # 1. Calculate Relative Effort (TSS-like) for each activity
-    # We'll use a simple formula: Relative Effort = (Moving Time in hours) * (Intensity Factor)
-    # If Intensity Factor is not available, use a proxy (e.g., normalized speed or set to 1)
-    df['Moving Time Hours'] = df['Moving Time'] / 3600
-    if 'Intensity Factor' in df.columns:
-        df['Relative Effort'] = df['Moving Time Hours'] * df['Intensity Factor']
-    else:
-        df['Relative Effort'] = df['Moving Time Hours']  # fallback
 
-    # 2. Compute CTL (Chronic Training Load), ATL (Acute Training Load), and TSB (Training Stress Balance)
-    # Use exponentially weighted moving averages (EWMAs)
-    CTL_DAYS = 42  # typical CTL time constant
-    ATL_DAYS = 7   # typical ATL time constant
 
-    df = df.sort_values('Activity Date')
-    df['CTL'] = df['Relative Effort'].ewm(span=CTL_DAYS, adjust=False).mean()
-    df['ATL'] = df['Relative Effort'].ewm(span=ATL_DAYS, adjust=False).mean()
-    df['TSB'] = df['CTL'] - df['ATL']
+    checkpoint("Training load")
+    # Fitness (CTL), Fatigue (ATL) and Form (TSB) on a daily axis, so the 42/7 time constants are days
+    load_history = training_load_history(dataset_key(df), df, df.attrs.get('source')).reset_index()
 
-    # Optionally, display a chart
     st.subheader("Fitness (CTL), Fatigue (ATL), and Form (TSB) Over Time")
-    chart = alt.Chart(df).mark_line().encode(
-        x=alt.X('Activity Date:T', title='Date'),
+    load_history = downsample(project(load_history, 'Day', 'CTL', 'ATL', 'TSB'), 'Day', ['CTL', 'ATL', 'TSB'])
+    chart = alt.Chart(load_history).mark_line().encode(
+        x=alt.X('Day:T', title='Date'),
         y=alt.Y('value:Q', title='Score'),
         color=alt.Color('variable:N', title='Metric'),
-        tooltip=['Activity Date:T', 'variable:N', 'value:Q']
+        tooltip=['Day:T', 'variable:N', 'value:Q']
     ).transform_fold(
         ['CTL', 'ATL', 'TSB'],
         as_=['variable', 'value']
@@ -336,4 +311,4 @@ def render(df):
         width=700,
         height=350
     )
-    st.altair_chart(chart, use_container_width=True)
+    altair_chart(chart, use_container_width=True)
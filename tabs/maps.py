@@ -0,0 +1,78 @@
+import streamlit as st
+import streamlit.components.v1 as components
+import numpy as np
+import folium
+from heatmap_tiles import MAX_ZOOM, MIN_ZOOM, TILE_URL, build_sport_tiles, tile_folder, tile_manifest
+from route_lod import TOLERANCES, simplified_routes
+from stream_store import stream_store
+from profiling import checkpoint
+
+
+def render(df):
+    st.header("Maps")
+
+    sports = sorted(df['Activity Type'].dropna().unique())
+    sport = st.selectbox("Sport", sports)
+    activity_ids = df.loc[df['Activity Type'] == sport, 'Activity ID']
+    tracked = [activity_id for activity_id in activity_ids if stream_store.has(activity_id)]
+
+    if not tracked:
+        st.info("Import activity tracks from the sidebar to draw the heatmap.")
+        return
+
+    checkpoint("Heatmap")
+    render_heatmap(sport, tracked)
+    checkpoint("Routes")
+    render_routes(tracked)
+
+
+def render_heatmap(sport, tracked):
+    # The heatmap is a pre-rendered tile pyramid: the browser only fetches the PNGs in view
+    st.subheader("Heatmap")
+    # Tiles are keyed by the exact selection, so another date range or filter never reuses them
+    folder = tile_folder(sport, tracked)
+    manifest = tile_manifest(folder)
+    stale = manifest is None or manifest["revision"] != stream_store.revision()
+    if stale:
+        if st.button(f"🔥 Build {sport} heatmap ({len(tracked)} tracks)"):
+            with st.spinner("Rendering heatmap tiles..."):
+                manifest = build_sport_tiles(sport, tracked)
+        elif manifest is not None:
+            st.caption("Showing the heatmap built before the last track import; rebuild it to include new tracks.")
+    if manifest is None or manifest["bounds"] is None:
+        return
+
+    st.caption(f"{manifest['activities']} activities · {manifest['points']:,} GPS points · {manifest['tiles']} tiles")
+    heatmap = folium.Map(tiles="CartoDB dark_matter", control_scale=True)
+    heatmap.fit_bounds(manifest["bounds"])
+    folium.TileLayer(
+        tiles=TILE_URL.format(folder=folder.name) + f"?v={manifest['revision']}",
+        attr="Activity heatmap",
+        name=f"{sport} heatmap",
+        overlay=True,
+        min_zoom=MIN_ZOOM,
+        max_native_zoom=MAX_ZOOM,
+        max_zoom=18,
+    ).add_to(heatmap)
+    components.html(heatmap.get_root().render(), height=550)
+
+
+def render_routes(tracked):
+    # Overlaid routes use one shared level of detail, picked from the zoom that fits them all
+    # and the total point budget, so drawing hundreds of routes stays light
+    st.subheader("Routes")
+    # A slider needs min < max, so a single stored track is simply drawn
+    count = st.slider("Most recent routes", 1, min(len(tracked), 500), min(len(tracked), 50)) \
+        if len(tracked) > 1 else 1
+    routes, bounds, level = simplified_routes(tracked[-count:])
+    if not routes:
+        return
+
+    points = sum(len(lat) for _, lat, _ in routes)
+    st.caption(f"{len(routes)} routes · {points:,} points · {TOLERANCES[level - 1]} m simplification")
+    route_map = folium.Map(tiles="CartoDB positron", control_scale=True)
+    route_map.fit_bounds(bounds)
+    for activity_id, lat, lon in routes:
+        folium.PolyLine(np.column_stack([lat, lon]).tolist(), weight=2, opacity=0.6,
+                        color="#fc4c02", tooltip=str(activity_id)).add_to(route_map)
+    components.html(route_map.get_root().render(), height=550)
@@ -1,7 +1,13 @@
 import streamlit as st
 import pandas as pd
 import altair as alt
-from datetime import datetime, timedelta
+from chart_data import altair_chart, binned, downsample, project
+from profiling import checkpoint
+from utils import dataset_key, iso_week_start
+from streaks import streak_summary
+from performance import PREDICTORS, performance_summary
+from best_efforts import best_effort_leaderboard
+from stream_store import stream_store
 
 
 def render(df):
@@ -18,9 +24,10 @@ def render(df):
     if selected_gear != 'All':
         run_df = run_df[run_df['Activity Gear'] == selected_gear]
 
+    checkpoint("Pace, heart rate & totals")
     col1, col2, col3 = st.columns([6, 6, 3])
     with col1:
-        scatter = alt.Chart(run_df).mark_circle(size=60).encode(
+        scatter = alt.Chart(project(run_df, 'Pace', 'Distance', 'Average Heart Rate', 'Activity Date')).mark_circle(size=60).encode(
             x=alt.X('Pace', title='Pace (min/km)'),
             y=alt.Y('Distance', title='Distance (Km)'),
             color=alt.Color('Average Heart Rate:Q', scale=alt.Scale(scheme='greens'), legend=None),
@@ -30,15 +37,16 @@ def render(df):
         avg_df = pd.DataFrame({'Pace': [run_df['Pace'].mean()], 'Distance': [run_df['Distance'].mean()]})
         avg_point = alt.Chart(avg_df).mark_text(text='✖', fontSize=24, color='darkgreen').encode(
             x='Pace', y='Distance', tooltip=['Pace', 'Distance'])
-        st.altair_chart(scatter + avg_point, use_container_width=True)
+        altair_chart(scatter + avg_point, use_container_width=True)
 
     with col2:
-        hist = alt.Chart(run_df).mark_bar().encode(
-            x=alt.X('Average Heart Rate:Q', bin=alt.Bin(maxbins=20)),
-            y=alt.Y('count()'),
-            color=alt.Color('Average Heart Rate:Q', bin=alt.Bin(maxbins=20), scale=alt.Scale(scheme='reds'), legend=None)
+        hist = alt.Chart(binned(run_df, 'Average Heart Rate')).mark_bar().encode(
+            x=alt.X('Average Heart Rate:Q', bin='binned'),
+            x2='Average Heart Rate end:Q',
+            y=alt.Y('Count:Q'),
+            color=alt.Color('Average Heart Rate:Q', scale=alt.Scale(scheme='reds'), legend=None)
         ).properties(title='Heart Rate Distribution', width=400, height=400)
-        st.altair_chart(hist, use_container_width=True)
+        altair_chart(hist, use_container_width=True)
 
     with col3:
         st.write("### Total Summary")
@@ -48,59 +56,22 @@ def render(df):
         st.write(f"Total Elevation: {run_df['Elevation Gain'].sum():.2f} m")
 
         # Cálculo de rachas
-        run_df['Date'] = run_df['Activity Date'].dt.date
-        run_df['YearWeek'] = run_df['Activity Date'].dt.strftime('%G-%V')
-
-        # Racha de días consecutivos
-        dates = sorted(run_df['Date'].unique())
-        max_day_streak = current_day_streak = 1
-        for i in range(1, len(dates)):
-            if (dates[i] - dates[i - 1]).days == 1:
-                current_day_streak += 1
-                max_day_streak = max(max_day_streak, current_day_streak)
-            else:
-                current_day_streak = 1
-
-        # Racha actual de días
-        today = dates[-1]
-        streak = 1
-        for i in range(len(dates) - 2, -1, -1):
-            if (today - dates[i]).days == streak:
-                streak += 1
-            else:
-                break
-        current_day_streak_live = streak
-
-        # Racha de semanas consecutivas
-        weeks = sorted(run_df['YearWeek'].unique())
-        week_dates = [datetime.strptime(w + '-1', "%G-%V-%u") for w in weeks]
-
-        max_week_streak = current_week_streak = 1
-        for i in range(1, len(week_dates)):
-            if (week_dates[i] - week_dates[i - 1]).days <= 7:
-                current_week_streak += 1
-                max_week_streak = max(max_week_streak, current_week_streak)
-            else:
-                current_week_streak = 1
-
-        streak = 1
-        latest = week_dates[-1]
-        for i in range(len(week_dates) - 2, -1, -1):
-            expected = latest - timedelta(weeks=streak)
-            if week_dates[i] == expected:
-                streak += 1
-            else:
-                break
-        current_week_streak_live = streak
+        run_streaks = streak_summary(dataset_key(df, 'Run', selected_gear), run_df)
+        max_day_streak = run_streaks['day']['longest']
+        current_day_streak_live = run_streaks['day']['current']
+        max_week_streak = run_streaks['week']['longest']
+        current_week_streak_live = run_streaks['week']['current']
 
         st.markdown("### Running Streaks")
         st.write(f"🏅 **Mayor racha de días seguidos corriendo**: {max_day_streak} días")
         st.write(f"📅 **Mayor racha de semanas seguidas corriendo**: {max_week_streak} semanas")
         st.write(f"📌 **Racha actual de días**: {current_day_streak_live} días")
         st.write(f"📆 **Racha actual de semanas**: {current_week_streak_live} semanas")
+        st.write(f"🗓️ **Mayor racha de meses seguidos corriendo**: {run_streaks['month']['longest']} meses")
 
 
     
+    checkpoint("Monthly load & top runs")
     col1, col2, col3 = st.columns([6, 6, 3])
     with col1:
         # Prepare monthly data
@@ -136,7 +107,7 @@ def render(df):
             "View Option:", ["Cumulative", "Rolling Mean"], horizontal=True)
 
         if view_option == "Cumulative":
-            area = alt.Chart(monthly_df).mark_area(
+            area = alt.Chart(project(monthly_df, 'YearMonth', 'Cumulative Time')).mark_area(
                 color='green',
                 interpolate='monotone'
             ).encode(
@@ -149,7 +120,7 @@ def render(df):
                 height=400
             ).interactive()
         else:
-            area = alt.Chart(monthly_df).mark_area(
+            area = alt.Chart(project(monthly_df, 'YearMonth', 'RollingMean Time')).mark_area(
                 color='blue',
                 interpolate='monotone'
             ).encode(
@@ -162,22 +133,21 @@ def render(df):
                 height=400
             ).interactive()
 
-        st.altair_chart(area, use_container_width=True)
+        altair_chart(area, use_container_width=True)
 
     with col2:
         # distance histogram
-        hist = alt.Chart(run_df).mark_bar().encode(
-            x=alt.X('Distance:Q', bin=alt.Bin(
-                maxbins=20), title='Distance (Km)'),
-            y=alt.Y('count()', title='Total Activities'),
-            color=alt.Color('Distance:Q', bin=alt.Bin(maxbins=20),
-                            scale=alt.Scale(scheme='greens'), title='Distance', legend=None)
+        hist = alt.Chart(binned(run_df, 'Distance')).mark_bar().encode(
+            x=alt.X('Distance:Q', bin='binned', title='Distance (Km)'),
+            x2='Distance end:Q',
+            y=alt.Y('Count:Q', title='Total Activities'),
+            color=alt.Color('Distance:Q', scale=alt.Scale(scheme='greens'), title='Distance', legend=None)
         ).properties(
             title='Distance Distribution',
             width=400,
             height=400
         ).interactive()
-        st.altair_chart(hist, use_container_width=True)
+        altair_chart(hist, use_container_width=True)
 
     with col3:
         # Top 3 longest runs and top 3 fastest runs
@@ -194,6 +164,7 @@ def render(df):
             st.write(
                 f"**{row['Activity Date'].date()}** - {row['Distance']:.2f} km, {row['Pace']} min/km")
 
+    checkpoint("Weekly distance")
     # Add week column
     run_df['Week'] = run_df['Activity Date'].dt.isocalendar().week
     run_df['Year'] = run_df['Activity Date'].dt.isocalendar().year
@@ -212,11 +183,11 @@ def render(df):
         window=3, min_periods=1).mean()
 
     # For x-axis, convert Year and Week into a datetime
-    weekly_df['Date'] = pd.to_datetime(weekly_df['Year'].astype(
-        str) + weekly_df['Week'].astype(str) + '1', format='%G%V%u')
+    weekly_df['Date'] = iso_week_start(weekly_df['Year'], weekly_df['Week'])
 
     # Altair chart
-    base = alt.Chart(weekly_df).encode(
+    weekly_points = downsample(project(weekly_df, 'Date', 'Distance', 'RollingMean'), 'Date', ['Distance', 'RollingMean'])
+    base = alt.Chart(weekly_points).encode(
         x=alt.X('Date:T', title='Week'),
     )
 
@@ -242,8 +213,9 @@ def render(df):
         height=400
     ).interactive()
 
-    st.altair_chart(chart, use_container_width=True)
+    altair_chart(chart, use_container_width=True)
 
+    checkpoint("Gear")
     # Number of km (and days/months/years) for column Activity Gear in run_df
 
     gear_summary = run_df.groupby('Activity Gear').agg(
@@ -285,41 +257,22 @@ def render(df):
             stroke=None
         )
 
-        st.altair_chart(gantt_chart, use_container_width=True)
+        altair_chart(gantt_chart, use_container_width=True)
     else:
         st.warning("Activity Gear data is not available in the dataset.")
 
 
+    checkpoint("Performances & predictions")
     col1, col2 = st.columns([6, 6])
 
-    distance_categories = {
-        "1 Mile": 1.609,
-        "5K": 5,
-        "10K": 10,
-        "Half Marathon": 21.0975,
-        "Marathon": 42.195
-    }
-    margin_percentage = 0.075
-
-    def riegel_predictor(distance, time, target_distance):
-        return time * (target_distance / distance) ** 1.06
+    model = st.radio("Prediction model", list(PREDICTORS), horizontal=True)
+    top_performances, predictions = performance_summary(dataset_key(df, 'Run', selected_gear), run_df, model)
 
     with col1:
         st.markdown("### 🏁 Top Real Performances")
-        for category_name, base_dist in distance_categories.items():
-            margin = base_dist * margin_percentage
-            lower_bound = base_dist - margin
-            upper_bound = base_dist + margin
-
-            filtered = run_df[(run_df['Distance'] >= lower_bound) & (run_df['Distance'] <= upper_bound)].copy()
-            filtered.sort_values('Pace', inplace=True)
-            top_5 = filtered.head(5)
-
-            if top_5.empty:
-                continue
-
-            st.markdown(f"#### {category_name}")
-            medals = ["🥇", "🥈", "🥉", "4️⃣", "5️⃣"]
+        medals = ["🥇", "🥈", "🥉", "4️⃣", "5️⃣"]
+        for _, top_5 in top_performances.groupby('Band', sort=True):
+            st.markdown(f"#### {top_5['Category'].iloc[0]}")
             for i, (_, row) in enumerate(top_5.iterrows()):
                 emoji = medals[i] if i < len(medals) else ""
                 st.write(
@@ -327,40 +280,31 @@ def render(df):
                     f"{row['Pace']} min/km, {row['Moving Time']:.2f} min"
                 )
 
-    # Compute Riegel predictions only once for all categories
+    # Predictions for every target from every top performance, computed in one broadcast
     with col2:
-        st.markdown("### 🔮 Riegel Predictions from Top 5")
-        all_predictions = {key: [] for key in distance_categories.keys()}
-
-        for base_name, base_dist in distance_categories.items():
-            margin = base_dist * margin_percentage
-            lower = base_dist - margin
-            upper = base_dist + margin
-
-            filtered = run_df[(run_df['Distance'] >= lower) & (run_df['Distance'] <= upper)].copy()
-            filtered.sort_values('Pace', inplace=True)
-            top_5 = filtered.head(5)
-
-            for _, row in top_5.iterrows():
-                time = row['Moving Time']
-                dist = row['Distance']
-                for target_name, target_dist in distance_categories.items():
-                    pred = riegel_predictor(dist, time, target_dist)
-                    all_predictions[target_name].append(pred)
-
+        st.markdown(f"### 🔮 {model} Predictions from Top 5")
         st.markdown("### Predictions:")
-        for target_name in distance_categories.keys():
-            preds = all_predictions[target_name]
-            if len(preds) == 0:
-                continue
-            avg_pred = sum(preds) / len(preds)
-            min_pred = min(preds)
-            max_pred = max(preds)
+        for _, row in predictions.iterrows():
             st.write(
-                f"**{target_name}**:\n"
-                f"{avg_pred:.2f} min _(range: {min_pred:.2f}–{max_pred:.2f})_"
+                f"**{row['Target']}**:\n"
+                f"{row['Mean']:.2f} min _(range: {row['Min']:.2f}–{row['Max']:.2f})_"
             )
 
+    checkpoint("Best efforts")
+    # Fastest segments inside any run, from the GPS streams imported into the stream store
+    st.markdown("### ⚡ Best Efforts")
+    efforts = best_effort_leaderboard(dataset_key(df, 'Run', selected_gear), run_df, df.attrs.get('source'),
+                                      stream_store.revision(), k=3)
+    if efforts.empty:
+        st.info("Import activity tracks from the sidebar to find best efforts inside longer runs.")
+    else:
+        efforts['Time'] = pd.to_datetime(efforts['Seconds'], unit='s').dt.strftime('%H:%M:%S')
+        efforts['Pace (min/km)'] = efforts['Pace'].round(2)
+        efforts['Date'] = efforts['Activity Date'].dt.date
+        efforts['Rank'] = efforts.groupby('Effort', sort=False).cumcount() + 1
+        st.dataframe(efforts[['Effort', 'Rank', 'Time', 'Pace (min/km)', 'Date']],
+                     hide_index=True, use_container_width=True)
+
 
 
 
@@ -368,7 +312,7 @@ def render(df):
     col1, col2 = st.columns([6, 6])
 
     with col1:
-        scatter = alt.Chart(run_df).mark_circle(size=60).encode(
+        scatter = alt.Chart(project(run_df, 'Distance', 'Elevation Gain', 'Average Heart Rate', 'Activity Date')).mark_circle(size=60).encode(
             x=alt.X('Distance', title='Distance (Km)', scale=alt.Scale(
                 domain=[0, run_df['Distance'].max() + 5])),
             y=alt.Y('Elevation Gain', title='Elevation Gain (m)', scale=alt.Scale(
@@ -383,19 +327,18 @@ def render(df):
             height=400
         ).interactive()
 
-        st.altair_chart(scatter, use_container_width=True)
+        altair_chart(scatter, use_container_width=True)
 
     with col2:
-        hist = alt.Chart(run_df).mark_bar().encode(
-            x=alt.X('Elevation Gain:Q', bin=alt.Bin(
-                maxbins=20), title='Elevation Gain (m)'),
-            y=alt.Y('count()', title='Total Activities'),
-            color=alt.Color('Elevation Gain:Q', bin=alt.Bin(maxbins=20),
-                            scale=alt.Scale(scheme='plasma'), title='Elevation Gain', legend=None)
+        hist = alt.Chart(binned(run_df, 'Elevation Gain')).mark_bar().encode(
+            x=alt.X('Elevation Gain:Q', bin='binned', title='Elevation Gain (m)'),
+            x2='Elevation Gain end:Q',
+            y=alt.Y('Count:Q', title='Total Activities'),
+            color=alt.Color('Elevation Gain:Q', scale=alt.Scale(scheme='plasma'), title='Elevation Gain', legend=None)
         ).properties(
             title='Elevation Gain Distribution',
             width=400,
             height=400
         ).interactive()
 
-        st.altair_chart(hist, use_container_width=True)
\ No newline at end of file
+        altair_chart(hist, use_container_width=True)
\ No newline at end of file
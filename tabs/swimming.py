@@ -1,6 +1,10 @@
 import streamlit as st
 import pandas as pd
 import altair as alt
+from chart_data import altair_chart, binned, downsample, project
+from profiling import checkpoint
+from utils import dataset_key, iso_week_start
+from streaks import streak_summary
 
 def render(df):
     st.header("Swimming Analysis")
@@ -10,9 +14,10 @@ def render(df):
     swim_df['Pace'] = (swim_df['Moving Time'] / (swim_df['Distance'] * 10)).round(2)
     swim_df['Average Heart Rate'].fillna(swim_df['Average Heart Rate'].rolling(5, min_periods=1).mean(), inplace=True)
 
+    checkpoint("Pace, heart rate & totals")
     col1, col2, col3 = st.columns([6, 6, 3])
     with col1:
-        scatter = alt.Chart(swim_df).mark_circle(size=60).encode(
+        scatter = alt.Chart(project(swim_df, 'Pace', 'Distance', 'Average Heart Rate', 'Activity Date')).mark_circle(size=60).encode(
             x=alt.X('Pace', title='Pace (min/100m)'),
             y=alt.Y('Distance', title='Distance (Km)'),
             color=alt.Color('Average Heart Rate:Q', scale=alt.Scale(scheme='blues'), legend=None),
@@ -22,15 +27,16 @@ def render(df):
         avg_df = pd.DataFrame({'Pace': [swim_df['Pace'].mean()], 'Distance': [swim_df['Distance'].mean()]})
         avg_point = alt.Chart(avg_df).mark_text(text='✖', fontSize=24, color='darkblue').encode(
             x='Pace', y='Distance', tooltip=['Pace', 'Distance'])
-        st.altair_chart(scatter + avg_point, use_container_width=True)
+        altair_chart(scatter + avg_point, use_container_width=True)
 
     with col2:
-        hist = alt.Chart(swim_df).mark_bar().encode(
-            x=alt.X('Average Heart Rate:Q', bin=alt.Bin(maxbins=20)),
-            y=alt.Y('count()'),
-            color=alt.Color('Average Heart Rate:Q', bin=alt.Bin(maxbins=20), scale=alt.Scale(scheme='reds'), legend=None)
+        hist = alt.Chart(binned(swim_df, 'Average Heart Rate')).mark_bar().encode(
+            x=alt.X('Average Heart Rate:Q', bin='binned'),
+            x2='Average Heart Rate end:Q',
+            y=alt.Y('Count:Q'),
+            color=alt.Color('Average Heart Rate:Q', scale=alt.Scale(scheme='reds'), legend=None)
         ).properties(title='Heart Rate Distribution', width=400, height=400)
-        st.altair_chart(hist, use_container_width=True)
+        altair_chart(hist, use_container_width=True)
 
     with col3:
         st.write("### Total Summary")
@@ -40,9 +46,10 @@ def render(df):
 
 
 
+    checkpoint("Pace & streaks")
     col1, col2, col3 = st.columns([6, 6, 3])
     with col1:
-        scatter = alt.Chart(swim_df).mark_circle(size=60).encode(
+        scatter = alt.Chart(project(swim_df, 'Pace', 'Distance', 'Average Heart Rate', 'Activity Date')).mark_circle(size=60).encode(
             x=alt.X('Pace', title='Pace (min/km)', scale=alt.Scale(
                 domain=[swim_df['Pace'].min()-0.5, swim_df['Pace'].max()+0.5])),
             y=alt.Y('Distance', title='Distance (Km)', scale=alt.Scale(
@@ -71,22 +78,21 @@ def render(df):
         )
 
         chart = scatter + avg_point
-        st.altair_chart(chart, use_container_width=True)
+        altair_chart(chart, use_container_width=True)
 
     with col2:
-        hist = alt.Chart(swim_df).mark_bar().encode(
-            x=alt.X('Average Heart Rate:Q', bin=alt.Bin(
-                maxbins=20), title='Heart Rate'),
-            y=alt.Y('count()', title='Total Activities'),
-            color=alt.Color('Average Heart Rate:Q', bin=alt.Bin(maxbins=20),
-                            scale=alt.Scale(scheme='reds'), title='Heart Rate', legend=None)
+        hist = alt.Chart(binned(swim_df, 'Average Heart Rate')).mark_bar().encode(
+            x=alt.X('Average Heart Rate:Q', bin='binned', title='Heart Rate'),
+            x2='Average Heart Rate end:Q',
+            y=alt.Y('Count:Q', title='Total Activities'),
+            color=alt.Color('Average Heart Rate:Q', scale=alt.Scale(scheme='reds'), title='Heart Rate', legend=None)
         ).properties(
             title='Heart Rate Distribution',
             width=400,
             height=400
         )
 
-        st.altair_chart(hist, use_container_width=True)
+        altair_chart(hist, use_container_width=True)
 
     with col3:
         st.write("### Total Summary")
@@ -97,6 +103,14 @@ def render(df):
         st.write(f"Total Distance: {total_distance:.2f} km")
         st.write(f"Total Time: {total_time:.2f} hours")
 
+        swim_streaks = streak_summary(dataset_key(df, 'Swim'), swim_df)
+        st.write("### Swimming Streaks")
+        st.write(f"🏅 Longest: {swim_streaks['day']['longest']} days, "
+                 f"{swim_streaks['week']['longest']} weeks, {swim_streaks['month']['longest']} months")
+        st.write(f"📌 Current: {swim_streaks['day']['current']} days, "
+                 f"{swim_streaks['week']['current']} weeks, {swim_streaks['month']['current']} months")
+
+    checkpoint("Monthly load & top swims")
     col1, col2, col3 = st.columns([6, 6, 3])
     with col1:
         monthly_df = swim_df.groupby('YearMonth').agg({
@@ -109,7 +123,7 @@ def render(df):
         monthly_df['Cumulative Distance'] = monthly_df['Distance'].cumsum()
         monthly_df['Cumulative Time'] = monthly_df['Moving Time'].cumsum()
 
-        area = alt.Chart(monthly_df).mark_area(
+        area = alt.Chart(project(monthly_df, 'YearMonth', 'Cumulative Time')).mark_area(
             color='lightblue',
             interpolate='monotone'
         ).encode(
@@ -120,16 +134,15 @@ def render(df):
             width=400,
             height=400
         ).interactive()
-        st.altair_chart(area, use_container_width=True)
+        altair_chart(area, use_container_width=True)
 
     with col2:
         # distance histogram
-        hist = alt.Chart(swim_df).mark_bar().encode(
-            x=alt.X('Distance:Q', bin=alt.Bin(
-                maxbins=20), title='Distance (Km)'),
-            y=alt.Y('count()', title='Total Activities'),
-            color=alt.Color('Distance:Q', bin=alt.Bin(maxbins=20),
-                            scale=alt.Scale(scheme='blues'), title='Distance', legend=None)
+        hist = alt.Chart(binned(swim_df, 'Distance')).mark_bar().encode(
+            x=alt.X('Distance:Q', bin='binned', title='Distance (Km)'),
+            x2='Distance end:Q',
+            y=alt.Y('Count:Q', title='Total Activities'),
+            color=alt.Color('Distance:Q', scale=alt.Scale(scheme='blues'), title='Distance', legend=None)
         ).properties(
             title='Distance Distribution',
             width=400,
@@ -148,6 +161,7 @@ def render(df):
             st.write(
                 f"**{row['Activity Date'].date()}** - {row['Distance']:.2f} km, {row['Pace']:.2f} min/100m")
 
+    checkpoint("Weekly distance")
     # Add week column
     swim_df['Week'] = swim_df['Activity Date'].dt.isocalendar().week
     swim_df['Year'] = swim_df['Activity Date'].dt.isocalendar().year
@@ -166,11 +180,11 @@ def render(df):
         window=3, min_periods=1).mean()
 
     # For x-axis, convert Year and Week into a datetime
-    weekly_df['Date'] = pd.to_datetime(weekly_df['Year'].astype(
-        str) + weekly_df['Week'].astype(str) + '1', format='%G%V%u')
+    weekly_df['Date'] = iso_week_start(weekly_df['Year'], weekly_df['Week'])
 
     # Altair chart
-    base = alt.Chart(weekly_df).encode(
+    weekly_points = downsample(project(weekly_df, 'Date', 'Distance', 'RollingMean'), 'Date', ['Distance', 'RollingMean'])
+    base = alt.Chart(weekly_points).encode(
         x=alt.X('Date:T', title='Week'),
     )
 
@@ -195,4 +209,4 @@ def render(df):
         width=500,
         height=400
     ).interactive()
-    st.altair_chart(chart, use_container_width=True)
\ No newline at end of file
+    altair_chart(chart, use_container_width=True)
\ No newline at end of file
@@ -1,6 +1,9 @@
 import streamlit as st
 import pandas as pd
 import altair as alt
+from chart_data import altair_chart, binned
+from profiling import checkpoint
+from utils import activity_cube, dataset_key, rollup
 from datetime import datetime, timedelta
 
 def render(df):
@@ -19,6 +22,7 @@ def render(df):
         6: '❄️ Snowy'
     }
 
+    checkpoint("Filters & metrics")
     # --- Add Filters ---
     filter_cols = st.columns(2)
     with filter_cols[0]:
@@ -36,6 +40,8 @@ def render(df):
             default=list(month_map.keys())
         )
 
+    cube = activity_cube(dataset_key(df), df)
+
     # Apply filters
     if 'DayOfWeek' in df.columns:
         df = df[df['DayOfWeek'].isin(day_filter)]
@@ -46,11 +52,13 @@ def render(df):
     col1, col2, col3, col4 = st.columns(4)
     with col1:
         if 'Hour' in df.columns:
-            avg_hour = int(df['Hour'].mean())
+            by_hour = rollup(cube, 'Hour', days=day_filter, months=month_filter)
+            avg_hour = int((by_hour['Hour'] * by_hour['Count']).sum() / by_hour['Count'].sum())
             st.metric("Most Common Hour", f"{avg_hour}:00")
     with col2:
         if 'DayOfWeek' in df.columns:
-            most_common_day = df['DayOfWeek'].mode()[0]
+            by_day = rollup(cube, 'DayOfWeek', days=day_filter, months=month_filter)
+            most_common_day = by_day.loc[by_day['Count'].idxmax(), 'DayOfWeek']
             st.metric("Most Active Day", dow_map[most_common_day])
     with col3:
         if 'Weather Condition' in df.columns:
@@ -60,47 +68,52 @@ def render(df):
             st.metric("Most Frequent Weather", top_weather)
     with col4:
         if 'Activity Type' in df.columns:
-            top_activity = df['Activity Type'].mode()[0]
+            by_type = rollup(cube, 'Activity Type', days=day_filter, months=month_filter)
+            top_activity = by_type.loc[by_type['Count'].idxmax(), 'Activity Type']
             st.metric("Top Activity", top_activity)
 
     st.markdown("---")
 
+    checkpoint("Hour & weekday distribution")
     # Hourly Activity Distribution
     col1, col2 = st.columns(2)
     with col1:
         if 'Hour' in df.columns:
-            chart = alt.Chart(df).mark_bar().encode(
+            hour_data = rollup(cube, ['Hour', 'Activity Type'], days=day_filter, months=month_filter)
+            chart = alt.Chart(hour_data).mark_bar().encode(
                 x=alt.X('Hour:O', title='Hour of Day'),
-                y=alt.Y('count()', title='Number of Activities'),
+                y=alt.Y('Count:Q', title='Number of Activities'),
                 color=alt.Color('Activity Type:N', legend=None),
-                tooltip=['Hour:O', 'count()']
+                tooltip=['Hour:O', 'Activity Type:N', 'Count:Q']
             ).properties(
                 title='Activity Start Times',
                 width=400,
                 height=400
             ).interactive()
-            st.altair_chart(chart, use_container_width=True)
+            altair_chart(chart, use_container_width=True)
         else:
             st.warning("No hour data available.")
 
     with col2:
         if 'DayOfWeek' in df.columns:
-            df['DayOfWeekStr'] = df['DayOfWeek'].map(lambda x: dow_map[x])
-            dow_chart = alt.Chart(df).mark_bar().encode(
+            dow_data = rollup(cube, ['DayOfWeek', 'Activity Type'], days=day_filter, months=month_filter)
+            dow_data['DayOfWeekStr'] = dow_data['DayOfWeek'].map(lambda x: dow_map[x])
+            dow_chart = alt.Chart(dow_data).mark_bar().encode(
                 x=alt.X('DayOfWeekStr:N', title='Day of Week', sort=dow_map),
-                y=alt.Y('count()', title='Number of Activities'),
+                y=alt.Y('Count:Q', title='Number of Activities'),
                 color=alt.Color('Activity Type:N', legend=None),
-                tooltip=['DayOfWeekStr:N', 'count()']
+                tooltip=['DayOfWeekStr:N', 'Activity Type:N', 'Count:Q']
             ).properties(
                 title='Activity Frequency by Day',
                 width=400,
                 height=400
             ).interactive()
-            st.altair_chart(dow_chart, use_container_width=True)
+            altair_chart(dow_chart, use_container_width=True)
 
+    checkpoint("Month heatmaps")
     # Heatmap: Month vs Weekday Number of Activities
     if 'Month' in df.columns and 'DayOfWeek' in df.columns:
-        heatmap_data = df.groupby(['Month', 'DayOfWeek']).size().reset_index(name='Count')
+        heatmap_data = rollup(cube, ['Month', 'DayOfWeek'], days=day_filter, months=month_filter)
         heatmap_data['MonthStr'] = heatmap_data['Month'].map(month_map)
         heatmap_data['DayOfWeekStr'] = heatmap_data['DayOfWeek'].map(lambda x: dow_map[x])
         heatmap = alt.Chart(heatmap_data).mark_rect().encode(
@@ -113,11 +126,11 @@ def render(df):
             width=600,
             height=400
         )
-        st.altair_chart(heatmap, use_container_width=True)
+        altair_chart(heatmap, use_container_width=True)
 
     # Heatmap: Month vs Hour of Day
     if 'Month' in df.columns and 'Hour' in df.columns:
-        heatmap_data = df.groupby(['Month', 'Hour']).size().reset_index(name='Count')
+        heatmap_data = rollup(cube, ['Month', 'Hour'], days=day_filter, months=month_filter)
         heatmap_data['MonthStr'] = heatmap_data['Month'].map(month_map)
         heatmap = alt.Chart(heatmap_data).mark_rect().encode(
             x=alt.X('Hour:O', title='Hour of Day'),
@@ -129,21 +142,31 @@ def render(df):
             width=600,
             height=400
         )
-        st.altair_chart(heatmap, use_container_width=True)
+        altair_chart(heatmap, use_container_width=True)
 
+    checkpoint("Favorite times")
     # Favorite hour, day, month for top 5 sports
     if 'Activity Type' in df.columns:
-        top_sports = df['Activity Type'].value_counts().head(5).index.tolist()
+        by_type = rollup(cube, 'Activity Type', days=day_filter, months=month_filter)
+        top_sports = by_type.nlargest(5, 'Count')['Activity Type'].tolist()
         st.markdown("### Favorite Hour, Day, and Month for Top 5 Sports")
+
+        def favorite(dim):
+            # Most frequent value of `dim` per sport (ties -> smallest value, like Series.mode)
+            counts = rollup(cube, ['Activity Type', dim], days=day_filter, months=month_filter)
+            counts = counts.sort_values(['Activity Type', 'Count', dim], ascending=[True, False, True])
+            return counts.drop_duplicates('Activity Type').set_index('Activity Type')[dim]
+
+        favorite_hours, favorite_days, favorite_months = favorite('Hour'), favorite('DayOfWeek'), favorite('Month')
         for sport in top_sports:
-            sport_df = df[df['Activity Type'] == sport]
-            favorite_hour = sport_df['Hour'].mode()[0] if 'Hour' in sport_df.columns and not sport_df['Hour'].empty else None
-            favorite_day = sport_df['DayOfWeek'].mode()[0] if 'DayOfWeek' in sport_df.columns and not sport_df['DayOfWeek'].empty else None
-            favorite_month = sport_df['Month'].mode()[0] if 'Month' in sport_df.columns and not sport_df['Month'].empty else None
+            favorite_hour = favorite_hours.get(sport)
+            favorite_day = favorite_days.get(sport)
+            favorite_month = favorite_months.get(sport)
             favorite_day_str = dow_map[favorite_day] if favorite_day is not None else None
             favorite_month_str = month_map[favorite_month] if favorite_month is not None else None
             st.write(f"**{sport}:** Favorite Hour: {favorite_hour}:00, Favorite Day: {favorite_day_str}, Favorite Month: {favorite_month_str}")
 
+    checkpoint("Hourly by weather")
     # Hourly Activity Distribution by Weather Condition
     if 'Hour' in df.columns and 'Weather Condition' in df.columns:
         df['Weather Condition Label'] = df['Weather Condition'].map(weather_map).fillna('Unknown')
@@ -158,8 +181,9 @@ def render(df):
             width=600,
             height=400
         )
-        st.altair_chart(hourly_weather_chart, use_container_width=True)
+        altair_chart(hourly_weather_chart, use_container_width=True)
 
+    checkpoint("Monthly temperature")
     # Monthly Activity Count vs Average Temperature
     if 'Month' in df.columns and 'Weather Temperature' in df.columns and 'Activity Type' in df.columns:
         monthly_activity_temp = df.groupby('Month').agg(
@@ -184,26 +208,30 @@ def render(df):
             tooltip=['MonthStr', 'Avg_Temperature']
         )
 
-        st.altair_chart(activity_temp_chart + temp_line, use_container_width=True)
+        altair_chart(activity_temp_chart + temp_line, use_container_width=True)
 
+    checkpoint("Sunrise impact")
     # Sunrise Impact
     if 'Hour' in df.columns and 'Weather Sunrise' in df.columns:
         try:
             df['Sunrise Impact'] = df['Hour'] - pd.to_datetime(df['Weather Sunrise']).dt.hour
-            sunrise_impact_chart = alt.Chart(df).mark_bar().encode(
-                x=alt.X('Sunrise Impact:Q', bin=alt.Bin(maxbins=20), title='Hours from Sunrise'),
-                y=alt.Y('count()', title='Number of Activities'),
+            sunrise_data = binned(df, 'Sunrise Impact', by='Activity Type')
+            sunrise_impact_chart = alt.Chart(sunrise_data).mark_bar().encode(
+                x=alt.X('Sunrise Impact:Q', bin='binned', title='Hours from Sunrise'),
+                x2='Sunrise Impact end:Q',
+                y=alt.Y('Count:Q', title='Number of Activities'),
                 color=alt.Color('Activity Type:N', title='Activity Type'),
-                tooltip=['Sunrise Impact:Q', 'count()']
+                tooltip=['Sunrise Impact:Q', 'Activity Type:N', 'Count:Q']
             ).properties(
                 title='Impact of Sunrise on Activity Start Times',
                 width=600,
                 height=400
             )
-            st.altair_chart(sunrise_impact_chart, use_container_width=True)
+            altair_chart(sunrise_impact_chart, use_container_width=True)
         except Exception:
             pass
 
+    checkpoint("Wind speed")
     # Wind Speed vs Activity Count
     if 'Wind Speed' in df.columns:
         wind_speed_data = df.groupby(pd.cut(df['Wind Speed'], bins=10)).size().reset_index(name='Count')
@@ -218,8 +246,9 @@ def render(df):
             width=600,
             height=400
         )
-        st.altair_chart(wind_speed_chart, use_container_width=True)
+        altair_chart(wind_speed_chart, use_container_width=True)
 
+    checkpoint("Temperature & performance")
     # Temperature Impact on Performance
     if 'Weather Temperature' in df.columns and 'Moving Time' in df.columns and 'Distance' in df.columns:
         temp_performance_data = df.groupby(pd.cut(df['Weather Temperature'], bins=10)).agg(
@@ -238,8 +267,9 @@ def render(df):
             width=600,
             height=400
         )
-        st.altair_chart(temp_performance_chart, use_container_width=True)
+        altair_chart(temp_performance_chart, use_container_width=True)
 
+    checkpoint("Correlations")
     # Correlation Matrix for Weather and Performance Metrics
     if {'Weather Temperature', 'Humidity', 'Wind Speed', 'Moving Time', 'Distance'}.issubset(df.columns):
         correlation_data = df[['Weather Temperature', 'Humidity', 'Wind Speed', 'Moving Time', 'Distance']].corr()
@@ -254,8 +284,9 @@ def render(df):
             width=600,
             height=400
         )
-        st.altair_chart(correlation_chart, use_container_width=True)
+        altair_chart(correlation_chart, use_container_width=True)
 
+    checkpoint("Weather by month")
     # Weather Condition by Month Heatmap and Bar
     if 'Weather Condition' in df.columns and 'Month' in df.columns:
         df['Weather Condition Label'] = df['Weather Condition'].map(weather_map).fillna('Unknown')
@@ -273,20 +304,22 @@ def render(df):
             width=600,
             height=400
         )
-        st.altair_chart(weather_heatmap, use_container_width=True)
+        altair_chart(weather_heatmap, use_container_width=True)
 
-        weather_chart = alt.Chart(weather_filtered_df).mark_bar().encode(
+        weather_counts = weather_filtered_df.groupby('Weather Condition Label').size().reset_index(name='Count')
+        weather_chart = alt.Chart(weather_counts).mark_bar().encode(
             x=alt.X('Weather Condition Label:N', title='Weather'),
-            y=alt.Y('count()', title='Number of Activities'),
+            y=alt.Y('Count:Q', title='Number of Activities'),
             color=alt.Color('Weather Condition Label:N', legend=None),
-            tooltip=['Weather Condition Label:N', 'count()']
+            tooltip=['Weather Condition Label:N', 'Count:Q']
         ).properties(
             title='Activities by Weather Condition',
             width=400,
             height=400
         ).interactive()
-        st.altair_chart(weather_chart, use_container_width=True)
+        altair_chart(weather_chart, use_container_width=True)
 
+    checkpoint("Monthly weather metrics")
     # Monthly Weather Metrics
     if {'Month', 'Weather Temperature', 'Humidity', 'Wind Speed'}.issubset(df.columns):
         monthly_weather = df.groupby('Month').agg({
@@ -322,12 +355,13 @@ def render(df):
             height=400
         )
 
-        st.altair_chart(combined_chart, use_container_width=True)
+        altair_chart(combined_chart, use_container_width=True)
 
+    checkpoint("Hour vs weekday")
     # Heatmap: Hour vs Day of Week
     if 'Hour' in df.columns and 'DayOfWeek' in df.columns:
-        df['DayOfWeekStr'] = df['DayOfWeek'].map(lambda x: dow_map[x])
-        heatmap_data = df.groupby(['DayOfWeekStr', 'Hour']).size().reset_index(name='Count')
+        heatmap_data = rollup(cube, ['DayOfWeek', 'Hour'], days=day_filter, months=month_filter)
+        heatmap_data['DayOfWeekStr'] = heatmap_data['DayOfWeek'].map(lambda x: dow_map[x])
         heatmap = alt.Chart(heatmap_data).mark_rect().encode(
             x=alt.X('Hour:O', title='Hour'),
             y=alt.Y('DayOfWeekStr:N', title='Day of Week', sort=dow_map),
@@ -338,7 +372,7 @@ def render(df):
             width=600,
             height=400
         )
-        st.altair_chart(heatmap, use_container_width=True)
+        altair_chart(heatmap, use_container_width=True)
 
     st.markdown("---")
     st.info("More advanced insights like temperature impact, sunrise time effects, and performance under rain will be added soon! 🚧")
\ No newline at end of file
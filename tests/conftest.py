@@ -0,0 +1,118 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+
+from rate_limit import RateBudget
+from strava_client import StravaClient
+from strava_sync import ActivityStore
+
+# Caches (frames, stream store, HTTP responses) go to a scratch directory, never the app's .cache
+os.environ["DASHBOARD_CACHE_DIR"] = tempfile.mkdtemp(prefix="dashboard-tests-")
+
+
+class FakeStrava:
+    # Stand-in for the Strava API: /athlete/activities with per_page/page/after/before (newest
+    # first, oldest first with `after`, as Strava does), {"id": 1} for any other path, ETag
+    # revalidation and error statuses on demand
+    def __init__(self):
+        self.activities = []
+        self.requests = []
+        self.fail = set()  # (param, value) pairs answered with a 500, e.g. ("page", 3)
+        self.status = {}  # path -> status answered for it, e.g. 404 for a deleted activity
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self.base_url = f"http://127.0.0.1:{self._server.server_address[1]}"
+
+    def _handler(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                url = urlparse(self.path)
+                params = {name: values[0] for name, values in parse_qs(url.query).items()}
+                fake.requests.append((url.path, params, dict(self.headers)))
+                status = fake.status.get(url.path)
+                if status is None and any(str(params.get(name)) == str(value) for name, value in fake.fail):
+                    status = 500
+                if status is not None:
+                    self.send_response(status)
+                    self.end_headers()
+                    return
+                body = json.dumps(fake.page(url.path, params)).encode()
+                etag = '"%s"' % hashlib.md5(body).hexdigest()
+                if self.headers.get("If-None-Match") == etag:
+                    self.send_response(304)
+                    self.send_header("ETag", etag)
+                    self.end_headers()
+                    return
+                self.send_response(200)
+                self.send_header("ETag", etag)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        return Handler
+
+    def page(self, path, params):
+        if not path.endswith("/athlete/activities"):
+            return {"id": 1}
+        per_page, page = int(params.get("per_page", 30)), int(params.get("page", 1))
+        after, before = int(params.get("after", 0)), int(params.get("before", 2 ** 40))
+        started = lambda a: datetime.strptime(a["start_date"], "%Y-%m-%dT%H:%M:%SZ").replace(
+            tzinfo=timezone.utc).timestamp()
+        selected = sorted((a for a in self.activities if after < started(a) < before), key=started)
+        if "after" not in params:
+            selected = selected[::-1]
+        return selected[(page - 1) * per_page:page * per_page]
+
+    def pages(self, **params):
+        # Requests answered so far whose parameters include `params`
+        return [int(p["page"]) for _, p, _ in self.requests
+                if all(p.get(name) == str(value) for name, value in params.items())]
+
+
+@pytest.fixture
+def strava():
+    fake = FakeStrava()
+    thread = threading.Thread(target=fake._server.serve_forever, daemon=True)
+    thread.start()
+    yield fake
+    fake._server.shutdown()
+    fake._server.server_close()
+
+
+@pytest.fixture
+def session():
+    # No retries: a failed request surfaces at once, as an interrupted sync would
+    return StravaClient(retries=0)
+
+
+@pytest.fixture
+def budget():
+    return RateBudget(short_limit=10 ** 6, daily_limit=10 ** 6, sleep=lambda seconds: None)
+
+
+@pytest.fixture
+def history():
+    # n activity summaries 13 h apart, as the API lists them
+    def make(n, start=datetime(2020, 1, 1, tzinfo=timezone.utc), first_id=1000):
+        return [{"id": first_id + i, "name": f"Activity {first_id + i}", "sport_type": "Run", "type": "Run",
+                 "start_date": (start + timedelta(hours=13 * i)).strftime("%Y-%m-%dT%H:%M:%SZ"),
+                 "distance": 10000.0, "moving_time": 3000, "elapsed_time": 3100} for i in range(n)]
+    return make
+
+
+@pytest.fixture
+def open_store(tmp_path):
+    # A fresh connection on each call, as after a restart of the app
+    return lambda: ActivityStore(str(tmp_path / "athlete.sqlite3"))
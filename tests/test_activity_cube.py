@@ -0,0 +1,47 @@
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+from utils import build_activity_cube, preprocess_data, rollup
+
+EXAMPLE = Path(__file__).resolve().parent.parent / "activities.csv"
+
+
+@pytest.fixture(scope="module")
+def activities():
+    return preprocess_data(pd.read_csv(EXAMPLE, encoding='latin-1', on_bad_lines='skip'))
+
+
+@pytest.fixture(scope="module")
+def cube(activities):
+    return build_activity_cube(activities)
+
+
+def previous_counts(df, by):
+    # The groupbys the charts ran on the full frame before the cube
+    return df.groupby(by).size().reset_index(name='Count')
+
+
+@pytest.mark.parametrize("by", [['Year', 'Month'], ['Year', 'Week'], ['Month', 'DayOfWeek'], ['Month', 'Hour'],
+                                ['DayOfWeek', 'Hour'], ['Hour', 'Activity Type'], 'Activity Type'])
+def test_rollups_match_the_previous_groupbys(activities, cube, by):
+    pd.testing.assert_frame_equal(rollup(cube, by), previous_counts(activities, by))
+
+
+def test_day_and_month_filters_match_filtering_the_frame(activities, cube):
+    days, months = [0, 2, 5], [1, 6, 7, 12]
+    filtered = activities[activities['DayOfWeek'].isin(days) & activities['Month'].isin(months)]
+    pd.testing.assert_frame_equal(rollup(cube, ['Month', 'Hour'], days=days, months=months),
+                                  previous_counts(filtered, ['Month', 'Hour']))
+
+
+def test_sport_totals_match_the_previous_summary(activities, cube):
+    sports = ['Ride', 'Run', 'Swim', 'Weight Training']
+    previous = activities[activities['Activity Type'].isin(sports)].groupby('Activity Type').agg(
+        Distance=('Distance', 'sum'),
+        Moving_Time=('Moving Time', 'sum'),
+        Count=('Activity Type', 'count'),
+    ).reset_index()
+    totals = rollup(cube[cube['Activity Type'].isin(sports)], 'Activity Type', ['Distance', 'Moving_Time', 'Count'])
+    pd.testing.assert_frame_equal(totals, previous, check_dtype=False)
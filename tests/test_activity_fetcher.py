@@ -0,0 +1,55 @@
+import sqlite3
+
+import pytest
+
+from activity_fetcher import fetch_details, missing_keys
+from rate_limit import RateBudget
+from strava_client import StravaClient
+from strava_sync import ActivityStore
+
+
+@pytest.fixture
+def store():
+    store = ActivityStore(":memory:")
+    store.upsert([{"id": activity_id, "start_date": f"2024-01-0{activity_id}T08:00:00Z"} for activity_id in (1, 2, 3, 4)])
+    return store
+
+
+def fetch(strava, store, keys):
+    budget = RateBudget(short_limit=10 ** 6, daily_limit=10 ** 6, sleep=lambda seconds: None)
+    return fetch_details("token", keys, store=store, session=StravaClient(retries=0), budget=budget,
+                         base_url=strava.base_url)
+
+
+def test_each_kind_is_fetched_only_for_its_own_missing_ids(strava, store):
+    store.save_detail(1, "detail", {"id": 1})
+    store.save_detail(2, "detail", {"id": 2})
+    keys = missing_keys(store, ("detail", "streams"))
+    assert sorted(keys) == [(1, "streams"), (2, "streams"), (3, "detail"), (3, "streams"),
+                            (4, "detail"), (4, "streams")]
+    fetched, failed = fetch(strava, store, keys)
+    assert not failed and len(fetched) == 6
+    assert sorted(path for path, _, _ in strava.requests if not path.endswith("/streams")) == \
+        ["/activities/3", "/activities/4"]
+    assert missing_keys(store, ("detail", "streams")) == []
+
+
+def test_permanent_failures_are_recorded_and_not_retried(strava, store):
+    strava.status = {"/activities/2/streams": 404, "/activities/3/streams": 500}
+    fetched, failed = fetch(strava, store, missing_keys(store, ("streams",)))
+    assert set(failed) == {(2, "streams"), (3, "streams")}
+    assert store.get_detail(2, "streams") is None
+    # The 404 is an answer; the 500 is retried on the next fetch
+    assert missing_keys(store, ("streams",)) == [(3, "streams")]
+
+
+def test_stores_without_a_status_column_are_upgraded(tmp_path):
+    path = str(tmp_path / "athlete.sqlite3")
+    with sqlite3.connect(path) as conn:
+        conn.execute("CREATE TABLE activity_details (id INTEGER NOT NULL, kind TEXT NOT NULL, "
+                     "payload TEXT NOT NULL, PRIMARY KEY (id, kind))")
+        conn.execute("INSERT INTO activity_details VALUES (1, 'detail', '{\"id\": 1}')")
+    store = ActivityStore(path)
+    assert store.get_detail(1, "detail") == {"id": 1}
+    store.save_detail(2, "streams", None, status=404)
+    assert store.get_detail(2, "streams") is None
@@ -0,0 +1,45 @@
+import pytest
+import requests
+
+from rate_limit import RateBudget, RateLimited
+from strava_sync import backfill_activities
+
+PER_PAGE = 10
+TOKEN = "token"
+
+
+def test_backfill_resumes_after_a_failed_page(strava, session, budget, history, open_store):
+    strava.activities = history(45)
+    strava.fail = {("page", 3)}
+    with pytest.raises(requests.HTTPError):
+        backfill_activities(open_store(), TOKEN, session, strava.base_url, PER_PAGE, budget)
+    assert len(open_store()) == 2 * PER_PAGE
+    assert open_store().get_state('backfill')['page'] == 2
+
+    strava.fail = set()
+    strava.requests.clear()
+    state = backfill_activities(open_store(), TOKEN, session, strava.base_url, PER_PAGE, budget)
+    assert state['done']
+    # Completed pages are not fetched again, and every page keeps the original `before` anchor
+    assert strava.pages() == [3, 4, 5]
+    assert len({p['before'] for _, p, _ in strava.requests}) == 1
+    assert sorted(a['id'] for a in open_store().activities()) == [a['id'] for a in strava.activities]
+
+
+def test_backfill_pauses_on_max_pages_and_rate_budget(strava, session, budget, history, open_store):
+    strava.activities = history(35)
+    state = backfill_activities(open_store(), TOKEN, session, strava.base_url, PER_PAGE, budget,
+                                max_pages=2)
+    assert (state['page'], state['done']) == (2, False)
+
+    exhausted = RateBudget(short_limit=100, daily_limit=100, sleep=lambda seconds: None)
+    exhausted.daily_usage = 100
+    with pytest.raises(RateLimited):
+        backfill_activities(open_store(), TOKEN, session, strava.base_url, PER_PAGE, exhausted,
+                            max_wait=5)
+    assert open_store().get_state('backfill')['page'] == 2
+
+    state = backfill_activities(open_store(), TOKEN, session, strava.base_url, PER_PAGE, budget)
+    assert state['done']
+    assert strava.pages() == [1, 2, 3, 4]
+    assert len(open_store()) == 35
@@ -0,0 +1,77 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from best_efforts import efforts_frame, find_best_efforts, top_efforts, update_leaderboard
+from stream_store import StreamStore
+
+
+def previous_leaderboard(run_df, store, k):
+    # Full rebuild as before the persisted board: every run scanned, top-k per distance
+    rows = efforts_frame(run_df, store)
+    rows = rows.dropna(subset=['Seconds']).sort_values(['Meters', 'Seconds'], kind='stable')
+    return rows.groupby('Meters', sort=False).head(k).reset_index(drop=True)
+
+
+def run_track(rng, meters):
+    # 1 Hz samples at a varying pace, with a few dropouts
+    speed = rng.uniform(2.5, 5.0, int(meters / 3))
+    distance = np.cumsum(speed)
+    distance = distance[distance <= meters]
+    time = np.datetime64('2024-01-01T08:00:00') + np.arange(len(distance)).astype('timedelta64[s]')
+    distance[rng.integers(0, len(distance), 5)] = np.nan
+    return {'time': time, 'distance': distance}
+
+
+@pytest.fixture
+def runs(tmp_path):
+    rng = np.random.default_rng(5)
+    store = StreamStore(tmp_path)
+    run_df = pd.DataFrame({
+        'Activity ID': np.arange(100, 140),
+        'Activity Date': pd.date_range("2024-01-01", periods=40, freq='3D'),
+    })
+    tracks = {activity_id: run_track(rng, rng.uniform(300, 23000)) for activity_id in run_df['Activity ID']}
+    return store, run_df, tracks
+
+
+def test_find_best_efforts_matches_brute_force():
+    rng = np.random.default_rng(1)
+    track = run_track(rng, 3000)
+    efforts = find_best_efforts(track['time'], track['distance'], {"1K": 1000, "2K": 2000, "5K": 5000})
+    keep = ~np.isnan(track['distance'])
+    seconds = (track['time'][keep] - track['time'][keep][0]).astype(np.float64)
+    distance = np.maximum.accumulate(track['distance'][keep])
+    for target, best in zip([1000, 2000, 5000], efforts['seconds']):
+        ends = [np.interp(d + target, distance, seconds) - s for s, d in zip(seconds, distance)
+                if d + target <= distance[-1]]
+        assert best == pytest.approx(min(ends)) if ends else np.isnan(best)
+
+
+def test_incremental_board_matches_full_rebuild(runs):
+    store, run_df, tracks = runs
+    first = run_df['Activity ID'][::2]
+    store.ingest({activity_id: tracks[activity_id] for activity_id in first})
+    board = update_leaderboard("board", run_df, store)
+    assert set(board['Activity ID']) == set(first)
+
+    store.ingest({activity_id: tracks[activity_id] for activity_id in run_df['Activity ID'][1::2]})
+    store.clear_memory()
+    board = update_leaderboard("board", run_df, store)
+    assert board['Activity ID'].nunique() == len(run_df)
+    pd.testing.assert_frame_equal(top_efforts(board, run_df['Activity ID'], 3),
+                                  previous_leaderboard(run_df, store, 3), check_dtype=False)
+
+
+def test_board_answers_any_date_range_and_k(runs):
+    store, run_df, tracks = runs
+    store.ingest(tracks)
+    update_leaderboard("board", run_df, store)
+    # A narrower selection reads the persisted board without scanning or writing anything
+    writes = store.stats()["writes"]
+    subset = run_df[run_df['Activity Date'] >= "2024-03-01"]
+    board = update_leaderboard("board", subset, store)
+    assert store.stats()["writes"] == writes
+    for k in (1, 5):
+        pd.testing.assert_frame_equal(top_efforts(board, subset['Activity ID'], k),
+                                      previous_leaderboard(subset, store, k), check_dtype=False)
@@ -0,0 +1,43 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from chart_data import downsample, lttb
+
+
+@pytest.mark.parametrize("n, budget", [(100, 10), (1000, 100), (5000, 333)])
+def test_lttb_keeps_endpoints_and_peaks(n, budget):
+    rng = np.random.default_rng(n)
+    x = np.arange(n, dtype=float)
+    y = rng.normal(0, 1, n)
+    peak, trough = n // 3, 2 * n // 3
+    y[peak], y[trough] = 50, -50
+    index = lttb(x, y, budget)
+    assert len(index) == budget
+    assert index[0] == 0 and index[-1] == n - 1
+    assert (np.diff(index) > 0).all()
+    assert peak in index and trough in index
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_lttb_picks_one_point_per_bucket(seed):
+    rng = np.random.default_rng(seed)
+    x = np.sort(rng.uniform(0, 1000, 2000))
+    y = np.cumsum(rng.normal(0, 1, 2000))
+    y[rng.integers(1, 1999, 50)] = np.nan
+    index = lttb(x, y, 200)
+    edges = np.linspace(1, 1999, 199).astype(np.int64)
+    np.testing.assert_array_equal(np.searchsorted(edges, index[1:-1], side='right') - 1, np.arange(198))
+
+
+def test_lttb_returns_everything_within_budget():
+    np.testing.assert_array_equal(lttb(np.arange(5), np.arange(5), 10), np.arange(5))
+
+
+def test_downsample_per_series():
+    df = pd.DataFrame({'Day': np.tile(np.arange(1000), 2), 'Value': np.arange(2000.0),
+                       'Sport': np.repeat(['Run', 'Ride'], 1000)})
+    small = downsample(df, 'Day', ['Value'], by='Sport', budget=200)
+    assert len(small) <= 200
+    for _, group in small.groupby('Sport'):
+        assert group['Day'].min() == 0 and group['Day'].max() == 999
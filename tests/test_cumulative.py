@@ -0,0 +1,72 @@
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from cumulative import METRICS, cumulative_comparison, day_of_year
+from utils import preprocess_data
+
+EXAMPLE = Path(__file__).resolve().parent.parent / "activities.csv"
+
+
+def previous_yearly(df_filtered, selected_values):
+    # The per-year copy/groupby/concat loop of the general tab
+    chart_data = pd.DataFrame()
+    for year in selected_values:
+        temp = df_filtered[df_filtered['Year'] == year].copy()
+        monthly = temp.groupby('Month')['Metric'].sum().reset_index()
+        monthly['Year'] = year
+        monthly['CumulativeMetric'] = monthly['Metric'].cumsum()
+        chart_data = pd.concat([chart_data, monthly])
+    return chart_data.rename(columns={'Year': 'Period', 'Month': 'Sub'})
+
+
+def previous_monthly(df_filtered, selected_values):
+    chart_data = pd.DataFrame()
+    df_filtered['YearMonthStr'] = df_filtered['Activity Date'].dt.strftime('%Y-%m')
+    for ym in selected_values:
+        temp = df_filtered[df_filtered['YearMonthStr'] == ym].copy()
+        temp['Day'] = temp['Activity Date'].dt.day
+        daily = temp.groupby('Day')['Metric'].sum().reset_index()
+        daily['YearMonth'] = ym
+        daily['CumulativeMetric'] = daily['Metric'].cumsum()
+        chart_data = pd.concat([chart_data, daily])
+    return chart_data.rename(columns={'YearMonth': 'Period', 'Day': 'Sub'})
+
+
+def assert_same_curves(curves, previous):
+    # The previous curves only had rows for sub-periods with activity; the new ones also carry the
+    # empty sub-periods in between, with a zero metric and a flat cumulative value
+    merged = previous.astype({'Period': str}).merge(curves, on=['Period', 'Sub'], how='left', suffixes=('', '_new'))
+    np.testing.assert_allclose(merged['Metric_new'], merged['Metric'])
+    np.testing.assert_allclose(merged['CumulativeMetric_new'], merged['CumulativeMetric'])
+    assert curves.loc[curves['Metric'] != 0, ['Period', 'Sub']].shape[0] == len(previous[previous['Metric'] != 0])
+    assert curves.groupby('Period')['Sub'].max().to_dict() == previous.astype({'Period': str}).groupby('Period')['Sub'].max().to_dict()
+
+
+@pytest.fixture(scope="module")
+def activities():
+    return preprocess_data(pd.read_csv(EXAMPLE, encoding='latin-1', on_bad_lines='skip'))
+
+
+@pytest.mark.parametrize("metric", list(METRICS))
+@pytest.mark.parametrize("activity_type", [None, 'Ride', 'Run'])
+def test_yearly_view_matches_the_previous_loop(activities, metric, activity_type):
+    df = activities if activity_type is None else activities[activities['Activity Type'] == activity_type]
+    selected = tuple(sorted(df['Year'].unique(), reverse=True)[:3])
+    curves = cumulative_comparison(f"yearly:{activity_type}", df, "Yearly (Monthly View)", metric, selected)
+    assert_same_curves(curves, previous_yearly(df.assign(Metric=METRICS[metric][1](df)), selected))
+
+
+@pytest.mark.parametrize("metric", list(METRICS))
+def test_monthly_view_matches_the_previous_loop(activities, metric):
+    selected = tuple(sorted(activities['YearMonth'].unique(), reverse=True)[:4])
+    curves = cumulative_comparison("monthly", activities, "Monthly (Weekly View)", metric, selected)
+    previous = previous_monthly(activities.assign(Metric=METRICS[metric][1](activities)), [str(ym) for ym in selected])
+    assert_same_curves(curves, previous)
+
+
+def test_same_dates_share_a_day_of_year():
+    dates = pd.Series(pd.to_datetime(["2023-03-01", "2024-03-01", "2024-02-29", "2023-12-31", "2024-12-31"]))
+    assert list(day_of_year(dates)) == [61, 61, 60, 366, 366]
@@ -0,0 +1,80 @@
+import struct
+import zlib
+
+import numpy as np
+import pytest
+
+import heatmap_tiles
+from heatmap_tiles import (TILE_SIZE, build_pyramid, build_sport_tiles, coarsen, encode_png, mercator_pixels,
+                           pixel_counts, selection_key)
+from stream_store import StreamStore
+
+
+def decode_png(data):
+    # Inverse of encode_png for its single-IDAT, filter-0 RGBA output
+    width, height = struct.unpack(">II", data[16:24])
+    length = struct.unpack(">I", data[33:37])[0]
+    raw = np.frombuffer(zlib.decompress(data[41:41 + length]), np.uint8).reshape(height, width * 4 + 1)
+    assert (raw[:, 0] == 0).all()
+    return raw[:, 1:].reshape(height, width, 4)
+
+
+def direct_counts(lat, lon, zoom):
+    # Rasterized straight at `zoom` instead of folded down from the deepest level
+    x, y = mercator_pixels(lat, lon, zoom)
+    return np.unique(x * (TILE_SIZE << zoom) + y, return_counts=True)
+
+
+@pytest.fixture
+def points():
+    rng = np.random.default_rng(2)
+    lat = np.r_[41.39 + np.cumsum(rng.normal(0, 2e-4, 5000)), np.nan, -33.9 + rng.normal(0, 0.05, 500)]
+    lon = np.r_[2.17 + np.cumsum(rng.normal(0, 2e-4, 5000)), 2.0, 18.4 + rng.normal(0, 0.05, 500)]
+    return lat, lon
+
+
+def test_coarsened_levels_match_direct_rasterization(points):
+    lat, lon = points
+    pixels, counts = pixel_counts(lat, lon, 15)
+    valid = ~np.isnan(lat)
+    for zoom in range(15, 1, -1):
+        expected_pixels, expected_counts = direct_counts(lat[valid], lon[valid], zoom)
+        np.testing.assert_array_equal(pixels, expected_pixels)
+        np.testing.assert_array_equal(counts, expected_counts)
+        pixels, counts = coarsen(pixels, counts, zoom)
+
+
+def test_tiles_show_exactly_the_counted_pixels(points, tmp_path):
+    lat, lon = points
+    build_pyramid(lat, lon, tmp_path, min_zoom=9, max_zoom=12)
+    valid = ~np.isnan(lat)
+    for zoom in (9, 12):
+        pixels, _ = direct_counts(lat[valid], lon[valid], zoom)
+        width = TILE_SIZE << zoom
+        drawn = []
+        for path in (tmp_path / str(zoom)).glob("*/*.png"):
+            tile_x, tile_y = int(path.parent.name), int(path.stem)
+            rows, cols = np.nonzero(decode_png(path.read_bytes())[:, :, 3])
+            drawn.append((tile_x * TILE_SIZE + cols) * width + tile_y * TILE_SIZE + rows)
+        np.testing.assert_array_equal(np.sort(np.concatenate(drawn)), pixels)
+
+
+def test_png_round_trip():
+    rgba = np.random.default_rng(0).integers(0, 256, (7, 5, 4), dtype=np.uint8)
+    np.testing.assert_array_equal(decode_png(encode_png(rgba)), rgba)
+
+
+def test_pyramid_is_keyed_by_the_selection_and_reused(tmp_path, monkeypatch, points):
+    monkeypatch.setattr(heatmap_tiles, "TILES_DIR", tmp_path / "tiles")
+    store = StreamStore(tmp_path / "streams")
+    lat, lon = points
+    store.save(1, {'lat': lat[:2500], 'lon': lon[:2500]})
+    store.save(2, {'lat': lat[2500:], 'lon': lon[2500:]})
+    assert selection_key([2, 1]) == selection_key(np.array([1, 2])) != selection_key([1])
+    manifest = build_sport_tiles("Ride", [2, 1], store)
+    assert manifest["points"] == int((~np.isnan(lat)).sum())
+    folder = heatmap_tiles.tile_folder("Ride", [1, 2])
+    (folder / "marker").write_text("kept")
+    assert build_sport_tiles("Ride", [1, 2], store) == manifest
+    assert (folder / "marker").exists()
+    assert build_sport_tiles("Ride", [1], store)["points"] == 2500
@@ -0,0 +1,70 @@
+from datetime import datetime, timedelta, timezone
+
+from http_cache import ResponseCache
+from strava_client import StravaClient
+
+
+def get(client, strava, path="/athlete/activities", token="a", athlete_id=7, **params):
+    return client.get(f"{strava.base_url}{path}", headers={"Authorization": f"Bearer {token}"},
+                      params={"per_page": 10, "page": 1, **params}, athlete_id=athlete_id)
+
+
+def fill(strava, n=5):
+    start = datetime(2021, 1, 1, tzinfo=timezone.utc)
+    strava.activities = [{"id": i, "start_date": (start + timedelta(days=i)).strftime("%Y-%m-%dT%H:%M:%SZ")}
+                         for i in range(n)]
+
+
+def test_unchanged_list_is_revalidated_and_replayed(strava, tmp_path):
+    fill(strava)
+    cache = ResponseCache(tmp_path)
+    client = StravaClient(retries=0, cache=cache)
+    first = get(client, strava)
+    assert "If-None-Match" not in strava.requests[-1][2]
+
+    second = get(client, strava)
+    assert strava.requests[-1][2]["If-None-Match"] == first.headers["ETag"]
+    assert second.status_code == 200 and second.json() == first.json()
+    assert cache.stats()["hits"] == 1 and cache.stats()["bytes_saved"] == len(first.content)
+
+    # A changed list is a fresh 200 and replaces the entry
+    fill(strava, 7)
+    third = get(client, strava)
+    assert len(third.json()) == 7 and cache.stats()["hits"] == 1
+    assert get(client, strava).json() == third.json() and cache.stats()["hits"] == 2
+
+
+def test_entries_are_scoped_to_the_athlete_and_survive_token_refresh(strava, tmp_path):
+    fill(strava)
+    client = StravaClient(retries=0, cache=ResponseCache(tmp_path))
+    get(client, strava, token="a")
+    get(client, strava, token="refreshed")
+    assert "If-None-Match" in strava.requests[-1][2]
+    get(client, strava, token="b", athlete_id=8)
+    assert "If-None-Match" not in strava.requests[-1][2]
+    # Without an athlete nothing is cached
+    get(client, strava, athlete_id=None)
+    get(client, strava, athlete_id=None)
+    assert "If-None-Match" not in strava.requests[-1][2]
+    assert client.cache.stats()["misses"] == 2
+
+
+def test_only_list_endpoints_are_cached(strava, tmp_path):
+    fill(strava)
+    client = StravaClient(retries=0, cache=ResponseCache(tmp_path))
+    get(client, strava, path="/activities/3/streams")
+    get(client, strava, path="/activities/3/streams")
+    assert "If-None-Match" not in strava.requests[-1][2]
+    assert not list(tmp_path.glob("*/*.json"))
+
+
+def test_cache_is_bounded_least_recently_used_first(strava, tmp_path):
+    fill(strava, 10)
+    client = StravaClient(retries=0, cache=ResponseCache(tmp_path, max_bytes=1))
+    get(client, strava, page=1)
+    get(client, strava, page=2)
+    # Over the bound, only the entry just written is kept
+    entries = list(tmp_path.glob("*/*.json"))
+    assert len(entries) == 1
+    get(client, strava, page=2)
+    assert client.cache.stats()["hits"] == 1
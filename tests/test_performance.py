@@ -0,0 +1,68 @@
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from performance import (DISTANCE_CATEGORIES, MARGIN_PERCENTAGE, build_performance_index, prediction_matrix,
+                         summarize_predictions)
+from utils import preprocess_data
+
+EXAMPLE = Path(__file__).resolve().parent.parent / "activities.csv"
+
+
+def riegel_predictor(distance, time, target_distance):
+    return time * (target_distance / distance) ** 1.06
+
+
+def previous_top_performances(run_df):
+    # Filter, copy and sort once per category, as the running tab did; a stable sort keeps ties in frame order
+    tops = {}
+    for category_name, base_dist in DISTANCE_CATEGORIES.items():
+        margin = base_dist * MARGIN_PERCENTAGE
+        filtered = run_df[(run_df['Distance'] >= base_dist - margin) & (run_df['Distance'] <= base_dist + margin)].copy()
+        filtered.sort_values('Pace', inplace=True, kind='stable')
+        if not filtered.head(5).empty:
+            tops[category_name] = filtered.head(5)
+    return tops
+
+
+def previous_predictions(run_df):
+    all_predictions = {key: [] for key in DISTANCE_CATEGORIES}
+    for top_5 in previous_top_performances(run_df).values():
+        for _, row in top_5.iterrows():
+            for target_name, target_dist in DISTANCE_CATEGORIES.items():
+                all_predictions[target_name].append(riegel_predictor(row['Distance'], row['Moving Time'], target_dist))
+    return {name: (sum(preds) / len(preds), min(preds), max(preds)) for name, preds in all_predictions.items() if preds}
+
+
+@pytest.fixture(scope="module")
+def run_selections():
+    df = preprocess_data(pd.read_csv(EXAMPLE, encoding='latin-1', on_bad_lines='skip'))
+    run_df = df[df['Activity Type'] == 'Run'].copy()
+    run_df['Moving Time'] /= 60
+    run_df['Distance'] /= 1000
+    run_df['Pace'] = (run_df['Moving Time'] / run_df['Distance']).round(2)
+    return [run_df] + [run_df[run_df['Activity Gear'] == gear] for gear in run_df['Activity Gear'].dropna().unique()]
+
+
+def test_index_reproduces_the_previous_top_performances(run_selections):
+    for run_df in run_selections:
+        top = build_performance_index(run_df)
+        previous = previous_top_performances(run_df)
+        assert list(top['Category'].unique()) == list(previous)
+        for category, top_5 in previous.items():
+            rows = top[top['Category'] == category]
+            np.testing.assert_array_equal(rows['Activity Date'], top_5['Activity Date'])
+            np.testing.assert_array_equal(rows['Pace'], top_5['Pace'])
+
+
+def test_riegel_summary_matches_the_previous_loops(run_selections):
+    for run_df in run_selections:
+        summary = summarize_predictions(prediction_matrix(build_performance_index(run_df)))
+        previous = previous_predictions(run_df)
+        if not previous:
+            assert summary.empty
+            continue
+        assert list(summary['Target']) == list(previous)
+        np.testing.assert_allclose(summary[['Mean', 'Min', 'Max']].to_numpy(), np.array(list(previous.values())))
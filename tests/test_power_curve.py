@@ -0,0 +1,55 @@
+import numpy as np
+import pandas as pd
+
+from power_curve import DURATIONS, mean_max_power, resample_1hz, ride_curve
+from stream_store import StreamStore
+
+
+def brute_force_curve(power_1hz, durations):
+    # Best rolling mean for each duration, one pandas rolling window at a time
+    series = pd.Series(power_1hz)
+    return np.array([series.rolling(d).mean().max() if d <= len(series) else np.nan for d in durations])
+
+
+def ride_track(rng, seconds):
+    time = np.datetime64('2024-01-01T08:00:00') + np.sort(rng.choice(seconds, seconds // 2, replace=False)).astype('timedelta64[s]')
+    power = rng.uniform(0, 400, len(time))
+    power[rng.integers(0, len(power), 10)] = np.nan
+    return {'time': time, 'power': power}
+
+
+def test_mean_max_power_matches_rolling_means():
+    rng = np.random.default_rng(3)
+    power = rng.uniform(0, 500, 4000)
+    np.testing.assert_allclose(mean_max_power(power), brute_force_curve(power, DURATIONS))
+
+
+def test_resample_holds_short_gaps_and_zeroes_stops():
+    time = np.datetime64('2024-01-01T08:00:00') + np.array([0, 1, 4, 20]).astype('timedelta64[s]')
+    power = resample_1hz(time, np.array([100.0, 200.0, np.nan, 300.0]))
+    assert len(power) == 21
+    assert list(power[:7]) == [100.0, 200.0, 200.0, 200.0, 200.0, 200.0, 200.0]
+    assert (power[7:20] == 0).all() and power[20] == 300.0
+
+
+def test_ride_curve_is_computed_once_and_read_back(tmp_path):
+    rng = np.random.default_rng(4)
+    store = StreamStore(tmp_path)
+    track = ride_track(rng, 3000)
+    store.save(1, track)
+    expected = brute_force_curve(resample_1hz(track['time'], track['power']), DURATIONS)
+    np.testing.assert_allclose(ride_curve(1, store), expected)
+    store.path(1).unlink()
+    np.testing.assert_allclose(StreamStore(tmp_path).load(1, kind="power_curve")['watts'], expected)
+    np.testing.assert_allclose(ride_curve(1, StreamStore(tmp_path)), expected)
+
+
+def test_rides_without_track_or_power_cost_no_failed_reads(tmp_path):
+    store = StreamStore(tmp_path)
+    store.save(2, {'time': np.datetime64('2024-01-01') + np.arange(60).astype('timedelta64[s]'), 'power': np.full(60, np.nan)})
+    assert ride_curve(1, store) is None
+    assert ride_curve(2, store) is None
+    assert store.stats()["misses"] == 0
+    # The powerless ride keeps an empty curve, so its track is not read on the next rebuild
+    store.path(2).unlink()
+    assert ride_curve(2, StreamStore(tmp_path)) is None
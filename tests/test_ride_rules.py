@@ -0,0 +1,55 @@
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from ride_rules import classify_rides
+from utils import preprocess_data
+
+EXAMPLE = Path(__file__).resolve().parent.parent / "activities.csv"
+# The two rules of the row-by-row classifier the engine replaced
+PREVIOUS_RULES = [
+    ('Indoor', [('Distance', 'eq', 0)]),
+    ('MTB', [('Dirt Share', 'gt', 0.2)]),
+]
+
+
+def previous_classify_ride(row):
+    if row['Distance'] == 0:
+        return 'Indoor'
+    elif row['Dirt Distance'] > row['Distance'] * 0.2:
+        return 'MTB'
+    else:
+        return 'Road'
+
+
+@pytest.fixture(scope="module")
+def rides():
+    df = preprocess_data(pd.read_csv(EXAMPLE, encoding='latin-1', on_bad_lines='skip'))
+    return df[df['Activity Type'] == 'Ride']
+
+
+def test_engine_reproduces_the_previous_classification(rides):
+    expected = rides.apply(previous_classify_ride, axis=1)
+    assert len(rides) > 0
+    pd.testing.assert_series_equal(classify_rides(rides, PREVIOUS_RULES), expected, check_names=False)
+
+
+def test_default_rules_only_add_to_the_previous_ones(rides):
+    previous = rides.apply(previous_classify_ride, axis=1)
+    current = rides['Ride Type']
+    # Every ride the old rules called Indoor or MTB still is; only Road rides can be reclassified
+    changed = previous != current
+    assert (previous[changed] == 'Road').all()
+
+
+def test_rules_apply_in_order_and_handle_missing_values():
+    df = pd.DataFrame({
+        'Distance': [0.0, 10000, 10000, 10000, 10000, np.nan],
+        'Dirt Distance': [5000, 3000, 1000, np.nan, 600, np.nan],
+        'Elevation Gain': [0, 100, 300, 100, 300, 0],
+        'Trainer': [False, True, False, False, False, None],
+        'Activity Gear': [None, 'Road bike', 'Rodillo', 'Orbea MTB', None, None],
+    })
+    assert classify_rides(df).tolist() == ['Indoor', 'Indoor', 'Indoor', 'MTB', 'MTB', 'Road']
@@ -0,0 +1,81 @@
+import numpy as np
+import pytest
+
+from route_lod import TOLERANCES, douglas_peucker, local_meters, lod_levels, route_lod, simplified_routes
+from stream_store import StreamStore
+
+
+def recursive_douglas_peucker(x, y, tolerance):
+    # Textbook Douglas-Peucker, one segment at a time
+    keep = np.zeros(len(x), dtype=bool)
+    if len(x) == 0:
+        return keep
+
+    def split(first, last):
+        keep[first] = keep[last] = True
+        if last - first < 2:
+            return
+        dx, dy = x[last] - x[first], y[last] - y[first]
+        inner = np.arange(first + 1, last)
+        length = np.hypot(dx, dy)
+        if length > 0:
+            distance = np.abs(dx * (y[first] - y[inner]) - dy * (x[first] - x[inner])) / length
+        else:
+            distance = np.hypot(x[inner] - x[first], y[inner] - y[first])
+        farthest = int(np.argmax(distance))
+        if distance[farthest] > tolerance:
+            split(first, inner[farthest])
+            split(inner[farthest], last)
+
+    split(0, len(x) - 1)
+    return keep
+
+
+def random_walk(n, seed):
+    rng = np.random.default_rng(seed)
+    return np.cumsum(rng.normal(0, 5, n)), np.cumsum(rng.normal(0, 5, n))
+
+
+@pytest.mark.parametrize("seed", range(5))
+@pytest.mark.parametrize("tolerance", TOLERANCES)
+def test_vectorized_matches_recursive(seed, tolerance):
+    x, y = random_walk(2000, seed)
+    np.testing.assert_array_equal(douglas_peucker(x, y, tolerance), recursive_douglas_peucker(x, y, tolerance))
+
+
+def test_loops_and_short_tracks():
+    # A closed loop has a zero-length chord between its endpoints
+    angle = np.linspace(0, 2 * np.pi, 200)
+    x, y = 100 * np.cos(angle), 100 * np.sin(angle)
+    np.testing.assert_array_equal(douglas_peucker(x, y, 5), recursive_douglas_peucker(x, y, 5))
+    for n in range(3):
+        assert douglas_peucker(np.zeros(n), np.zeros(n), 1).all()
+
+
+def test_levels_are_nested():
+    x, y = random_walk(3000, 7)
+    lat, lon = 41 + y / 111000, 2 + x / 84000
+    kept_lat, _, levels = lod_levels(lat, lon)
+    assert len(kept_lat) == len(lat)
+    mx, my = local_meters(lat, lon)
+    for level, tolerance in enumerate(TOLERANCES, start=1):
+        # Each level is the simplification of the previous one; endpoints survive every level
+        survivors = np.flatnonzero(levels >= level)
+        previous = np.flatnonzero(levels >= level - 1)
+        expected = previous[douglas_peucker(mx[previous], my[previous], tolerance)]
+        np.testing.assert_array_equal(survivors, expected)
+        assert survivors[0] == 0 and survivors[-1] == len(lat) - 1
+
+
+def test_activities_without_tracks_cost_no_failed_reads(tmp_path):
+    store = StreamStore(tmp_path)
+    x, y = random_walk(500, 3)
+    store.save(1, {'lat': 41 + y / 111000, 'lon': 2 + x / 84000})
+    routes, _, _ = simplified_routes([1, 2, 3], store=store)
+    assert [activity_id for activity_id, _, _ in routes] == [1]
+    assert route_lod(2, store) is None
+    assert store.stats()["misses"] == 0
+    # Read back from the cached simplification once the raw track is gone
+    lod = route_lod(1, store)
+    store.path(1).unlink()
+    np.testing.assert_array_equal(route_lod(1, StreamStore(tmp_path))['level'], lod['level'])
@@ -0,0 +1,38 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+import requests
+
+from strava_sync import backfill_activities, sync_activities
+
+PER_PAGE = 10
+TOKEN = "token"
+
+
+def test_sync_fetches_only_newer_activities_and_resumes(strava, session, budget, history, open_store):
+    strava.activities = history(12)
+    backfill_activities(open_store(), TOKEN, session, strava.base_url, PER_PAGE, budget)
+    anchor = open_store().cursor()
+
+    # New activities after the backfill anchor; the sync reads them oldest first
+    start = datetime.fromtimestamp(anchor, timezone.utc) + timedelta(hours=1)
+    strava.activities += history(25, start=start, first_id=5000)
+    strava.fail = {("page", 2)}
+    strava.requests.clear()
+    with pytest.raises(requests.HTTPError):
+        sync_activities(open_store(), TOKEN, session, strava.base_url, PER_PAGE, budget)
+    assert all(int(p['after']) == anchor for _, p, _ in strava.requests)
+    # The cursor moved to the newest activity of the completed page
+    cursor = open_store().cursor()
+    assert len(open_store()) == 12 + PER_PAGE and cursor > anchor
+
+    strava.fail = set()
+    strava.requests.clear()
+    fetched = sync_activities(open_store(), TOKEN, session, strava.base_url, PER_PAGE, budget)
+    assert fetched == 25 - PER_PAGE
+    assert all(int(p['after']) == cursor for _, p, _ in strava.requests)
+    assert sorted(a['id'] for a in open_store().activities()) == sorted(a['id'] for a in strava.activities)
+
+    strava.requests.clear()
+    assert sync_activities(open_store(), TOKEN, session, strava.base_url, PER_PAGE, budget) == 0
+    assert len(strava.requests) == 1
@@ -0,0 +1,89 @@
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from streaks import compute_streaks
+from utils import preprocess_data
+
+EXAMPLE = Path(__file__).resolve().parent.parent / "activities.csv"
+
+
+def previous_running_streaks(run_df):
+    # The loops of the running tab before the streak engine
+    run_df = run_df.copy()
+    run_df['Date'] = run_df['Activity Date'].dt.date
+    run_df['YearWeek'] = run_df['Activity Date'].dt.strftime('%G-%V')
+
+    dates = sorted(run_df['Date'].unique())
+    max_day_streak = current_day_streak = 1
+    for i in range(1, len(dates)):
+        if (dates[i] - dates[i - 1]).days == 1:
+            current_day_streak += 1
+            max_day_streak = max(max_day_streak, current_day_streak)
+        else:
+            current_day_streak = 1
+
+    today = dates[-1]
+    streak = 1
+    for i in range(len(dates) - 2, -1, -1):
+        if (today - dates[i]).days == streak:
+            streak += 1
+        else:
+            break
+    current_day_streak_live = streak
+
+    weeks = sorted(run_df['YearWeek'].unique())
+    week_dates = [datetime.strptime(w + '-1', "%G-%V-%u") for w in weeks]
+
+    max_week_streak = current_week_streak = 1
+    for i in range(1, len(week_dates)):
+        if (week_dates[i] - week_dates[i - 1]).days <= 7:
+            current_week_streak += 1
+            max_week_streak = max(max_week_streak, current_week_streak)
+        else:
+            current_week_streak = 1
+
+    streak = 1
+    latest = week_dates[-1]
+    for i in range(len(week_dates) - 2, -1, -1):
+        expected = latest - timedelta(weeks=streak)
+        if week_dates[i] == expected:
+            streak += 1
+        else:
+            break
+    current_week_streak_live = streak
+
+    return {'day': {'longest': max_day_streak, 'current': current_day_streak_live},
+            'week': {'longest': max_week_streak, 'current': current_week_streak_live}}
+
+
+@pytest.fixture(scope="module")
+def activities():
+    return preprocess_data(pd.read_csv(EXAMPLE, encoding='latin-1', on_bad_lines='skip'))
+
+
+def test_engine_reproduces_the_previous_running_streaks(activities):
+    runs = activities[activities['Activity Type'] == 'Run']
+    selections = [runs] + [runs[runs['Activity Gear'] == gear] for gear in runs['Activity Gear'].dropna().unique()]
+    for run_df in selections:
+        streaks = compute_streaks(run_df)
+        assert {unit: streaks[unit] for unit in ('day', 'week')} == previous_running_streaks(run_df)
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_engine_matches_the_previous_loops_on_dense_dates(seed):
+    # Mostly consecutive days, across ISO year boundaries
+    rng = np.random.default_rng(seed)
+    days = pd.Timestamp("2019-12-20") + pd.to_timedelta(np.cumsum(rng.choice([0, 1, 1, 1, 2, 9], 400)), unit='D')
+    run_df = pd.DataFrame({'Activity Date': days + pd.to_timedelta(rng.integers(5, 21, 400), unit='h')})
+    streaks = compute_streaks(run_df)
+    assert {unit: streaks[unit] for unit in ('day', 'week')} == previous_running_streaks(run_df)
+
+
+def test_months_wrap_across_years():
+    run_df = pd.DataFrame({'Activity Date': pd.to_datetime(["2022-11-30", "2022-12-01", "2023-01-15", "2023-03-01"])})
+    assert compute_streaks(run_df)['month'] == {'longest': 3, 'current': 1}
+    assert compute_streaks(run_df.iloc[:0])['day'] == {'longest': 0, 'current': 0}
@@ -0,0 +1,32 @@
+import numpy as np
+
+from stream_store import StreamStore
+
+
+def test_disk_stats_follow_writes_without_rescanning(tmp_path):
+    store = StreamStore(tmp_path)
+    store.save(1, {'lat': np.arange(10.0)})
+    assert store.stats()["files"] == 1
+    store.save(1, {'lat': np.arange(1000.0)})
+    store.save(1, {'watts': np.arange(5.0)}, kind="power_curve")
+    (tmp_path / "track" / "2.arrow").write_bytes(b"not arrow")
+    store.save(3, {'lat': np.arange(3.0)})
+    # Counted from the first scan on by this store's own writes; the file dropped in next to it is not
+    assert store.stats()["files"] == 3
+
+    fresh = StreamStore(tmp_path)
+    assert fresh.stats()["files"] == 4
+    assert fresh.load(2) is None
+    assert fresh.stats()["files"] == 3
+    assert fresh.stats()["disk_bytes"] == StreamStore(tmp_path).stats()["disk_bytes"]
+
+
+def test_memory_is_bounded_least_recently_used_first(tmp_path):
+    store = StreamStore(tmp_path, max_entries=2)
+    for activity_id in range(3):
+        store.save(activity_id, {'lat': np.arange(10.0)})
+    assert store.stats()["entries"] == 2
+    store.load(1)
+    assert store.stats()["hits"] == 1
+    store.load(0)
+    assert store.stats()["disk_reads"] == 1
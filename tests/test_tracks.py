@@ -0,0 +1,143 @@
+import gzip
+import struct
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from tracks import FIT_EPOCH, SEMICIRCLES, TRACK_COLUMNS, parse_export, parse_fit, parse_track, parse_tracks
+
+START = pd.Timestamp("2024-05-01 08:00:00")
+LAT, LON = 41.38, 2.17
+
+
+def gpx(n):
+    points = "".join(
+        f'<trkpt lat="{LAT + i * 1e-4}" lon="{LON}"><ele>{100 + i}</ele>'
+        f'<time>{(START + pd.Timedelta(seconds=i)).strftime("%Y-%m-%dT%H:%M:%SZ")}</time>'
+        f'<extensions><gpxtpx:TrackPointExtension><gpxtpx:hr>{120 + i}</gpxtpx:hr>'
+        f'<gpxtpx:cad>85</gpxtpx:cad></gpxtpx:TrackPointExtension></extensions></trkpt>'
+        for i in range(n))
+    return ('<?xml version="1.0"?><gpx xmlns="http://www.topografix.com/GPX/1/1" '
+            'xmlns:gpxtpx="http://www.garmin.com/xmlschemas/TrackPointExtension/v1">'
+            f'<metadata><time>2024-05-01T07:00:00Z</time></metadata><trk><trkseg>{points}</trkseg></trk></gpx>')
+
+
+def tcx(n):
+    points = "".join(
+        f'<Trackpoint><Time>{(START + pd.Timedelta(seconds=i)).strftime("%Y-%m-%dT%H:%M:%SZ")}</Time>'
+        f'<Position><LatitudeDegrees>{LAT + i * 1e-4}</LatitudeDegrees><LongitudeDegrees>{LON}'
+        f'</LongitudeDegrees></Position><AltitudeMeters>{100 + i}</AltitudeMeters>'
+        f'<DistanceMeters>{i * 11.0}</DistanceMeters><HeartRateBpm><Value>{120 + i}</Value></HeartRateBpm>'
+        f'<Extensions><TPX><Watts>{200 + i}</Watts></TPX></Extensions></Trackpoint>'
+        for i in range(n))
+    return ('<?xml version="1.0"?><TrainingCenterDatabase '
+            'xmlns="http://www.garmin.com/xmlschemas/TrainingCenterDatabase/v2"><Activities><Activity><Lap>'
+            f'<DistanceMeters>9999</DistanceMeters><AverageHeartRateBpm><Value>1</Value></AverageHeartRateBpm>'
+            f'<Track>{points}</Track></Lap></Activity></Activities></TrainingCenterDatabase>')
+
+
+def fit_definition(local, global_number, fields):
+    # fields: (field number, size, base type)
+    message = struct.pack('<BBBHB', 0x40 | local, 0, 0, global_number, len(fields))
+    return message + b''.join(struct.pack('<BBB', *field) for field in fields)
+
+
+def fit_file(messages):
+    data = b''.join(messages)
+    return struct.pack('<BBHI4s', 12, 0x10, 2093, len(data), b'.FIT') + data + b'\x00\x00'
+
+
+def semicircles(degrees):
+    return int(round(degrees / SEMICIRCLES))
+
+
+def fit_with_compressed_timestamps(start, n):
+    # One full record (timestamp, lat, lon, hr, altitude), then records whose time only comes
+    # from the 5-bit offset of a compressed timestamp header; they run past a 32 s rollover
+    messages = [
+        fit_definition(0, 0, [(1, 2, 0x84)]),  # file_id, not a record: skipped
+        struct.pack('<BH', 0, 255),
+        fit_definition(0, 20, [(253, 4, 0x86), (0, 4, 0x85), (1, 4, 0x85), (3, 1, 0x02), (2, 2, 0x84)]),
+        struct.pack('<BIiiBH', 0, start, semicircles(LAT), semicircles(LON), 120, (100 + 500) * 5),
+        fit_definition(1, 20, [(0, 4, 0x85), (1, 4, 0x85), (3, 1, 0x02)]),
+    ]
+    for i in range(1, n):
+        hr = 0xFF if i == 3 else 120 + i  # 0xFF is the invalid marker of uint8
+        header = 0x80 | (1 << 5) | ((start + i) & 0x1F)
+        messages.append(struct.pack('<BiiB', header, semicircles(LAT + i * 1e-4), semicircles(LON), hr))
+    return fit_file(messages)
+
+
+def assert_track(track, n):
+    assert set(track) == set(TRACK_COLUMNS)
+    assert all(len(values) == n for values in track.values())
+    assert track['time'][0] == np.datetime64(START.to_datetime64(), 's')
+    assert (np.diff(track['time']) == np.timedelta64(1, 's')).all()
+    np.testing.assert_allclose(track['lat'], LAT + np.arange(n) * 1e-4, atol=1e-6)
+    # Cumulative distance starts at zero and grows along the track
+    assert track['distance'][0] == 0 and (np.diff(track['distance']) > 0).all()
+
+
+@pytest.mark.parametrize("name, content", [("a.gpx", gpx), ("a.tcx", tcx)])
+@pytest.mark.parametrize("compressed", [False, True])
+def test_xml_tracks(tmp_path, name, content, compressed):
+    path = tmp_path / (name + (".gz" if compressed else ""))
+    data = content(30).encode()
+    path.write_bytes(gzip.compress(data) if compressed else data)
+    track = parse_track(path)
+    assert_track(track, 30)
+    np.testing.assert_array_equal(track['hr'], 120 + np.arange(30))
+    np.testing.assert_array_equal(track['ele'], 100 + np.arange(30))
+    if name.endswith(".tcx"):
+        # Point distances, not the lap total; power from the TPX extension
+        np.testing.assert_array_equal(track['distance'], np.arange(30) * 11.0)
+        np.testing.assert_array_equal(track['power'], 200 + np.arange(30))
+
+
+def test_fit_compressed_timestamps(tmp_path):
+    start = int(START.timestamp()) - FIT_EPOCH
+    # 40 one-second records wrap the 5-bit offset at least once
+    data = fit_with_compressed_timestamps(start, 40)
+    track = parse_fit(data)
+    assert_track(track, 40)
+    assert np.isnan(track['hr'][3]) and track['hr'][4] == 124
+    assert track['ele'][0] == pytest.approx(100) and np.isnan(track['ele'][1:]).all()
+
+    path = tmp_path / "a.fit.gz"
+    path.write_bytes(gzip.compress(data))
+    np.testing.assert_array_equal(parse_track(path)['time'], track['time'])
+
+
+def test_fit_chained_files():
+    start = int(START.timestamp()) - FIT_EPOCH
+    first = fit_with_compressed_timestamps(start, 10)
+    second = fit_with_compressed_timestamps(start + 10, 10)
+    track = parse_fit(first + second)
+    assert len(track['time']) == 20
+    assert (np.diff(track['time']) == np.timedelta64(1, 's')).all()
+
+
+def test_parse_export_yields_readable_tracks(tmp_path):
+    (tmp_path / "activities").mkdir()
+    (tmp_path / "activities" / "1.gpx").write_text(gpx(5))
+    (tmp_path / "activities" / "2.tcx.gz").write_bytes(gzip.compress(tcx(6).encode()))
+    (tmp_path / "activities" / "3.fit").write_bytes(b"not a fit file")
+    df = pd.DataFrame({'Activity ID': [1, 2, 3, 4, 5],
+                       'Filename': ['activities/1.gpx', 'activities/2.tcx.gz', 'activities/3.fit',
+                                    'activities/4.gpx', None]})
+    serial = dict(parse_export(df, tmp_path, workers=1))
+    assert {activity_id: len(track['time']) for activity_id, track in serial.items()} == {1: 5, 2: 6}
+    pooled = dict(parse_export(df, tmp_path, workers=2))
+    assert serial.keys() == pooled.keys()
+    for activity_id in serial:
+        np.testing.assert_array_equal(serial[activity_id]['lat'], pooled[activity_id]['lat'])
+
+
+def test_parse_tracks_maps_unreadable_files_to_none(tmp_path):
+    paths = [tmp_path / f"{i}.gpx" for i in range(3)]
+    for i, path in enumerate(paths):
+        path.write_text(gpx(4) if i != 1 else "<gpx")
+    parsed = dict(parse_tracks(paths, workers=1))
+    assert parsed[str(paths[1])] is None
+    assert len(parsed[str(paths[2])]['time']) == 4
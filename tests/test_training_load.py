@@ -0,0 +1,89 @@
+import numpy as np
+import pandas as pd
+import pytest
+import streamlit as st
+
+import training_load
+
+from training_load import (MAX_LAST_HISTORIES, LoadState, advance, compute_training_load, daily_load,
+                           extend_history, last_state, training_load_history)
+
+
+@pytest.fixture
+def activities():
+    # Two athletes, irregular days with rest gaps and several activities on some days
+    rng = np.random.default_rng(3)
+    days = pd.Timestamp("2023-01-01") + pd.to_timedelta(np.sort(rng.integers(0, 300, 400)), unit='D')
+    return pd.DataFrame({
+        'Activity ID': np.arange(400),
+        'Activity Date': days + pd.to_timedelta(rng.integers(6, 20, 400), unit='h'),
+        'Moving Time': rng.uniform(1200, 7200, 400),
+        'Intensity Factor': rng.uniform(0.6, 1.0, 400),
+        'Athlete': rng.choice(['a', 'b'], 400),
+    }).sort_values('Activity Date', ignore_index=True)
+
+
+def test_advance_matches_full_recompute(activities):
+    daily = daily_load(activities)
+    full = compute_training_load(daily)
+    state = LoadState(daily.index[0] - pd.Timedelta(days=1), 0.0, 0.0)
+    # Activity by activity, in date order; several on one day add on top of each other
+    loads = activities['Moving Time'] / 3600 * activities['Intensity Factor']
+    for date, load in zip(activities['Activity Date'], loads):
+        state = advance(state, date, load)
+    assert state.day == full.index[-1]
+    assert state.ctl == pytest.approx(full['CTL'].iloc[-1])
+    assert state.atl == pytest.approx(full['ATL'].iloc[-1])
+
+
+def test_advance_rejects_older_days():
+    with pytest.raises(ValueError):
+        advance(LoadState(pd.Timestamp("2024-01-10"), 1.0, 1.0), "2024-01-09", 1.0)
+
+
+@pytest.mark.parametrize("cut", [100, 250, 399])
+def test_extend_history_matches_full_recompute(activities, cut):
+    full = compute_training_load(daily_load(activities))
+    head = compute_training_load(daily_load(activities.iloc[:cut]))
+    pd.testing.assert_frame_equal(extend_history(head, activities.iloc[cut:]), full, check_freq=False)
+
+
+def test_state_carries_over_rest_days(activities):
+    full = compute_training_load(daily_load(activities))
+    days = activities['Activity Date'].dt.normalize()
+    # Split at a rest gap so the continuation starts days after the state
+    gap = np.flatnonzero(np.diff(days.to_numpy()) > np.timedelta64(1, 'D'))[0] + 1
+    head = compute_training_load(daily_load(activities.iloc[:gap]))
+    tail = compute_training_load(daily_load(activities.iloc[gap:]), last_state(head))
+    pd.testing.assert_frame_equal(tail, full.loc[tail.index], check_freq=False)
+
+
+def test_extend_history_refuses_backfilled_activities(activities):
+    head = compute_training_load(daily_load(activities.iloc[50:]))
+    assert extend_history(head, activities.iloc[:50]) is None
+    assert extend_history(head, activities.iloc[:0]) is head
+
+
+def test_athletes_are_independent_columns(activities):
+    per_athlete = compute_training_load(daily_load(activities, by='Athlete'))
+    for athlete, group in activities.groupby('Athlete'):
+        alone = compute_training_load(daily_load(group, start=per_athlete.index[0], end=per_athlete.index[-1]))
+        np.testing.assert_allclose(per_athlete[('CTL', athlete)], alone['CTL'])
+        np.testing.assert_allclose(per_athlete[('TSB', athlete)], alone['TSB'])
+
+
+def test_history_extends_the_last_one_per_source(activities, monkeypatch):
+    st.session_state.pop("training_load_last", None)
+    full = compute_training_load(daily_load(activities))
+    training_load_history("head", activities.iloc[:300], "athlete")
+    with monkeypatch.context() as patch:
+        # Only the added activities are folded in
+        patch.setattr(training_load, "compute_training_load", None)
+        history = training_load_history("all", activities, "athlete")
+    pd.testing.assert_frame_equal(history, full, check_freq=False)
+    # A narrower selection is recomputed, not extended
+    narrow = training_load_history("narrow", activities.iloc[100:], "athlete")
+    pd.testing.assert_frame_equal(narrow, compute_training_load(daily_load(activities.iloc[100:])), check_freq=False)
+    for source in range(MAX_LAST_HISTORIES + 2):
+        training_load_history(f"source-{source}", activities.iloc[:10 + source], source)
+    assert list(st.session_state["training_load_last"]) == list(range(2, MAX_LAST_HISTORIES + 2))
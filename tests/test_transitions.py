@@ -0,0 +1,61 @@
+from collections import Counter
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from transitions import MODES, linked_activities, sequence_counts, transition_matrix
+from utils import preprocess_data
+
+EXAMPLE = Path(__file__).resolve().parent.parent / "activities.csv"
+
+
+def previous_transitions(df, mode):
+    # The shift/groupby transitions of the general tab
+    if mode == "Chronological":
+        df_sorted = df.sort_values("Activity Date").reset_index(drop=True)
+        df_sorted['Current'] = df_sorted['Activity Type']
+        df_sorted['Next'] = df_sorted['Activity Type'].shift(-1)
+        df_transitions = df_sorted[:-1]
+    else:
+        df_day = df.copy()
+        df_day['Date'] = df_day['Activity Date'].dt.date
+        df_day = df_day.sort_values(['Date', 'Activity Date'])
+        df_day = df_day.drop_duplicates(subset=['Date', 'Activity Type'])
+        df_day['Next'] = df_day.groupby('Date')['Activity Type'].shift(-1)
+        df_day['Current'] = df_day['Activity Type']
+        df_transitions = df_day.dropna(subset=['Next'])
+    return df_transitions.groupby(['Current', 'Next']).size().reset_index(name='Count')
+
+
+def brute_force_sequences(df, length, max_gap_hours):
+    # Every window of `length` consecutive activities whose neighbours are close enough in time
+    df = df.sort_values('Activity Date', kind='stable')
+    types, dates = list(df['Activity Type']), list(df['Activity Date'])
+    counts = Counter()
+    for start in range(len(types) - length + 1):
+        gaps = [dates[i + 1] - dates[i] for i in range(start, start + length - 1)]
+        if all(gap <= pd.Timedelta(hours=max_gap_hours) for gap in gaps):
+            counts[" → ".join(types[start:start + length])] += 1
+    return counts
+
+
+@pytest.fixture(scope="module")
+def activities():
+    df = preprocess_data(pd.read_csv(EXAMPLE, encoding='latin-1', on_bad_lines='skip'))
+    return df.dropna(subset=['Activity Date', 'Activity Type'])
+
+
+@pytest.mark.parametrize("mode", MODES)
+def test_matrix_reproduces_the_previous_transitions(activities, mode):
+    matrix = transition_matrix(*linked_activities(activities, mode))
+    pd.testing.assert_frame_equal(matrix, previous_transitions(activities, mode), check_dtype=False)
+
+
+@pytest.mark.parametrize("length", [2, 3, 4])
+def test_sequences_match_a_brute_force_scan(activities, length):
+    codes, linked, labels = linked_activities(activities, "Chronological", 12)
+    sequences = sequence_counts(codes, linked, labels, length - 1)
+    assert dict(zip(sequences['Sequence'], sequences['Count'])) == brute_force_sequences(activities, length, 12)
+    assert np.all(np.diff(sequences['Count']) <= 0)
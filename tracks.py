@@ -0,0 +1,326 @@
+import gzip
+import multiprocessing
+import os
+import queue
+import struct
+import sys
+import threading
+import types
+import xml.etree.ElementTree as ET
+from contextlib import contextmanager
+from itertools import islice
+from pathlib import Path
+
+import pandas as pd
+import numpy as np
+
+TRACK_COLUMNS = ('time', 'lat', 'lon', 'ele', 'hr', 'cadence', 'power', 'distance')
+TRACK_EXTENSIONS = ('.gpx', '.tcx', '.fit')
+EARTH_RADIUS_M = 6371008.8
+
+# GPX/TCX element (local name) -> track column; GPX lat/lon come from trkpt attributes.
+# Only read inside a point element, so lap totals such as TCX DistanceMeters are ignored.
+XML_POINTS = {'trkpt', 'Trackpoint'}
+XML_FIELDS = {
+    'time': 'time', 'Time': 'time',
+    'ele': 'ele', 'AltitudeMeters': 'ele',
+    'LatitudeDegrees': 'lat', 'LongitudeDegrees': 'lon',
+    'DistanceMeters': 'distance',
+    'hr': 'hr', 'Value': 'hr',
+    'cad': 'cadence', 'Cadence': 'cadence', 'RunCadence': 'cadence',
+    'power': 'power', 'Watts': 'power',
+}
+
+FIT_EPOCH = 631065600  # 1989-12-31T00:00:00Z, the FIT timestamp origin, in Unix seconds
+FIT_RECORD = 20
+SEMICIRCLES = 180 / 2 ** 31
+# FIT base type (low 5 bits) -> (struct code, size, invalid value)
+FIT_TYPES = {
+    0: ('B', 1, 0xFF), 1: ('b', 1, 0x7F), 2: ('B', 1, 0xFF), 3: ('h', 2, 0x7FFF),
+    4: ('H', 2, 0xFFFF), 5: ('i', 4, 0x7FFFFFFF), 6: ('I', 4, 0xFFFFFFFF), 8: ('f', 4, None),
+    9: ('d', 8, None), 10: ('B', 1, 0), 11: ('H', 2, 0), 12: ('I', 4, 0),
+    14: ('q', 8, 0x7FFFFFFFFFFFFFFF), 15: ('Q', 8, 0xFFFFFFFFFFFFFFFF), 16: ('Q', 8, 0),
+}
+# record message field number -> (track column, scale, offset)
+FIT_RECORD_FIELDS = {
+    253: ('time', 1, 0),
+    0: ('lat', 1 / SEMICIRCLES, 0),
+    1: ('lon', 1 / SEMICIRCLES, 0),
+    2: ('ele', 5, 500),
+    78: ('ele', 5, 500),  # enhanced_altitude; decoded after field 2 so it wins when present
+    3: ('hr', 1, 0),
+    4: ('cadence', 1, 0),
+    5: ('distance', 100, 0),
+    7: ('power', 1, 0),
+}
+
+
+def open_track(path):
+    path = str(path)
+    return gzip.open(path, 'rb') if path.endswith('.gz') else open(path, 'rb')
+
+
+def track_format(path):
+    name = str(path).lower()
+    name = name[:-3] if name.endswith('.gz') else name
+    return os.path.splitext(name)[1]
+
+
+def _local(tag):
+    return tag.rsplit('}', 1)[-1]
+
+
+def _to_number(text):
+    try:
+        return float(text)
+    except (TypeError, ValueError):
+        return np.nan
+
+
+def parse_xml_track(stream):
+    # Streaming GPX/TCX reader: only the current point is ever held, every finished point
+    # is cleared from its parent so memory stays flat however long the track is
+    columns = {name: [] for name in TRACK_COLUMNS}
+    point = None
+    parents = []
+    for event, elem in ET.iterparse(stream, events=('start', 'end')):
+        name = _local(elem.tag)
+        if event == 'start':
+            if name in XML_POINTS:
+                point = {'lat': elem.get('lat'), 'lon': elem.get('lon')}
+            elif point is None:
+                parents.append(elem)
+            continue
+        if point is None:
+            if parents and parents[-1] is elem:
+                parents.pop()
+            continue
+        if name in XML_POINTS:
+            for column in TRACK_COLUMNS:
+                columns[column].append(point.get(column))
+            point = None
+            elem.clear()
+            if parents:
+                parents[-1].clear()
+        elif name in XML_FIELDS:
+            point[XML_FIELDS[name]] = elem.text
+    return _to_arrays(columns, iso_times=True)
+
+
+def _fit_definition(data, pos, header):
+    architecture = data[pos + 1]
+    endian = '>' if architecture == 1 else '<'
+    global_number, n_fields = struct.unpack_from(endian + 'HB', data, pos + 2)
+    pos += 5
+    codes, fields = [], []
+    for i in range(n_fields):
+        number, size, base_type = data[pos + 3 * i:pos + 3 * i + 3]
+        code, type_size, invalid = FIT_TYPES.get(base_type & 0x1F, (None, 0, None))
+        if global_number == FIT_RECORD and number in FIT_RECORD_FIELDS and code and size == type_size:
+            fields.append((len(codes), number, invalid))
+            codes.append(code)
+        else:
+            codes.append(f'{size}x')
+    pos += 3 * n_fields
+    if header & 0x20:  # developer fields: skipped by size
+        n_dev = data[pos]
+        codes.extend(f'{data[pos + 1 + 3 * i + 1]}x' for i in range(n_dev))
+        pos += 1 + 3 * n_dev
+    layout = struct.Struct(endian + ''.join(codes))
+    # Padding codes produce no values, so remap each kept field to its position among the values
+    kept = [i for i, code in enumerate(codes) if not code.endswith('x')]
+    fields = [(kept.index(index), number, invalid) for index, number, invalid in fields]
+    return pos, (global_number, layout, sorted(fields, key=lambda field: field[1]))
+
+
+def parse_fit(data):
+    # Minimal FIT decoder: definition + data messages, compressed timestamp headers, developer
+    # fields and chained files. Only record messages (global 20) are kept.
+    columns = {name: [] for name in TRACK_COLUMNS}
+    offset = 0
+    while offset + 12 <= len(data):
+        header_size = data[offset]
+        data_size = struct.unpack_from('<I', data, offset + 4)[0]
+        if data[offset + 8:offset + 12] != b'.FIT':
+            raise ValueError("Not a FIT file")
+        pos, end = offset + header_size, offset + header_size + data_size
+        definitions = {}
+        last_time = None
+        while pos < end:
+            header = data[pos]
+            pos += 1
+            if header & 0x80:  # compressed timestamp header
+                local, time_offset = (header >> 5) & 0x03, header & 0x1F
+                if last_time is not None:
+                    last_time += (time_offset - last_time) & 0x1F
+            elif header & 0x40:
+                pos, definitions[header & 0x0F] = _fit_definition(data, pos, header)
+                continue
+            else:
+                local, time_offset = header & 0x0F, None
+            global_number, layout, fields = definitions[local]
+            values = layout.unpack_from(data, pos)
+            pos += layout.size
+            if global_number != FIT_RECORD:
+                continue
+            point = {}
+            for index, number, invalid in fields:
+                value = values[index]
+                if value != invalid:
+                    column, scale, shift = FIT_RECORD_FIELDS[number]
+                    point[column] = value / scale - shift
+            if 'time' in point:
+                last_time = int(point['time'])
+            elif time_offset is not None and last_time is not None:
+                point['time'] = last_time
+            for column in TRACK_COLUMNS:
+                columns[column].append(point.get(column))
+        offset = end + 2  # file CRC
+    return _to_arrays(columns, iso_times=False)
+
+
+def _to_arrays(columns, iso_times):
+    arrays = {}
+    for column in TRACK_COLUMNS[1:]:
+        arrays[column] = np.array([_to_number(v) for v in columns[column]], dtype=np.float64)
+    if iso_times:
+        times = pd.to_datetime(pd.Series(columns['time'], dtype=object), utc=True, errors='coerce')
+        times = times.dt.tz_localize(None)
+    else:
+        times = pd.to_datetime(pd.Series(columns['time'], dtype=float) + FIT_EPOCH, unit='s')
+    arrays['time'] = times.to_numpy().astype('datetime64[s]')
+    for column in ('hr', 'cadence', 'power'):
+        arrays[column] = arrays[column].astype(np.float32)
+    if np.isnan(arrays['distance']).all():
+        arrays['distance'] = cumulative_distance(arrays['lat'], arrays['lon'])
+    return {column: arrays[column] for column in TRACK_COLUMNS}
+
+
+def cumulative_distance(lat, lon):
+    # Haversine distance along the track in meters, starting at 0; gaps without a fix add nothing
+    if len(lat) == 0:
+        return np.empty(0)
+    phi, lam = np.radians(lat), np.radians(lon)
+    a = (np.sin(np.diff(phi) / 2) ** 2
+         + np.cos(phi[:-1]) * np.cos(phi[1:]) * np.sin(np.diff(lam) / 2) ** 2)
+    steps = 2 * EARTH_RADIUS_M * np.arcsin(np.sqrt(np.clip(a, 0, 1)))
+    return np.r_[0.0, np.cumsum(np.nan_to_num(steps))]
+
+
+def parse_track(path):
+    # Dict of equal-length NumPy arrays, one per TRACK_COLUMNS entry (NaN/NaT where missing)
+    kind = track_format(path)
+    with open_track(path) as stream:
+        if kind == '.fit':
+            return parse_fit(stream.read())
+        if kind in ('.gpx', '.tcx'):
+            return parse_xml_track(stream)
+    raise ValueError(f"Unsupported track format: {path}")
+
+
+def _parse_safely(path):
+    try:
+        return parse_track(path)
+    except (OSError, ValueError, KeyError, struct.error, ET.ParseError):
+        return None
+
+
+def find_tracks(directory):
+    return sorted(p for p in Path(directory).rglob('*')
+                  if p.is_file() and track_format(p) in TRACK_EXTENSIONS)
+
+
+def _parse_entry(path):
+    return path, _parse_safely(path)
+
+
+_MAIN_LOCK = threading.Lock()
+
+
+@contextmanager
+def _bare_main():
+    # forkserver children re-run the parent's __main__ before taking work, and under Streamlit that
+    # is the app script. A bare module stands in while the pool starts its workers.
+    with _MAIN_LOCK:
+        main = sys.modules['__main__']
+        sys.modules['__main__'] = types.ModuleType('__main__')
+        try:
+            yield
+        finally:
+            sys.modules['__main__'] = main
+
+
+def parse_tracks(paths, workers=None, window=32):
+    # Yields (path, track arrays or None) as files finish parsing, in completion order. At most
+    # `window` files are in flight, so memory stays flat however big the export.
+    paths = iter([str(p) for p in paths])
+    if workers == 1:
+        yield from map(_parse_entry, paths)
+        return
+    # Workers come from a forkserver, not a fork of the multi-threaded server, which could hand a
+    # child a lock held by another thread; the pool starts all of them up front
+    context = multiprocessing.get_context("forkserver")
+    # The server imports this module (NumPy, pandas) once instead of every worker importing it
+    context.set_forkserver_preload([__name__])
+    with _bare_main():
+        pool = context.Pool(workers)
+    with pool:
+        done = queue.Queue()
+
+        def submit(path):
+            # A file whose result cannot come back (e.g. a worker crash) maps to None like a bad file
+            pool.apply_async(_parse_entry, (path,), callback=done.put,
+                             error_callback=lambda error: done.put((path, None)))
+
+        pending = 0
+        for path in islice(paths, window):
+            submit(path)
+            pending += 1
+        while pending:
+            path, arrays = done.get()
+            pending -= 1
+            for following in islice(paths, 1):
+                submit(following)
+                pending += 1
+            yield path, arrays
+
+
+def parse_export(df, export_dir, workers=None):
+    # Yields (Activity ID, track arrays) for every readable export file under export_dir, one at a
+    # time, so StreamStore.ingest writes each track out before the next one is held
+    files = df[['Activity ID', 'Filename']].dropna()
+    paths = files['Filename'].map(lambda name: str(Path(export_dir) / name))
+    exists = paths.map(os.path.exists).to_numpy(dtype=bool)
+    ids = dict(zip(paths[exists], files['Activity ID'][exists]))
+    for path, arrays in parse_tracks(ids, workers):
+        if arrays is not None:
+            yield ids[path], arrays
+
+
+def api_streams_to_track(streams, start):
+    # Strava activity streams (key_by_type or list form) -> track arrays; the API's time stream
+    # is seconds since the activity start
+    if isinstance(streams, list):
+        streams = {stream['type']: stream for stream in streams}
+    data = {key: np.asarray(stream['data']) for key, stream in streams.items()}
+    n = len(next(iter(data.values()))) if data else 0
+    missing = np.full(n, np.nan)
+    latlng = data.get('latlng')
+    latlng = latlng.astype(float).reshape(n, 2) if latlng is not None and len(latlng) == n else np.full((n, 2), np.nan)
+    offsets = data.get('time', np.arange(n)).astype('timedelta64[s]')
+    start = pd.Timestamp(start)
+    if start.tzinfo is not None:
+        start = start.tz_convert(None)
+    distance = data.get('distance', missing).astype(np.float64)
+    if np.isnan(distance).all():
+        distance = cumulative_distance(latlng[:, 0], latlng[:, 1])
+    return {
+        'time': start.to_datetime64().astype('datetime64[s]') + offsets,
+        'lat': latlng[:, 0],
+        'lon': latlng[:, 1],
+        'ele': data.get('altitude', missing).astype(np.float64),
+        'hr': data.get('heartrate', missing).astype(np.float32),
+        'cadence': data.get('cadence', missing).astype(np.float32),
+        'power': data.get('watts', missing).astype(np.float32),
+        'distance': distance,
+    }
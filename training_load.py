@@ -0,0 +1,140 @@
+from collections import OrderedDict
+from typing import NamedTuple
+
+import streamlit as st
+import pandas as pd
+import numpy as np
+
+CTL_DAYS = 42  # typical CTL (fitness) time constant
+ATL_DAYS = 7   # typical ATL (fatigue) time constant
+
+
+class LoadState(NamedTuple):
+    # CTL/ATL after the load of `day` was applied; ctl/atl may be arrays (one entry per athlete)
+    day: pd.Timestamp
+    ctl: object
+    atl: object
+
+
+def activity_load(df):
+    # Relative Effort (TSS-like) per activity: moving hours x Intensity Factor, or hours as a fallback
+    hours = df['Moving Time'] / 3600
+    if 'Intensity Factor' in df.columns:
+        return hours * df['Intensity Factor']
+    return hours
+
+
+def daily_load(df, by=None, start=None, end=None):
+    # Sum of load per calendar day on a dense daily axis (rest days = 0).
+    # With `by` (e.g. an athlete column) each group becomes its own column.
+    days = df['Activity Date'].dt.normalize().rename('Day')
+    load = activity_load(df).fillna(0)
+    if by is None:
+        daily = load.groupby(days).sum()
+    else:
+        daily = load.groupby([days, df[by]]).sum().unstack(fill_value=0.0)
+    if daily.empty:
+        return daily
+    index = pd.date_range(start or daily.index.min(), end or daily.index.max(), freq='D', name='Day')
+    return daily.reindex(index, fill_value=0.0)
+
+
+def decay(time_constant):
+    return 1 - np.exp(-1 / time_constant)
+
+
+def _ewm(daily, time_constant, initial):
+    # y[t] = y[t-1] + a * (x[t] - y[t-1]), seeded with `initial` as the value of the day before
+    frame = daily.to_frame() if isinstance(daily, pd.Series) else daily
+    seed = pd.DataFrame(np.broadcast_to(initial, (1, frame.shape[1])), columns=frame.columns)
+    out = pd.concat([seed, frame], ignore_index=True).ewm(alpha=decay(time_constant), adjust=False).mean()
+    out = out.iloc[1:].set_axis(daily.index)
+    return out.iloc[:, 0] if isinstance(daily, pd.Series) else out
+
+
+def compute_training_load(daily, state=None, ctl_days=CTL_DAYS, atl_days=ATL_DAYS):
+    # CTL/ATL/TSB for a dense daily load series (or one column per athlete). When `state` is given
+    # the series continues from it; rest days between state.day and the first new day are decayed.
+    ctl0 = atl0 = 0.0
+    if state is not None:
+        gap = (daily.index[0] - state.day).days - 1
+        ctl0 = state.ctl * np.exp(-gap / ctl_days)
+        atl0 = state.atl * np.exp(-gap / atl_days)
+    ctl = _ewm(daily, ctl_days, ctl0)
+    atl = _ewm(daily, atl_days, atl0)
+    if isinstance(daily, pd.DataFrame):
+        return pd.concat({'CTL': ctl, 'ATL': atl, 'TSB': ctl - atl}, axis=1)
+    return pd.DataFrame({'CTL': ctl, 'ATL': atl, 'TSB': ctl - atl})
+
+
+def last_state(history):
+    day = history.index[-1]
+    return LoadState(day, np.asarray(history['CTL'].iloc[-1]), np.asarray(history['ATL'].iloc[-1]))
+
+
+def advance(state, day, load, ctl_days=CTL_DAYS, atl_days=ATL_DAYS):
+    # O(1) update for a new activity: decay the state forward to `day`, then add its load.
+    # Loads on a day already applied (gap 0) simply add on top.
+    day = pd.Timestamp(day).normalize()
+    gap = (day - state.day).days
+    if gap < 0:
+        raise ValueError("advance() only moves forward; recompute the history for older activities")
+    ctl = state.ctl * np.exp(-gap / ctl_days) + decay(ctl_days) * load
+    atl = state.atl * np.exp(-gap / atl_days) + decay(atl_days) * load
+    return LoadState(day, ctl, atl)
+
+
+def extend_history(history, new_df):
+    # Carries a history forward over activities added since it was computed: advance() once per
+    # day from its last day on, instead of re-running the EWM over the whole series. None when an
+    # added activity predates the last day of the history, which needs a full recompute.
+    state = LoadState(history.index[-1], history['CTL'].iloc[-1], history['ATL'].iloc[-1])
+    if new_df.empty:
+        return history
+    if new_df['Activity Date'].min().normalize() < state.day:
+        return None
+    daily = daily_load(new_df, start=state.day)
+    rows = []
+    for day, load in daily.items():
+        state = advance(state, day, load)
+        rows.append((day, state.ctl, state.atl))
+    added = pd.DataFrame(rows, columns=['Day', 'CTL', 'ATL']).set_index('Day')
+    added['TSB'] = added['CTL'] - added['ATL']
+    # The first row is the history's own last day, now with the added load of that day on top
+    return pd.concat([history.iloc[:-1], added])
+
+
+# Previous histories kept per session for at most this many sources (athletes/uploads)
+MAX_LAST_HISTORIES = 4
+
+
+@st.cache_data(show_spinner=False, max_entries=16)
+def _training_load(key, _df, _previous=None):
+    # Extends `_previous` (sorted Activity IDs, history) when it covers a subset of the activities;
+    # when activities were removed (e.g. a narrower date filter) the series is recomputed
+    ids = np.sort(_df['Activity ID'].to_numpy(dtype=np.int64))
+    history = None
+    if _previous is not None and len(ids):
+        seen, last = _previous
+        position = np.minimum(np.searchsorted(ids, seen), len(ids) - 1)
+        if (ids[position] == seen).all():
+            history = extend_history(last, _df[~_df['Activity ID'].isin(seen)])
+    if history is None:
+        daily = daily_load(_df)
+        if daily.empty:
+            return ids, pd.DataFrame(columns=['CTL', 'ATL', 'TSB'])
+        history = compute_training_load(daily)
+    return ids, history
+
+
+def training_load_history(key, df, source=None):
+    # `source` names the athlete/data source whose last history, kept in this session only, may be
+    # extended after a sync or a new export instead of recomputed
+    last = st.session_state.setdefault("training_load_last", OrderedDict())
+    ids, history = _training_load(key, df, last.get(source) if source is not None else None)
+    if source is not None and not history.empty:
+        last[source] = (ids, history)
+        last.move_to_end(source)
+        while len(last) > MAX_LAST_HISTORIES:
+            last.popitem(last=False)
+    return history
@@ -0,0 +1,70 @@
+import streamlit as st
+import pandas as pd
+import numpy as np
+
+MODES = ["Chronological", "Same Day (No Repeats)"]
+
+
+def linked_activities(df, mode="Chronological", max_gap_hours=None):
+    # Activity type codes in time order, plus a flag per consecutive pair telling whether
+    # activity i -> i+1 counts as a transition under `mode` and the optional time window
+    df = df[['Activity Date', 'Activity Type']].dropna()
+    if not df['Activity Date'].is_monotonic_increasing:
+        df = df.sort_values('Activity Date', kind='stable')
+    codes, labels = pd.factorize(df['Activity Type'], sort=True)
+    times = df['Activity Date'].to_numpy().astype('datetime64[s]').astype(np.int64)
+    days = times // 86400
+    if mode == "Same Day (No Repeats)":
+        # Keep the first activity of each type per day, then only link activities on the same day
+        first = ~pd.Series(days * len(labels) + codes).duplicated().to_numpy()
+        codes, times, days = codes[first], times[first], days[first]
+        linked = days[1:] == days[:-1]
+    else:
+        linked = np.ones(max(len(codes) - 1, 0), dtype=bool)
+    if max_gap_hours:
+        linked &= np.diff(times) <= max_gap_hours * 3600
+    return codes, linked, np.asarray(labels)
+
+
+def sequence_codes(codes, linked, steps, k):
+    # Base-k code of every run of `steps` linked transitions (steps + 1 activities), O(n * steps)
+    n = len(codes) - steps
+    if n <= 0:
+        return np.empty(0, dtype=np.int64)
+    # A start is valid when none of its `steps` pairs is broken: windowed sum over the breaks
+    breaks = np.r_[0, np.cumsum(~linked)]
+    valid = breaks[steps:steps + n] - breaks[:n] == 0
+    combined = np.zeros(n, dtype=np.int64)
+    for offset in range(steps + 1):
+        combined = combined * k + codes[offset:offset + n]
+    return combined[valid]
+
+
+def transition_matrix(codes, linked, labels):
+    # Counts of (current, next) pairs with a single bincount over current * k + next
+    k = len(labels)
+    counts = np.bincount(sequence_codes(codes, linked, 1, k), minlength=k * k).reshape(k, k)
+    current, following = np.nonzero(counts)
+    return pd.DataFrame({
+        'Current': labels[current],
+        'Next': labels[following],
+        'Count': counts[current, following],
+    })
+
+
+def sequence_counts(codes, linked, labels, steps):
+    k = len(labels)
+    values, counts = np.unique(sequence_codes(codes, linked, steps, k), return_counts=True)
+    # Decode the base-k codes back into activity types, first activity in the highest digit
+    digits = (values[:, None] // k ** np.arange(steps, -1, -1)[None, :]) % k
+    order = np.argsort(-counts, kind='stable')
+    return pd.DataFrame({
+        'Sequence': [" → ".join(labels[row]) for row in digits[order]],
+        'Count': counts[order],
+    })
+
+
+@st.cache_data(show_spinner=False, max_entries=32)
+def transition_summary(key, _df, mode="Chronological", steps=1, max_gap_hours=None):
+    codes, linked, labels = linked_activities(_df, mode, max_gap_hours)
+    return transition_matrix(codes, linked, labels), sequence_counts(codes, linked, labels, steps)
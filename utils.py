@@ -1,10 +1,14 @@
+import streamlit as st
 import pandas as pd
+from ride_rules import classify_rides
 
 def preprocess_data(df):
     df.dropna(axis=1, how='all', inplace=True)
     df = df[df['Activity Type'].str.contains('Ride|Run|Swim|Weight Training', na=False)]
     df['Distance'] = df['Distance.1']
-    df['Activity Date'] = pd.to_datetime(df['Activity Date'])
+    df['Activity Date'] = pd.to_datetime(df['Activity Date'], errors='coerce')
+    # Kept sorted by date so date ranges can be selected with a binary search
+    df = df.dropna(subset=['Activity Date']).sort_values('Activity Date', kind='stable').reset_index(drop=True)
 
     df['Hour'] = df['Activity Date'].dt.hour + 1
     df['Day'] = df['Activity Date'].dt.day
@@ -21,4 +25,47 @@ def preprocess_data(df):
         'Workout': 'Padel'
     })
 
+    # Ride type (Indoor/MTB/Road) is evaluated once here from the rules in ride_rules
+    is_ride = df['Activity Type'] == 'Ride'
+    df.loc[is_ride, 'Ride Type'] = classify_rides(df[is_ride])
+
     return df
+
+
+# Count/sum cube over the calendar dimensions used by the heatmaps and bar charts.
+# Built once per dataset; charts answer their groupbys by rolling it up.
+CUBE_DIMS = ['Year', 'Month', 'Week', 'DayOfWeek', 'Hour', 'Activity Type']
+
+
+def dataset_key(df, *parts):
+    key = df.attrs.get('dataset_key')
+    if key is None:
+        ids = df['Activity ID'] if 'Activity ID' in df.columns else df.index.to_series()
+        key = f"{len(df)}-{pd.util.hash_pandas_object(ids, index=False).sum()}"
+    return ":".join([key, *map(str, parts)])
+
+
+def iso_week_start(year, week):
+    # Monday of each ISO year/week pair; %V needs two-digit weeks, e.g. 2024 week 1 is '2024011'
+    return pd.to_datetime(year.astype(str) + week.astype(str).str.zfill(2) + '1', format='%G%V%u')
+
+
+def build_activity_cube(df):
+    return df.groupby(CUBE_DIMS).agg(
+        Count=('Activity Type', 'size'),
+        Moving_Time=('Moving Time', 'sum'),
+        Distance=('Distance', 'sum'),
+    ).reset_index()
+
+
+@st.cache_data(show_spinner=False, max_entries=16)
+def activity_cube(key, _df):
+    return build_activity_cube(_df)
+
+
+def rollup(cube, by, value='Count', days=None, months=None):
+    if days is not None:
+        cube = cube[cube['DayOfWeek'].isin(days)]
+    if months is not None:
+        cube = cube[cube['Month'].isin(months)]
+    return cube.groupby(by)[value].sum().reset_index()